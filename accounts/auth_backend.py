@@ -3,15 +3,20 @@ Auth0 JWT validation and user sync.
 Uses rsa library + stdlib for JWKS verification without cryptography/cffi dependency.
 """
 import base64
+import copy
+import hashlib
 import json
 import logging
 import struct
+import threading
 import time
-import requests as http_requests
+from collections import OrderedDict
 import rsa
 import rsa.pem
 from django.contrib.auth import get_user_model
 from django.conf import settings
+from django.core.cache import caches
+from core.http import get_client
 
 logger = logging.getLogger(__name__)
 User = get_user_model()
@@ -28,6 +33,12 @@ def get_auth0_audience():
     return getattr(settings, 'AUTH0_AUDIENCE', '').strip() or getattr(settings, 'AUTH0_IDENTIFIER', '').strip()
 
 
+def auth0_http_client():
+    """Pooled HTTP client shared by every Auth0 call in this process."""
+    read_timeout = getattr(settings, 'AUTH0_HTTP_TIMEOUT', 5.0)
+    return get_client('auth0', timeout=(min(2.0, read_timeout), read_timeout))
+
+
 def _b64decode(s):
     """Base64url decode with padding."""
     s = s.replace('-', '+').replace('_', '/')
@@ -50,26 +61,201 @@ def _decode_jwt_payload(token):
         return None, None
 
 
-def _get_rsa_public_key(kid):
-    """Fetch JWKS and build RSA public key from n/e for given kid."""
+# ---------------------------------------------------------------------------
+# JWKS key cache
+#
+# Keys are held per process as kid -> rsa.PublicKey and mirrored (as the raw
+# JWKS document) into a shared Django cache so every gunicorn worker reuses the
+# same keyset. Expired keys are still served while a background refresh runs
+# (stale-while-revalidate); unknown kids trigger a refresh that is rate limited
+# so a flood of forged tokens can't hammer Auth0.
+# ---------------------------------------------------------------------------
+
+JWKS_CACHE_KEY = 'auth0:jwks'
+
+_jwks_lock = threading.Lock()
+_jwks_state = {
+    'keys': {},          # kid -> rsa.PublicKey
+    'fetched_at': 0.0,   # when the keyset was fetched from Auth0
+    'last_attempt': 0.0, # last network fetch attempt (rate limiting)
+    'refreshing': False,
+}
+
+
+def _jwks_ttl():
+    return getattr(settings, 'AUTH0_JWKS_CACHE_TTL', 3600)
+
+
+def _jwks_stale_ttl():
+    return getattr(settings, 'AUTH0_JWKS_STALE_TTL', 86400)
+
+
+def _jwks_min_refresh_interval():
+    return getattr(settings, 'AUTH0_JWKS_MIN_REFRESH_INTERVAL', 30)
+
+
+def _jwks_shared_cache():
+    alias = getattr(settings, 'AUTH0_JWKS_CACHE_ALIAS', 'default')
+    if not alias:
+        return None
+    try:
+        return caches[alias]
+    except Exception as e:
+        logger.debug("JWKS shared cache %r unavailable: %s", alias, e)
+        return None
+
+
+def _build_public_keys(jwks):
+    """Build kid -> rsa.PublicKey from a JWKS document."""
+    keys = {}
+    for key_data in jwks.get('keys', []):
+        kid = key_data.get('kid')
+        if not kid or key_data.get('kty', 'RSA') != 'RSA':
+            continue
+        try:
+            n = int.from_bytes(_b64decode(key_data['n']), 'big')
+            e = int.from_bytes(_b64decode(key_data['e']), 'big')
+        except (KeyError, ValueError) as exc:
+            logger.debug("Skipping malformed JWK %s: %s", kid, exc)
+            continue
+        keys[kid] = rsa.PublicKey(n, e)
+    return keys
+
+
+def _fetch_jwks():
+    """Fetch the JWKS document from Auth0. Returns dict or None."""
     issuer = get_auth0_issuer()
     if not issuer:
         return None
     jwks_url = f"{issuer.rstrip('/')}/.well-known/jwks.json"
     try:
-        resp = http_requests.get(jwks_url, timeout=10)
-        jwks = resp.json()
-        for key_data in jwks.get('keys', []):
-            if key_data.get('kid') == kid:
-                # Build RSA public key from n, e
-                n_bytes = _b64decode(key_data['n'])
-                e_bytes = _b64decode(key_data['e'])
-                n = int.from_bytes(n_bytes, 'big')
-                e = int.from_bytes(e_bytes, 'big')
-                pub_key = rsa.PublicKey(n, e)
-                return pub_key
+        resp = auth0_http_client().get(jwks_url)
+        resp.raise_for_status()
+        return resp.json()
     except Exception as e:
-        logger.debug("JWKS fetch failed: %s", e)
+        logger.warning("JWKS fetch failed: %s", e)
+        return None
+
+
+def _load_shared_jwks():
+    """Return (jwks, fetched_at) from the shared cache, or (None, 0)."""
+    cache = _jwks_shared_cache()
+    if cache is None:
+        return None, 0.0
+    try:
+        entry = cache.get(JWKS_CACHE_KEY)
+    except Exception as e:
+        logger.debug("JWKS shared cache read failed: %s", e)
+        return None, 0.0
+    if not entry:
+        return None, 0.0
+    return entry.get('jwks'), entry.get('fetched_at', 0.0)
+
+
+def _store_shared_jwks(jwks, fetched_at):
+    cache = _jwks_shared_cache()
+    if cache is None:
+        return
+    try:
+        cache.set(JWKS_CACHE_KEY, {'jwks': jwks, 'fetched_at': fetched_at}, timeout=_jwks_stale_ttl())
+    except Exception as e:
+        logger.debug("JWKS shared cache write failed: %s", e)
+
+
+def _install_keys(jwks, fetched_at):
+    keys = _build_public_keys(jwks)
+    if not keys:
+        return False
+    with _jwks_lock:
+        if fetched_at >= _jwks_state['fetched_at']:
+            _jwks_state['keys'] = keys
+            _jwks_state['fetched_at'] = fetched_at
+    return True
+
+
+def _adopt_shared_jwks():
+    """Pull a newer keyset another worker stored in the shared cache."""
+    jwks, fetched_at = _load_shared_jwks()
+    if jwks and fetched_at > _jwks_state['fetched_at']:
+        return _install_keys(jwks, fetched_at)
+    return False
+
+
+def _refresh_jwks(force=False):
+    """
+    Refresh the keyset, preferring the shared cache over the network.
+    Network fetches are rate limited by AUTH0_JWKS_MIN_REFRESH_INTERVAL unless
+    nothing is cached yet. Returns True if keys were (re)installed.
+    """
+    now = time.time()
+    if _adopt_shared_jwks() and (now - _jwks_state['fetched_at']) < _jwks_ttl():
+        return True
+    with _jwks_lock:
+        have_keys = bool(_jwks_state['keys'])
+        if have_keys and not force and now - _jwks_state['last_attempt'] < _jwks_min_refresh_interval():
+            return False
+        _jwks_state['last_attempt'] = now
+    jwks = _fetch_jwks()
+    if not jwks:
+        return False
+    fetched_at = time.time()
+    if not _install_keys(jwks, fetched_at):
+        return False
+    _store_shared_jwks(jwks, fetched_at)
+    return True
+
+
+def _refresh_jwks_in_background():
+    with _jwks_lock:
+        if _jwks_state['refreshing']:
+            return
+        _jwks_state['refreshing'] = True
+
+    def _run():
+        try:
+            _refresh_jwks(force=True)
+        finally:
+            with _jwks_lock:
+                _jwks_state['refreshing'] = False
+
+    threading.Thread(target=_run, name='auth0-jwks-refresh', daemon=True).start()
+
+
+def clear_jwks_cache():
+    """Drop cached keys in this process and the shared cache."""
+    with _jwks_lock:
+        _jwks_state.update(keys={}, fetched_at=0.0, last_attempt=0.0)
+    cache = _jwks_shared_cache()
+    if cache is not None:
+        try:
+            cache.delete(JWKS_CACHE_KEY)
+        except Exception:
+            pass
+
+
+def _get_rsa_public_key(kid):
+    """Return the cached RSA public key for kid, refreshing the JWKS if needed."""
+    if not kid:
+        return None
+    now = time.time()
+    age = now - _jwks_state['fetched_at']
+    pub_key = _jwks_state['keys'].get(kid)
+    if pub_key is not None:
+        if age < _jwks_ttl():
+            return pub_key
+        if age < _jwks_stale_ttl():
+            # Serve the known key; refresh without blocking the request.
+            _refresh_jwks_in_background()
+            return pub_key
+
+    # Unknown kid (key rotation) or keyset too old to trust: check what other
+    # workers have, then go to Auth0 subject to rate limiting.
+    if _adopt_shared_jwks():
+        pub_key = _jwks_state['keys'].get(kid)
+        if pub_key is not None and time.time() - _jwks_state['fetched_at'] < _jwks_stale_ttl():
+            return pub_key
+    if _refresh_jwks():
+        return _jwks_state['keys'].get(kid)
     return None
 
 
@@ -128,39 +314,167 @@ def verify_auth0_token(token):
         return None
 
 
+# ---------------------------------------------------------------------------
+# Bearer-token authentication
+#
+# Verified tokens are remembered by SHA-256 digest until their `exp`,
+# Auth0 `sub` values are mapped to user ids, and active users are kept
+# for AUTH0_USER_CACHE_TTL seconds, all in bounded LRU maps. A repeat API
+# call costs dict lookups instead of an RSA verify, a profile join and a
+# user fetch. Saving or deleting a user drops it here (accounts.signals);
+# other processes notice within the TTL.
+# ---------------------------------------------------------------------------
+
+_token_cache = OrderedDict()     # token digest -> (user_id, exp)
+_sub_user_cache = OrderedDict()  # auth0 sub -> user_id
+_user_cache = OrderedDict()      # user_id -> (active User, expires at)
+_token_cache_lock = threading.Lock()
+
+
+def _token_cache_size():
+    return getattr(settings, 'AUTH0_TOKEN_CACHE_SIZE', 10000)
+
+
+def _lru_get(cache, key):
+    with _token_cache_lock:
+        value = cache.get(key)
+        if value is not None:
+            cache.move_to_end(key)
+        return value
+
+
+def _lru_set(cache, key, value):
+    with _token_cache_lock:
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > _token_cache_size():
+            cache.popitem(last=False)
+
+
+def _lru_pop(cache, key):
+    with _token_cache_lock:
+        cache.pop(key, None)
+
+
+def clear_token_cache():
+    with _token_cache_lock:
+        _token_cache.clear()
+        _sub_user_cache.clear()
+        _user_cache.clear()
+
+
+def forget_user(user_id):
+    """Drop a cached user, e.g. after it was saved or deleted."""
+    _lru_pop(_user_cache, user_id)
+
+
+def _active_user(user_id, now):
+    entry = _lru_get(_user_cache, user_id)
+    if entry is None or entry[1] <= now:
+        user = User.objects.filter(pk=user_id, is_active=True).first()
+        if user is None:
+            _lru_pop(_user_cache, user_id)
+            return None
+        entry = (user, now + getattr(settings, 'AUTH0_USER_CACHE_TTL', 60))
+        _lru_set(_user_cache, user_id, entry)
+    # A copy per request, so one request's changes never leak into another's.
+    return copy.copy(entry[0])
+
+
+def _user_id_for_sub(sub):
+    user_id = _lru_get(_sub_user_cache, sub)
+    if user_id is None:
+        from .models import UserProfile
+        user_id = UserProfile.objects.filter(auth0_sub=sub).values_list('user_id', flat=True).first()
+        if user_id is not None:
+            _lru_set(_sub_user_cache, sub, user_id)
+    return user_id
+
+
+def authenticate_bearer_token(token):
+    """
+    Return the active User for an Auth0 bearer JWT, or None.
+    Only users that already have a UserProfile for the token's `sub` are
+    accepted; API calls never provision accounts.
+    """
+    digest = hashlib.sha256(token.encode('utf-8')).hexdigest()
+    now = time.time()
+    entry = _lru_get(_token_cache, digest)
+    if entry is not None and entry[1] > now:
+        user_id = entry[0]
+    else:
+        if entry is not None:
+            _lru_pop(_token_cache, digest)
+        payload = verify_auth0_token(token)
+        if not payload or not payload.get('sub'):
+            return None
+        user_id = _user_id_for_sub(payload['sub'])
+        if user_id is None:
+            logger.debug("No user profile for sub=%s", payload['sub'])
+            return None
+        _lru_set(_token_cache, digest, (user_id, payload.get('exp', 0)))
+
+    user = _active_user(user_id, now)
+    if user is None:
+        _lru_pop(_token_cache, digest)
+    return user
+
+
+def username_for_sub(sub):
+    return f"auth0_{sub.replace('|', '_')}"[:150]
+
+
+def user_fields_from_claims(claims):
+    """Map Auth0 claims (token payload or user export record) to User fields."""
+    email = claims.get('email')
+    if isinstance(email, bool) or not email:
+        email = ''
+    name = claims.get('name') or claims.get('nickname', '')
+    parts = name.split(maxsplit=1) if name else ['']
+    return {
+        'email': email,
+        'first_name': (parts[0] if parts else '')[:150],
+        'last_name': (parts[1] if len(parts) > 1 else '')[:150],
+    }
+
+
 def get_or_create_user_from_token(payload):
-    """Create or update Django User from Auth0 JWT payload."""
+    """
+    Create or update Django User from Auth0 JWT payload.
+    Existing users are diffed against the claims and only changed columns
+    are written, so a returning user with unchanged claims costs one read.
+    """
     sub = payload.get('sub')
     if not sub:
         return None
     from .models import UserProfile
-    email = payload.get('email')
-    if isinstance(email, bool):
-        email = None
-    name = payload.get('name') or payload.get('nickname', '')
-    parts = name.split(maxsplit=1) if name else ['']
-    first_name = parts[0] if parts else ''
-    last_name = parts[1] if len(parts) > 1 else ''
-    username = f"auth0_{sub.replace('|', '_')}"[:150]
-    user, created = User.objects.get_or_create(
-        username=username,
-        defaults={
-            'email': email or '',
-            'first_name': first_name,
-            'last_name': last_name,
-        }
-    )
+    fields = user_fields_from_claims(payload)
+    username = username_for_sub(sub)
+
+    user = User.objects.select_related('profile').filter(username=username).first()
+    if user is None:
+        user, created = User.objects.get_or_create(username=username, defaults=fields)
+    else:
+        created = False
     if not created:
-        if email:
-            user.email = email
-        user.first_name = first_name
-        user.last_name = last_name
-        user.save(update_fields=['email', 'first_name', 'last_name'])
-    profile, _ = UserProfile.objects.get_or_create(
-        user=user,
-        defaults={'auth0_sub': sub, 'role': 'client'}
-    )
+        if not fields['email']:
+            # A token without an email claim never clears a stored address.
+            del fields['email']
+        changed = [name for name, value in fields.items() if getattr(user, name) != value]
+        if changed:
+            for name in changed:
+                setattr(user, name, fields[name])
+            user.save(update_fields=changed)
+
+    try:
+        profile = user.profile
+    except UserProfile.DoesNotExist:
+        profile, _ = UserProfile.objects.get_or_create(
+            user=user,
+            defaults={'auth0_sub': sub, 'role': 'client'}
+        )
     if profile.auth0_sub != sub:
+        _lru_pop(_sub_user_cache, profile.auth0_sub)
         profile.auth0_sub = sub
         profile.save(update_fields=['auth0_sub'])
     return user
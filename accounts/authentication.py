@@ -0,0 +1,19 @@
+from rest_framework import authentication, exceptions
+from .auth_backend import authenticate_bearer_token
+from .middleware import get_bearer_token
+
+
+class Auth0BearerAuthentication(authentication.BaseAuthentication):
+    """DRF authentication for Auth0 bearer JWTs (shares the verified-token cache)."""
+
+    def authenticate(self, request):
+        token = get_bearer_token(request)
+        if not token:
+            return None
+        user = authenticate_bearer_token(token)
+        if user is None:
+            raise exceptions.AuthenticationFailed('Invalid or expired token')
+        return (user, token)
+
+    def authenticate_header(self, request):
+        return 'Bearer'
@@ -0,0 +1,108 @@
+"""
+Import users from an Auth0 user export.
+
+Accepts the NDJSON file produced by Auth0's bulk user export job or a JSON
+array from the Management API. Users and profiles are created with
+bulk_create in batches; records whose username or sub already exist are
+skipped, so the command is safe to re-run.
+"""
+import json
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from accounts.auth_backend import user_fields_from_claims, username_for_sub
+from accounts.models import UserProfile, ROLE_CHOICES
+
+User = get_user_model()
+
+
+def _read_records(path):
+    with open(path, encoding='utf-8') as fh:
+        head = fh.read(1)
+        while head and head.isspace():
+            head = fh.read(1)
+        fh.seek(0)
+        if head == '[':
+            yield from json.load(fh)
+            return
+        for line in fh:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def _batches(iterable, size):
+    it = iter(iterable)
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+
+class Command(BaseCommand):
+    help = 'Bulk-create User/UserProfile rows from an Auth0 user export (NDJSON or JSON array).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Path to the Auth0 export file')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--role', default='client', choices=[r for r, _ in ROLE_CHOICES])
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be positive')
+        try:
+            records = _read_records(options['path'])
+            created = skipped = 0
+            for batch in _batches(records, batch_size):
+                c, s = self._import_batch(batch, options['role'], batch_size)
+                created += c
+                skipped += s
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Could not read export: {e}")
+        self.stdout.write(self.style.SUCCESS(f"Imported {created} users ({skipped} skipped)"))
+
+    def _import_batch(self, batch, role, batch_size):
+        rows = {}
+        for record in batch:
+            sub = record.get('user_id') or record.get('sub')
+            if not sub:
+                continue
+            rows.setdefault(username_for_sub(sub), (sub, user_fields_from_claims(record)))
+
+        existing_usernames = set(
+            User.objects.filter(username__in=rows.keys()).values_list('username', flat=True)
+        )
+        existing_subs = set(
+            UserProfile.objects.filter(auth0_sub__in=[sub for sub, _ in rows.values()])
+            .values_list('auth0_sub', flat=True)
+        )
+        new_rows = {
+            username: (sub, fields) for username, (sub, fields) in rows.items()
+            if username not in existing_usernames and sub not in existing_subs
+        }
+        if not new_rows:
+            return 0, len(batch)
+
+        with transaction.atomic():
+            User.objects.bulk_create(
+                [User(username=username, password=make_password(None), **fields)
+                 for username, (_, fields) in new_rows.items()],
+                batch_size=batch_size,
+            )
+            # Re-read ids rather than relying on bulk_create returning pks,
+            # which not every backend supports.
+            user_ids = dict(
+                User.objects.filter(username__in=new_rows.keys()).values_list('username', 'id')
+            )
+            UserProfile.objects.bulk_create(
+                [UserProfile(user_id=user_ids[username], auth0_sub=sub, role=role)
+                 for username, (sub, _) in new_rows.items()],
+                batch_size=batch_size,
+            )
+        return len(new_rows), len(batch) - len(new_rows)
@@ -0,0 +1,73 @@
+from functools import partial
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.http import JsonResponse
+from .auth_backend import authenticate_bearer_token
+
+API_PATH_PREFIX = '/api/'
+
+
+def get_bearer_token(request):
+    """Return the token from an `Authorization: Bearer ...` header, or None."""
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    scheme, _, token = header.partition(' ')
+    if scheme.lower() != 'bearer' or not token.strip():
+        return None
+    return token.strip()
+
+
+async def _auser(user):
+    return user
+
+
+class Auth0BearerMiddleware:
+    """
+    Authenticate /api/ requests that carry an Auth0 bearer JWT.
+    Must run after AuthenticationMiddleware. Requests without an
+    Authorization header fall through to normal session auth; bearer
+    requests skip CSRF since the credential is not sent ambiently.
+    Sync and async capable, so it never forces async views under ASGI
+    through a thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        token = _api_bearer_token(request)
+        if token:
+            response = _login(request, authenticate_bearer_token(token))
+            if response is not None:
+                return response
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        token = _api_bearer_token(request)
+        if token:
+            response = _login(request, await sync_to_async(authenticate_bearer_token)(token))
+            if response is not None:
+                return response
+        return await self.get_response(request)
+
+
+def _api_bearer_token(request):
+    return get_bearer_token(request) if request.path.startswith(API_PATH_PREFIX) else None
+
+
+def _login(request, user):
+    """Attach a bearer-authenticated `user` to `request`; a 401 response if there is none."""
+    if user is None:
+        response = JsonResponse({'error': 'Invalid or expired token'}, status=401)
+        response['WWW-Authenticate'] = 'Bearer'
+        return response
+    request.user = user
+    request.auser = partial(_auser, user)  # async views
+    request._dont_enforce_csrf_checks = True
+    return None
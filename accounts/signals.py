@@ -0,0 +1,15 @@
+"""
+Drop users from the bearer-token auth cache (accounts.auth_backend) when
+they change, so a deactivated user is refused by this process at once.
+"""
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .auth_backend import forget_user
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def user_changed(sender, instance, **kwargs):
+    forget_user(instance.pk)
@@ -1,10 +1,13 @@
+import logging
 import secrets
 import requests as http_requests
 from django.shortcuts import render, redirect
 from django.conf import settings
-from .auth_backend import verify_auth0_token, get_or_create_user_from_token
+from .auth_backend import auth0_http_client, verify_auth0_token, get_or_create_user_from_token
 from django.contrib.auth import login as auth_login, logout as auth_logout
 
+logger = logging.getLogger(__name__)
+
 
 def login_view(request):
     """Redirect to Auth0 Universal Login."""
@@ -68,7 +71,11 @@ def callback(request):
     }
     if client_secret:
         post_payload['client_secret'] = client_secret
-    resp = http_requests.post(token_url, json=post_payload, headers={'Content-Type': 'application/json'}, timeout=10)
+    try:
+        resp = auth0_http_client().post(token_url, json=post_payload, headers={'Content-Type': 'application/json'})
+    except http_requests.RequestException as e:
+        logger.warning("Auth0 token exchange failed: %s", e)
+        return redirect('login')
     if resp.status_code != 200:
         return redirect('login')
     data = resp.json()
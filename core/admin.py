@@ -1,8 +1,22 @@
 from django.contrib import admin
-from .models import AuditLog
+from .models import AuditLog, OutboxMessage
 
 
 @admin.register(AuditLog)
 class AuditLogAdmin(admin.ModelAdmin):
     list_display = ('user', 'action', 'model_name', 'object_id', 'created_at')
     readonly_fields = ('user', 'action', 'model_name', 'object_id', 'details', 'created_at')
+    # Exact lookups only, served by core_audit_object_idx / core_audit_action_idx.
+    search_fields = ('=object_id', '=action')
+    list_select_related = ('user',)
+    ordering = ('-created_at',)
+    show_full_result_count = False
+
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = ('task', 'eta', 'created_at', 'dispatched_at')
+    readonly_fields = ('task', 'args', 'kwargs', 'eta', 'created_at', 'dispatched_at')
+    list_filter = ('task',)
+    ordering = ('-pk',)
+    show_full_result_count = False
@@ -7,6 +7,7 @@ from wallets.models import LedgerEntry, Wallet, credit_wallet, debit_wallet
 from readings.models import Session
 from readers.models import ReaderProfile
 from community.models import Flag, ForumThread, ForumPost
+from core import outbox
 from decimal import Decimal
 import uuid
 
@@ -83,5 +84,5 @@ def refund_adjustment(request):
 def trigger_payouts(request):
     """Admin manually triggers the reader payout batch task."""
     from readings.tasks import payout_readers
-    payout_readers.delay()
+    outbox.enqueue(payout_readers)
     return redirect('admin_dashboard')
@@ -0,0 +1,41 @@
+"""
+Audit trail API.
+
+record() / record_many() queue AuditLog rows once the current transaction
+commits, so rolled-back work is never audited. Rows are written through
+the buffered batch writer (core.batching): on the request path, auditing
+costs microseconds in worker processes.
+"""
+from functools import partial
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import batching
+
+MODEL = 'core.AuditLog'
+
+
+def event(action, user=None, obj=None, details=None, model_name='', object_id=''):
+    """An audit event for record_many(); `obj` fills model_name/object_id from a model instance."""
+    if obj is not None:
+        model_name, object_id = type(obj).__name__, obj.pk
+    return {
+        'user_id': getattr(user, 'pk', user),
+        'action': action,
+        'model_name': model_name,
+        'object_id': str(object_id),
+        'details': details or {},
+        'created_at': timezone.now(),
+    }
+
+
+def record(action, user=None, obj=None, details=None, model_name='', object_id=''):
+    """Audit one action. `details` must be JSON-serialisable."""
+    record_many([event(action, user, obj, details, model_name, object_id)])
+
+
+def record_many(events):
+    events = list(events)
+    if events:
+        transaction.on_commit(partial(batching.get_writer(MODEL).append, events))
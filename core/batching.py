@@ -0,0 +1,296 @@
+"""
+Buffered, batched inserts for append-only tables (audit log, session
+timeline).
+
+Callers hand rows (dicts of field values) to a model's writer, normally
+on transaction commit. In gunicorn and Celery worker processes, which
+call start() from their init hooks, rows go to an in-process buffer. A
+background thread writes them with bulk_create every
+BUFFERED_WRITE_EVENTS rows or every BUFFERED_WRITE_INTERVAL_MS,
+whichever comes first. The caller only pays for a list append and one
+write to a journal file. In other processes (shell, tests, runserver)
+rows are written straight away.
+
+Crash safety: buffered rows are journaled under
+BUFFERED_WRITE_SPILL_DIR/<model> until their batch is in the database.
+Journals of processes that died, and batches whose insert failed, are
+picked up and written by any running writer. Rows are therefore written
+at least once; a batch interrupted between its insert and the journal
+cleanup is written again. stop(), run from the gunicorn worker_exit and
+Celery worker_process_shutdown hooks, writes whatever is left.
+
+A batch the database rejects is retried row by row. Rows that still fail
+(e.g. a foreign key to a user deleted before the flush) go to a
+<pid>.dead.*.jsonl file, which is never retried, so they cannot hold up
+the rest of their batch. Batches that failed because the database was
+unavailable are kept as <pid>.failed.<attempts>.*.jsonl and retried with
+exponential backoff, up to MAX_RETRY_DELAY seconds apart.
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+from django.apps import apps
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DataError, IntegrityError, close_old_connections, transaction
+from django.utils.dateparse import parse_datetime
+
+logger = logging.getLogger(__name__)
+
+# Seconds; the longest wait between retries of a failed batch.
+MAX_RETRY_DELAY = 300
+
+# Errors that condemn the rows being inserted rather than the database.
+ROW_ERRORS = (IntegrityError, DataError, TypeError, ValueError)
+
+
+class BatchWriter:
+    """Buffers rows for one model in memory (journaled to disk) and writes them in batches."""
+
+    def __init__(self, model_label, spill_dir, max_events=500, interval=1.0):
+        self.model_label = model_label
+        self.spill_dir = spill_dir
+        self.max_events = max_events
+        self.interval = interval
+        self._events = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._journal = None
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def start(self):
+        if self.running:
+            return
+        os.makedirs(self.spill_dir, exist_ok=True)
+        journal = self._path('journal')
+        if os.path.exists(journal):
+            # Left by an earlier process that had our pid.
+            os.rename(journal, self._path('failed', 0))
+        self._journal = open(journal, 'a', encoding='utf-8')
+        self._thread = threading.Thread(target=self._run, name=f'batch-writer-{self.model_label}', daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def stop(self):
+        """Stop the background thread and write everything still buffered."""
+        if not self.running:
+            return
+        thread, self._thread = self._thread, None
+        self._wake.set()
+        thread.join(timeout=self.interval + 5)
+        self.flush(final=True)
+
+    def append(self, rows):
+        lines = ''.join(json.dumps(e, cls=DjangoJSONEncoder) + '\n' for e in rows) if self.running else None
+        with self._lock:
+            buffered = lines is not None and self._journal is not None
+            if buffered:
+                try:
+                    self._journal.write(lines)
+                    self._journal.flush()
+                except OSError as e:
+                    logger.error(f"Journal write failed, {len(rows)} rows held in memory only: {e}")
+                self._events.extend(rows)
+                full = len(self._events) >= self.max_events
+        if not buffered:
+            self._insert(rows)
+        elif full:
+            self._wake.set()
+
+    def flush(self, final=False):
+        """Write the buffered rows now. Returns how many were written."""
+        with self._lock:
+            if self._journal is None:
+                return 0
+            rows, self._events = self._events, []
+            if not rows and not final:
+                return 0
+            # Hand the journal for these rows over to this batch.
+            batch = self._path('flushing')
+            self._journal.close()
+            os.rename(self._path('journal'), batch)
+            self._journal = None if final else open(self._path('journal'), 'a', encoding='utf-8')
+        try:
+            rejected = self._write(rows)
+        except Exception as e:
+            logger.error(f"Batch of {len(rows)} {self.model_label} rows not written, kept for retry: {e}")
+            self._keep_failed(batch, attempts=1)
+            return 0
+        os.unlink(batch)
+        return len(rows) - len(rejected)
+
+    def recover(self):
+        """Write the journals of dead processes and failed batches. Returns rows written."""
+        written = 0
+        for name in sorted(os.listdir(self.spill_dir)):
+            try:
+                pid, kind, rest = name.split('.', 2)
+                pid = int(pid)
+            except ValueError:
+                continue
+            path = os.path.join(self.spill_dir, name)
+            attempts = 0
+            if kind == 'dead':
+                continue
+            elif kind == 'failed':
+                attempts = int(rest.split('.', 1)[0]) if rest.split('.', 1)[0].isdigit() else 0
+                try:
+                    if time.time() < os.path.getmtime(path) + self._retry_delay(attempts):
+                        continue
+                except FileNotFoundError:
+                    continue
+            elif pid == os.getpid() or _alive(pid):
+                continue
+            # Claim the file; another writer recovering it too loses the rename.
+            claimed = self._path('recovering')
+            try:
+                os.rename(path, claimed)
+            except FileNotFoundError:
+                continue
+            rows = _read_journal(claimed)
+            try:
+                rejected = self._write(rows)
+            except Exception as e:
+                logger.error(f"Recovered journal {name} not written (attempt {attempts + 1}): {e}")
+                self._keep_failed(claimed, attempts + 1)
+                continue
+            os.unlink(claimed)
+            written += len(rows) - len(rejected)
+            logger.info(f"Recovered {len(rows) - len(rejected)} {self.model_label} rows from {name}")
+        return written
+
+    def _write(self, rows):
+        """
+        Insert `rows`, falling back to one row at a time if the batch is
+        rejected. Rows that still fail are dead-lettered and returned.
+        Database outages propagate so the caller keeps the batch.
+        """
+        try:
+            with transaction.atomic():
+                self._insert(rows)
+            return []
+        except ROW_ERRORS:
+            pass
+        rejected = []
+        for row in rows:
+            try:
+                with transaction.atomic():
+                    self._insert([row])
+            except ROW_ERRORS as e:
+                rejected.append((row, e))
+        if rejected:
+            path = self._path('dead')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.writelines(json.dumps(row, cls=DjangoJSONEncoder) + '\n' for row, _ in rejected)
+            logger.error(
+                f"{len(rejected)} of {len(rows)} {self.model_label} rows rejected, "
+                f"moved to {os.path.basename(path)}: {rejected[0][1]}"
+            )
+        return [row for row, _ in rejected]
+
+    def _keep_failed(self, path, attempts):
+        failed = self._path('failed', attempts)
+        os.rename(path, failed)
+        os.utime(failed)  # the backoff counts from this attempt
+
+    def _retry_delay(self, attempts):
+        return min(self.interval * 2 ** attempts, MAX_RETRY_DELAY)
+
+    def _insert(self, rows):
+        model = apps.get_model(self.model_label)
+        model.objects.bulk_create([model(**e) for e in rows])
+
+    def _path(self, kind, attempts=None):
+        # <pid>.journal.jsonl is the live journal; batches get a unique suffix,
+        # and failed batches their attempt count.
+        suffix = 'jsonl' if kind == 'journal' else f'{uuid.uuid4().hex}.jsonl'
+        if attempts is not None:
+            suffix = f'{attempts}.{suffix}'
+        return os.path.join(self.spill_dir, f'{os.getpid()}.{kind}.{suffix}')
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if self._thread is None:
+                return  # stop() writes what's left
+            close_old_connections()
+            try:
+                self.flush()
+                self.recover()
+            except Exception as e:
+                logger.error(f"Batch writer error: {e}")
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _read_journal(path):
+    rows = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                e = json.loads(line)
+            except ValueError:
+                continue  # a line cut short by the crash
+            e['created_at'] = parse_datetime(e['created_at'])
+            rows.append(e)
+    return rows
+
+
+_writers = {}
+_writers_lock = threading.Lock()
+_started = False
+
+
+def get_writer(model_label):
+    """The process-wide writer for `model_label` (e.g. 'core.AuditLog')."""
+    writer = _writers.get(model_label)
+    if writer is None:
+        with _writers_lock:
+            writer = _writers.get(model_label)
+            if writer is None:
+                writer = BatchWriter(
+                    model_label,
+                    os.path.join(settings.BUFFERED_WRITE_SPILL_DIR, model_label.lower()),
+                    max_events=settings.BUFFERED_WRITE_EVENTS,
+                    interval=settings.BUFFERED_WRITE_INTERVAL_MS / 1000,
+                )
+                if _started:
+                    writer.start()
+                _writers[model_label] = writer
+    return writer
+
+
+def start():
+    """Buffer this process's writes from now on; call from worker init hooks."""
+    global _started
+    with _writers_lock:
+        _started = True
+        for writer in _writers.values():
+            writer.start()
+
+
+def stop():
+    global _started
+    with _writers_lock:
+        _started = False
+        writers = list(_writers.values())
+    for writer in writers:
+        writer.stop()
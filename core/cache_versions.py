@@ -0,0 +1,41 @@
+"""
+Version counters in the shared cache, for invalidation by key rotation.
+
+Cached entries (or ETags) embed the current version of whatever they were
+built from; bumping the version makes every older entry unreachable
+without having to find and delete it. Counters start from the current
+time in milliseconds, so a counter that was evicted and recreated never
+reissues a version an old entry might still carry.
+"""
+import logging
+import time
+
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+
+def _seed():
+    return int(time.time() * 1000)
+
+
+def get_version(key):
+    """Current version for `key`, or None if the cache is unavailable."""
+    try:
+        version = cache.get(key)
+        if version is None:
+            cache.add(key, _seed(), timeout=None)
+            version = cache.get(key)
+        return version
+    except Exception as e:
+        logger.debug("Cache unavailable for %s: %s", key, e)
+        return None
+
+
+def bump_version(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, _seed(), timeout=None)
+    except Exception as e:
+        logger.debug("Could not bump %s: %s", key, e)
@@ -14,6 +14,7 @@ def client_dashboard(request):
     from wallets.models import Wallet, LedgerEntry
     from scheduling.models import Booking
     from readers.models import Favorite
+    from readers.recommended import recommended_readers
     from readings.models import SessionNote, Session
 
     wallet, _ = Wallet.objects.get_or_create(user=request.user, defaults={})
@@ -53,6 +54,7 @@ def client_dashboard(request):
         'upcoming_bookings': upcoming_bookings,
         'past_sessions': past_sessions,
         'favorites': favorites,
+        'recommended_readers': recommended_readers(request.user),
         'notes': notes,
         'total_spent': total_spent,
     })
@@ -154,6 +156,13 @@ def admin_dashboard(request):
         entry_type__in=['session_charge', 'booking', 'commission']
     ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
     total_revenue = abs(total_revenue)
+
+    # Session analytics for the last 30 days, from the session timeline
+    from readings import timeline
+    now = timezone.now()
+    since = now - timezone.timedelta(days=30)
+    reconnect_rate = timeline.reconnect_rate(since, now)
+    minutes_by_modality = sorted(timeline.minutes_by_modality(since, now).items())
     
     return render(request, 'core/admin_dashboard.html', {
         'pending_readers': pending_readers,
@@ -165,4 +174,6 @@ def admin_dashboard(request):
         'active_readers': active_readers,
         'total_sessions': total_sessions,
         'total_revenue': total_revenue,
+        'reconnect_rate': reconnect_rate,
+        'minutes_by_modality': minutes_by_modality,
     })
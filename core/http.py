@@ -0,0 +1,194 @@
+"""
+Pooled outbound HTTP clients for third-party integrations.
+
+Each named client owns one requests.Session, so connections (and their TLS
+sessions) are kept alive and reused instead of being opened per call. Every
+client applies default timeouts, a per-host circuit breaker that fails fast
+while a provider is degraded, and records per-host latency metrics.
+
+    from core.http import get_client
+    resp = get_client('auth0', timeout=(2, 5)).post(url, json=payload)
+"""
+import logging
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised without touching the network while a host's circuit is open."""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+    Opens after `failure_threshold` failures in a row; after `reset_timeout`
+    seconds a single trial request is let through (half-open) and its outcome
+    closes or re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half_open'
+        return 'open'
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half_open' and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.trial_in_flight or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self.trial_in_flight = False
+
+
+class _HostMetrics:
+    __slots__ = ('count', 'errors', 'rejected', 'total_ms', 'max_ms')
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.rejected = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'rejected': self.rejected,
+            'avg_ms': round(self.total_ms / self.count, 2) if self.count else 0.0,
+            'max_ms': round(self.max_ms, 2),
+        }
+
+
+class HttpClient:
+    """A pooled requests.Session with timeouts, circuit breaking and metrics."""
+
+    def __init__(self, name, timeout=(3.05, 10), pool_connections=4, pool_maxsize=10,
+                 failure_threshold=5, reset_timeout=30.0):
+        self.name = name
+        self.timeout = timeout
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.session = requests.Session()
+        # pool_maxsize bounds keep-alive connections per host; retries are left
+        # to callers so a degraded provider isn't hit repeatedly per request.
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self._breakers = {}
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _host_state(self, host):
+        with self._lock:
+            breaker = self._breakers.get(host)
+            if breaker is None:
+                breaker = self._breakers[host] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+                self._metrics[host] = _HostMetrics()
+            return breaker, self._metrics[host]
+
+    def _record(self, metrics, elapsed_ms, error):
+        with self._lock:
+            metrics.count += 1
+            metrics.total_ms += elapsed_ms
+            metrics.max_ms = max(metrics.max_ms, elapsed_ms)
+            if error:
+                metrics.errors += 1
+
+    def request(self, method, url, **kwargs):
+        host = urlsplit(url).netloc
+        breaker, metrics = self._host_state(host)
+        if not breaker.allow():
+            with self._lock:
+                metrics.rejected += 1
+            raise CircuitOpenError(f"{self.name}: circuit open for {host}")
+
+        kwargs.setdefault('timeout', self.timeout)
+        start = time.perf_counter()
+        try:
+            resp = self.session.request(method, url, **kwargs)
+        except Exception:
+            # Any error, not only network ones, so a failed half-open trial
+            # can't leave the circuit waiting on it for good.
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            breaker.record_failure()
+            self._record(metrics, elapsed_ms, error=True)
+            logger.warning("%s %s %s failed after %.0fms", self.name, method, host, elapsed_ms)
+            raise
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        server_error = resp.status_code >= 500
+        if server_error:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        self._record(metrics, elapsed_ms, error=server_error)
+        logger.debug("%s %s %s -> %s in %.0fms", self.name, method, host, resp.status_code, elapsed_ms)
+        return resp
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def metrics(self):
+        with self._lock:
+            return {
+                host: dict(m.as_dict(), circuit=self._breakers[host].state)
+                for host, m in self._metrics.items()
+            }
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(name, **options):
+    """
+    Return the process-wide client registered under `name`, creating it with
+    `options` (see HttpClient) on first use. Later options are ignored.
+    """
+    client = _clients.get(name)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(name)
+            if client is None:
+                client = _clients[name] = HttpClient(name, **options)
+    return client
+
+
+def get_metrics():
+    """Latency/error metrics for every client in this process."""
+    return {name: client.metrics() for name, client in list(_clients.items())}
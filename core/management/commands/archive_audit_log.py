@@ -0,0 +1,33 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.retention import archive_month, expired_months
+
+
+class Command(BaseCommand):
+    help = 'Export audit log months past retention to compressed files and remove them.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None, help='Retention in days (default AUDIT_RETENTION_DAYS)')
+        parser.add_argument('--output-dir', default=None, help='Archive directory (default AUDIT_ARCHIVE_DIR)')
+        parser.add_argument('--dry-run', action='store_true', help='List the months that would be archived')
+
+    def handle(self, *args, **options):
+        days = options['days'] if options['days'] is not None else settings.AUDIT_RETENTION_DAYS
+        if days < 1:
+            raise CommandError('--days must be positive')
+        output_dir = options['output_dir'] or settings.AUDIT_ARCHIVE_DIR
+        months = expired_months(days)
+        if options['dry_run']:
+            for month in months:
+                self.stdout.write(f"{month:%Y-%m}")
+            return
+        os.makedirs(output_dir, exist_ok=True)
+        total = 0
+        for month in months:
+            count, path = archive_month(month, output_dir)
+            total += count
+            self.stdout.write(f"{month:%Y-%m}: {count} rows -> {path}")
+        self.stdout.write(self.style.SUCCESS(f"Archived {total} audit log rows from {len(months)} months"))
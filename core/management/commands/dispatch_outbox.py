@@ -0,0 +1,54 @@
+"""
+Long-running outbox dispatcher: the `outbox` process in the Procfile.
+
+Publishes the Celery tasks queued by core.outbox.enqueue(), polling every
+OUTBOX_DISPATCH_INTERVAL seconds. It runs outside Celery, so an idle
+outbox costs one indexed SELECT per interval and no broker traffic, and a
+backlogged worker queue does not delay dispatch. Several may run at once;
+each takes its own batches. Stops after the current batch on SIGTERM or
+SIGINT.
+"""
+import logging
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from core.outbox import drain
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Publish tasks queued in the outbox to Celery until stopped.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=None, help='Poll interval in seconds (default OUTBOX_DISPATCH_INTERVAL)')
+        parser.add_argument('--once', action='store_true', help='Drain the outbox once and exit')
+
+    def handle(self, *args, **options):
+        interval = options['interval'] if options['interval'] is not None else settings.OUTBOX_DISPATCH_INTERVAL
+        if interval <= 0:
+            raise CommandError('--interval must be positive')
+        if options['once']:
+            self.stdout.write(f"Dispatched {drain()} outbox messages")
+            return
+
+        stopping = threading.Event()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, lambda *args: stopping.set())
+        logger.info(f"Outbox dispatcher started, polling every {interval}s")
+        while not stopping.is_set():
+            close_old_connections()
+            try:
+                sent = drain()
+            except Exception as e:
+                # Database unavailable; try again next interval.
+                logger.error(f"Outbox dispatch failed: {e}")
+            else:
+                if sent:
+                    logger.info(f"Dispatched {sent} outbox messages")
+            stopping.wait(interval)
+        logger.info("Outbox dispatcher stopped")
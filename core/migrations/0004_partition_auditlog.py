@@ -0,0 +1,70 @@
+from datetime import date
+
+from django.db import migrations
+
+
+def partition_auditlog(apps, schema_editor):
+    """
+    PostgreSQL only: rebuild core_auditlog as a table partitioned by month
+    on created_at (see core.partitions). Existing rows are copied into
+    their monthly partitions.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    from core import partitions
+
+    AuditLog = apps.get_model('core', 'AuditLog')
+    user = AuditLog._meta.get_field('user')
+    user_table = user.related_model._meta.db_table
+    user_column = user.target_field.column
+    table = partitions.TABLE
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f"ALTER TABLE {table} RENAME TO {table}_unpartitioned")
+        # The indexes keep their names on the renamed table; free them up.
+        for index in AuditLog._meta.indexes:
+            cursor.execute(f"DROP INDEX IF EXISTS {index.name}")
+        cursor.execute(f"CREATE SEQUENCE {partitions.SEQUENCE}")
+        cursor.execute(f"""
+            CREATE TABLE {table} (
+                id bigint NOT NULL DEFAULT nextval('{partitions.SEQUENCE}'),
+                action varchar(100) NOT NULL,
+                model_name varchar(100) NOT NULL,
+                object_id varchar(100) NOT NULL,
+                details jsonb NOT NULL,
+                created_at timestamp with time zone NOT NULL,
+                user_id {user.db_type(schema_editor.connection)} NULL
+                    CONSTRAINT {table}_user_id_fk REFERENCES {user_table} ({user_column})
+                    DEFERRABLE INITIALLY DEFERRED,
+                CONSTRAINT {table}_id_created_at_pk PRIMARY KEY (id, created_at)
+            ) PARTITION BY RANGE (created_at)
+        """)
+        cursor.execute(f"ALTER SEQUENCE {partitions.SEQUENCE} OWNED BY {table}.id")
+        cursor.execute(f"CREATE TABLE {partitions.DEFAULT_PARTITION} PARTITION OF {table} DEFAULT")
+
+        cursor.execute(f"SELECT min(created_at) FROM {table}_unpartitioned")
+        oldest = cursor.fetchone()[0]
+        month = partitions.month_start(oldest) if oldest else partitions.month_start(date.today())
+        last = partitions.add_months(partitions.month_start(date.today()), 1)
+        while month <= last:
+            partitions.create_partition(cursor, month)
+            month = partitions.add_months(month, 1)
+
+        columns = 'id, action, model_name, object_id, details, created_at, user_id'
+        cursor.execute(f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {table}_unpartitioned")
+        cursor.execute(f"SELECT setval('{partitions.SEQUENCE}', (SELECT coalesce(max(id), 0) + 1 FROM {table}), false)")
+        cursor.execute(f"DROP TABLE {table}_unpartitioned")
+
+    for index in AuditLog._meta.indexes:
+        schema_editor.add_index(AuditLog, index)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_auditlog_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_auditlog, migrations.RunPython.noop),
+    ]
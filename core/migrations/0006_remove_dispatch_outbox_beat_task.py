@@ -0,0 +1,32 @@
+from django.apps import apps as global_apps
+from django.db import migrations
+from django.utils import timezone
+
+# The outbox is now dispatched by its own process (`manage.py
+# dispatch_outbox`). django_celery_beat's DatabaseScheduler never removes
+# rows for entries dropped from CELERY_BEAT_SCHEDULE, so remove it here.
+RETIRED_TASKS = ['core.tasks.dispatch_outbox']
+
+
+def remove_retired_beat_tasks(apps, schema_editor):
+    try:
+        PeriodicTask = apps.get_model('django_celery_beat', 'PeriodicTask')
+        PeriodicTasks = apps.get_model('django_celery_beat', 'PeriodicTasks')
+    except LookupError:
+        return
+    if PeriodicTask.objects.filter(task__in=RETIRED_TASKS).delete()[0]:
+        # Tells a running beat to reload its schedule.
+        PeriodicTasks.objects.update_or_create(ident=1, defaults={'last_update': timezone.now()})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_outboxmessage'),
+    ]
+    if global_apps.is_installed('django_celery_beat'):
+        dependencies.append(('django_celery_beat', '0001_initial'))
+
+    operations = [
+        migrations.RunPython(remove_retired_beat_tasks, migrations.RunPython.noop),
+    ]
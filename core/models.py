@@ -1,5 +1,6 @@
 from django.conf import settings
 from django.db import models
+from django.utils import timezone
 
 
 class AuditLog(models.Model):
@@ -8,9 +9,43 @@ class AuditLog(models.Model):
         on_delete=models.SET_NULL,
         null=True,
         related_name='audit_logs',
+        db_index=False,  # covered by core_audit_user_idx
     )
     action = models.CharField(max_length=100)
     model_name = models.CharField(max_length=100, blank=True)
     object_id = models.CharField(max_length=100, blank=True)
     details = models.JSONField(default=dict, blank=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Not auto_now_add: buffered writes (core.audit) keep the time of the event.
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        # History lookups: by object, by user, by action, newest first. On
+        # PostgreSQL the table is partitioned by month (core.partitions).
+        indexes = [
+            models.Index(fields=['model_name', 'object_id', 'created_at'], name='core_audit_object_idx'),
+            models.Index(fields=['user', 'created_at'], name='core_audit_user_idx'),
+            models.Index(fields=['action', 'created_at'], name='core_audit_action_idx'),
+        ]
+
+
+class OutboxMessage(models.Model):
+    """
+    A Celery task call recorded in the same transaction as the change that
+    causes it, and published by core.outbox.dispatch() once committed.
+    """
+    task = models.CharField(max_length=200)
+    args = models.JSONField(default=list, blank=True)
+    kwargs = models.JSONField(default=dict, blank=True)
+    eta = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    dispatched_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # The dispatcher's queue: pending messages in insertion order.
+            models.Index(fields=['id'], condition=models.Q(dispatched_at__isnull=True), name='core_outbox_pending_idx'),
+            models.Index(fields=['dispatched_at'], name='core_outbox_dispatched_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.task} #{self.pk}"
@@ -0,0 +1,84 @@
+"""
+Transactional outbox for Celery side effects.
+
+enqueue() inserts an OutboxMessage in the caller's transaction, so a task
+is queued exactly when the change that causes it commits: a rollback
+takes it back, and a broker outage cannot lose it. Requests pay one
+INSERT instead of a broker round trip. The dispatcher process
+(`manage.py dispatch_outbox`) drains pending messages every
+OUTBOX_DISPATCH_INTERVAL seconds. It publishes each batch over one broker
+connection, then marks it dispatched.
+
+Delivery is at least once. A crash between publishing and marking
+republishes the message, under the same task id (outbox-<pk>), so
+outboxed tasks must be idempotent.
+"""
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboxMessage
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue(task, *args, eta=None, **kwargs):
+    """
+    Queue `task` (a Celery task or its name) with JSON-serialisable
+    arguments, to be published once the current transaction commits.
+    """
+    return OutboxMessage.objects.create(task=getattr(task, 'name', task), args=list(args), kwargs=kwargs, eta=eta)
+
+
+def dispatch(batch_size=None):
+    """Publish one batch of pending messages. Returns how many were published."""
+    from celery import current_app
+
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+    with transaction.atomic():
+        # Concurrent dispatchers take disjoint batches.
+        messages = list(
+            OutboxMessage.objects.select_for_update(skip_locked=True)
+            .filter(dispatched_at__isnull=True).order_by('pk')[:batch_size]
+        )
+        if not messages:
+            return 0
+        sent = []
+        try:
+            with current_app.producer_or_acquire() as producer:
+                for message in messages:
+                    current_app.send_task(
+                        message.task, args=message.args, kwargs=message.kwargs, eta=message.eta,
+                        task_id=f'outbox-{message.pk}', producer=producer,
+                    )
+                    sent.append(message.pk)
+        except Exception as e:
+            logger.error(f"Outbox dispatch stopped after {len(sent)} of {len(messages)} messages: {e}")
+        OutboxMessage.objects.filter(pk__in=sent).update(dispatched_at=timezone.now())
+    return len(sent)
+
+
+def drain(batch_size=None):
+    """Dispatch batches until the outbox is empty or publishing fails. Returns the total published."""
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+    total = 0
+    while True:
+        sent = dispatch(batch_size)
+        total += sent
+        if sent < batch_size:
+            return total
+
+
+def purge(before):
+    """Delete messages dispatched before `before`, in batches. Returns the number deleted."""
+    deleted = 0
+    while True:
+        pks = list(
+            OutboxMessage.objects.filter(dispatched_at__lt=before)
+            .values_list('pk', flat=True)[:settings.OUTBOX_BATCH_SIZE]
+        )
+        if not pks:
+            return deleted
+        deleted += OutboxMessage.objects.filter(pk__in=pks).delete()[0]
@@ -0,0 +1,69 @@
+"""
+Keyset (cursor) pagination.
+
+Pages are fetched with `WHERE key > last_seen ORDER BY key LIMIT n+1`, so
+the cost of a page does not grow with its depth the way OFFSET does, and
+rows inserted mid-scroll don't shift later pages. Cursors are opaque
+url-safe strings wrapping the last key value seen.
+
+The key is one unique integer field, or a tuple of numeric fields ending
+in one (e.g. ('search_rank', 'pk')) for orders with ties.
+"""
+import base64
+import binascii
+import math
+
+from django.db.models import Q
+
+
+def encode_cursor(value):
+    if isinstance(value, tuple):
+        value = ','.join(repr(v) for v in value)
+    return base64.urlsafe_b64encode(str(value).encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, key='pk'):
+    """
+    Return the key value in `cursor` (an int, or a tuple for a composite
+    `key`), or None if missing or malformed.
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        text = base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8')
+        if not isinstance(key, tuple):
+            return int(text)
+        *leading, last = text.split(',')
+        values = (*(float(v) for v in leading), int(last))
+    except (ValueError, binascii.Error, UnicodeError):
+        return None
+    if len(values) != len(key) or not all(math.isfinite(v) for v in values):
+        return None
+    return values
+
+
+def _after(keys, values):
+    """Q for rows after `values` in ascending `keys` order: (a, b) > (x, y) is a > x or (a = x and b > y)."""
+    q = Q(**{f"{keys[-1]}__gt": values[-1]})
+    for k, v in zip(reversed(keys[:-1]), reversed(values[:-1])):
+        q = Q(**{f"{k}__gt": v}) | (Q(**{k: v}) & q)
+    return q
+
+
+def keyset_page(queryset, cursor=None, page_size=24, key='pk'):
+    """
+    Return (items, next_cursor) for one page of `queryset` ordered by the
+    unique, ascending `key`. next_cursor is None on the last page.
+    """
+    after = decode_cursor(cursor, key)
+    keys = key if isinstance(key, tuple) else (key,)
+    qs = queryset.order_by(*keys)
+    if after is not None:
+        qs = qs.filter(_after(keys, after if isinstance(key, tuple) else (after,)))
+    items = list(qs[:page_size + 1])
+    if len(items) <= page_size:
+        return items, None
+    items = items[:page_size]
+    last = tuple(getattr(items[-1], k) for k in keys)
+    return items, encode_cursor(last if isinstance(key, tuple) else last[0])
@@ -0,0 +1,121 @@
+"""
+Monthly range partitions of the audit log on PostgreSQL.
+
+Migration 0004 turns core_auditlog into a table partitioned by
+created_at, with primary key (id, created_at), one partition per month
+(core_auditlog_yYYYYmMM) and a DEFAULT partition for anything outside
+them. maintain() runs daily from core.tasks. It creates partitions for
+the coming AUDIT_PARTITION_MONTHS_AHEAD months, so the default partition
+stays empty. It also applies the AUDIT_DETAILS_GIN_INDEX option. Expired
+months are exported and then dropped whole by `manage.py
+archive_audit_log`.
+
+On other databases the audit log stays a plain table and these helpers
+do nothing.
+"""
+import logging
+from datetime import date, datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+TABLE = 'core_auditlog'
+DEFAULT_PARTITION = f'{TABLE}_default'
+SEQUENCE = f'{TABLE}_partitioned_id_seq'
+GIN_INDEX = 'core_audit_details_gin'
+
+
+def month_start(value):
+    return date(value.year, value.month, 1)
+
+
+def add_months(month, n):
+    index = month.year * 12 + month.month - 1 + n
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_bounds(month):
+    """[start, end) of `month` as UTC datetimes."""
+    start = datetime(month.year, month.month, 1, tzinfo=dt_timezone.utc)
+    end = add_months(month, 1)
+    return start, datetime(end.year, end.month, 1, tzinfo=dt_timezone.utc)
+
+
+def partition_name(month):
+    return f'{TABLE}_y{month:%Y}m{month:%m}'
+
+
+def is_partitioned(using=connection):
+    if using.vendor != 'postgresql':
+        return False
+    with using.cursor() as cursor:
+        cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", [TABLE])
+        row = cursor.fetchone()
+    return row is not None and row[0] == 'p'
+
+
+def partition_exists(month, using=connection):
+    with using.cursor() as cursor:
+        cursor.execute("SELECT to_regclass(%s) IS NOT NULL", [partition_name(month)])
+        return cursor.fetchone()[0]
+
+
+def partition_months(using=connection):
+    """Months that have a partition, oldest first."""
+    with using.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(%s)", [TABLE],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+    prefix = f'{TABLE}_y'
+    return sorted(
+        date(int(name[len(prefix):len(prefix) + 4]), int(name[-2:]), 1)
+        for name in names if name.startswith(prefix)
+    )
+
+
+def default_partition_months(before, using=connection):
+    """Months with rows in the DEFAULT partition older than `before`, oldest first."""
+    with using.cursor() as cursor:
+        cursor.execute(
+            f"SELECT DISTINCT date_trunc('month', created_at AT TIME ZONE 'UTC') "
+            f"FROM {DEFAULT_PARTITION} WHERE created_at < %s", [before],
+        )
+        return sorted(month_start(row[0]) for row in cursor.fetchall())
+
+
+def create_partition(cursor, month):
+    start, end = month_bounds(month)
+    # Bounds are generated dates, not user input.
+    cursor.execute(
+        f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF {TABLE} "
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    )
+
+
+def drop_partition(month, using=connection):
+    """Detach and drop `month`'s partition; its rows must be archived first."""
+    with using.cursor() as cursor:
+        cursor.execute(f"ALTER TABLE {TABLE} DETACH PARTITION {partition_name(month)}")
+        cursor.execute(f"DROP TABLE {partition_name(month)}")
+    logger.info(f"Dropped audit log partition {partition_name(month)}")
+
+
+def maintain(today=None, using=connection):
+    """Create upcoming monthly partitions and apply the GIN index option."""
+    if using.vendor != 'postgresql':
+        return
+    with using.cursor() as cursor:
+        if is_partitioned(using):
+            this_month = month_start(today or date.today())
+            for n in range(settings.AUDIT_PARTITION_MONTHS_AHEAD + 1):
+                create_partition(cursor, add_months(this_month, n))
+        # On a partitioned table the index cascades to every partition,
+        # present and future. jsonb_path_ops serves details__contains lookups.
+        if settings.AUDIT_DETAILS_GIN_INDEX:
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {GIN_INDEX} ON {TABLE} USING gin (details jsonb_path_ops)")
+        else:
+            cursor.execute(f"DROP INDEX IF EXISTS {GIN_INDEX}")
@@ -0,0 +1,81 @@
+"""
+Audit log retention: whole months older than AUDIT_RETENTION_DAYS are
+exported to gzipped JSON lines (auditlog-YYYY-MM.jsonl.gz, one AuditLog
+row per line) and then removed. On a partitioned table (core.partitions)
+removal drops the month's partition, which is instant at any size.
+Elsewhere, and for rows that landed in the DEFAULT partition, it deletes
+the rows in batches. A month archived again (a recovered write journal
+can deliver old rows late) gets a new numbered file; exports are never
+overwritten.
+"""
+import gzip
+import itertools
+import json
+import logging
+import os
+from datetime import timedelta, timezone as dt_timezone
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection
+from django.utils import timezone
+
+from . import partitions
+from .models import AuditLog
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FIELDS = ('id', 'user_id', 'action', 'model_name', 'object_id', 'details', 'created_at')
+DELETE_BATCH = 10000
+
+
+def expired_months(retention_days, now=None):
+    """Months with audit rows that ended more than `retention_days` ago, oldest first."""
+    now = now or timezone.now()
+    cutoff = partitions.month_start(now - timedelta(days=retention_days))
+    start, _ = partitions.month_bounds(cutoff)
+    if partitions.is_partitioned(connection):
+        months = {month for month in partitions.partition_months() if month < cutoff}
+        months.update(partitions.default_partition_months(start))
+        return sorted(months)
+    months = AuditLog.objects.filter(created_at__lt=start).datetimes('created_at', 'month', tzinfo=dt_timezone.utc)
+    return [partitions.month_start(month) for month in months]
+
+
+def archive_month(month, output_dir):
+    """Export `month`'s rows to `output_dir`, then remove them. Returns (rows, path)."""
+    start, end = partitions.month_bounds(month)
+    rows = AuditLog.objects.filter(created_at__gte=start, created_at__lt=end).order_by()
+    tmp = os.path.join(output_dir, f'auditlog-{month:%Y-%m}.{os.getpid()}.tmp')
+    count = 0
+    # Written aside and linked into place, so an archive file is always complete.
+    with gzip.open(tmp, 'wt', encoding='utf-8') as f:
+        for row in rows.values(*EXPORT_FIELDS).iterator(chunk_size=DELETE_BATCH):
+            f.write(json.dumps(row, cls=DjangoJSONEncoder) + '\n')
+            count += 1
+    try:
+        path = _link_unique(tmp, output_dir, f'auditlog-{month:%Y-%m}')
+    finally:
+        os.remove(tmp)
+
+    if partitions.is_partitioned(connection) and partitions.partition_exists(month):
+        partitions.drop_partition(month)
+    else:
+        while True:
+            batch = list(rows.values_list('pk', flat=True)[:DELETE_BATCH])
+            if not batch:
+                break
+            AuditLog.objects.filter(pk__in=batch).delete()
+    logger.info(f"Archived {count} audit log rows for {month:%Y-%m} to {path}")
+    return count, path
+
+
+def _link_unique(src, output_dir, stem):
+    """Link `src` as stem.jsonl.gz, or stem.1.jsonl.gz etc. if taken. Returns the path."""
+    for n in itertools.count():
+        path = os.path.join(output_dir, f'{stem}.jsonl.gz' if n == 0 else f'{stem}.{n}.jsonl.gz')
+        try:
+            # Unlike a rename, fails rather than replacing an earlier export.
+            os.link(src, path)
+            return path
+        except FileExistsError:
+            continue
@@ -0,0 +1,28 @@
+"""
+Celery tasks for core: audit log upkeep and the task outbox.
+"""
+
+import logging
+from celery import shared_task
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def maintain_audit_partitions():
+    """Daily: create the coming months' audit log partitions (PostgreSQL)."""
+    from .partitions import maintain
+
+    maintain()
+
+
+@shared_task
+def purge_outbox():
+    """Daily: delete outbox messages dispatched over OUTBOX_RETENTION_HOURS ago."""
+    from datetime import timedelta
+    from django.conf import settings
+    from django.utils import timezone
+    from .outbox import purge
+
+    deleted = purge(timezone.now() - timedelta(hours=settings.OUTBOX_RETENTION_HOURS))
+    logger.info(f"Purged {deleted} dispatched outbox messages")
@@ -0,0 +1,16 @@
+"""
+Gunicorn hooks, loaded automatically from the project root by every
+gunicorn command (web and events processes). Command-line options still
+configure the server itself.
+"""
+
+
+def post_worker_init(worker):
+    # Each worker buffers its own audit/timeline rows (see core.batching).
+    from core import batching
+    batching.start()
+
+
+def worker_exit(server, worker):
+    from core import batching
+    batching.stop()
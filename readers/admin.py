@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import ReaderProfile, ReaderRate, ReaderAvailability
+from .models import ReaderProfile, ReaderRate, ReaderAvailability, ReaderSpecialty, SpecialtyTag
+from .caching import invalidate_directory, invalidate_profile
+from .indexing import refresh_reader_index
 
 
 class ReaderRateInline(admin.TabularInline):
@@ -12,8 +14,27 @@ class ReaderAvailabilityInline(admin.TabularInline):
     extra = 1
 
 
+class ReaderSpecialtyInline(admin.TabularInline):
+    model = ReaderSpecialty
+    extra = 1
+    autocomplete_fields = ('tag',)
+
+
 @admin.register(ReaderProfile)
 class ReaderProfileAdmin(admin.ModelAdmin):
     list_display = ('slug', 'user', 'is_verified')
     list_filter = ('is_verified',)
-    inlines = [ReaderRateInline, ReaderAvailabilityInline]
+    inlines = [ReaderRateInline, ReaderAvailabilityInline, ReaderSpecialtyInline]
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        refresh_reader_index(form.instance.pk)
+        invalidate_directory()
+        invalidate_profile(form.instance.pk)
+
+
+@admin.register(SpecialtyTag)
+class SpecialtyTagAdmin(admin.ModelAdmin):
+    list_display = ('name', 'slug')
+    search_fields = ('name', 'slug')
+    prepopulated_fields = {'slug': ('name',)}
@@ -0,0 +1,7 @@
+from django.urls import path
+from .api_views import available_readers, presence_heartbeat
+
+urlpatterns = [
+    path('presence/', presence_heartbeat, name='api_reader_presence'),
+    path('available/', available_readers, name='api_available_readers'),
+]
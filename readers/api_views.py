@@ -0,0 +1,68 @@
+"""
+JSON endpoints for reader presence.
+"""
+import json
+import logging
+
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET, require_POST
+
+from . import presence
+from .models import ReaderProfile
+
+logger = logging.getLogger(__name__)
+
+
+@login_required
+@require_POST
+def presence_heartbeat(request):
+    """
+    Reader heartbeat. Send every PRESENCE_HEARTBEAT_TTL/3 seconds or so.
+
+    POST /api/readers/presence/
+    {"status": "online" | "busy" | "offline", "modalities": ["voice", ...]}
+    modalities defaults to every modality the reader has a rate for.
+    """
+    reader = ReaderProfile.objects.filter(user=request.user).only('pk').first()
+    if reader is None:
+        return JsonResponse({'error': 'Only readers can report presence'}, status=403)
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+    status = data.get('status', 'online')
+    if status not in presence.STATUSES:
+        return JsonResponse({'error': f'Unknown status {status}'}, status=400)
+    modalities = data.get('modalities')
+    if modalities is None:
+        modalities = reader.rates.values_list('modality', flat=True)
+    elif not isinstance(modalities, list):
+        return JsonResponse({'error': 'modalities must be a list'}, status=400)
+    else:
+        unknown = [m for m in modalities if not isinstance(m, str) or m not in presence.MODALITIES]
+        if unknown:
+            return JsonResponse({'error': f'Unknown modality {unknown[0]!r}'}, status=400)
+
+    presence.heartbeat(request.user.id, status, modalities)
+    return JsonResponse({
+        'success': True,
+        'status': presence.reader_statuses([request.user.id]).get(request.user.id, 'offline'),
+    })
+
+
+@require_GET
+def available_readers(request):
+    """
+    Readers online and free right now.
+
+    GET /api/readers/available/?modality=voice
+    """
+    modality = request.GET.get('modality') or None
+    if modality and modality not in presence.MODALITIES:
+        return JsonResponse({'error': f'Unknown modality {modality}'}, status=400)
+    user_ids = presence.available_reader_ids(modality)
+    readers = ReaderProfile.objects.filter(user_id__in=user_ids).order_by('pk').values('pk', 'slug')
+    return JsonResponse({
+        'readers': [{'id': r['pk'], 'slug': r['slug']} for r in readers],
+    })
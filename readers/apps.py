@@ -5,3 +5,6 @@ class ReadersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'readers'
     verbose_name = 'Readers'
+
+    def ready(self):
+        from . import signals  # noqa: F401
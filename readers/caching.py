@@ -0,0 +1,83 @@
+"""
+Versioned cache keys for public reader pages.
+
+Cached fragments embed a version number; changing a reader bumps the
+version, so stale entries are never read again and simply expire.
+The directory shares one version; each reader's profile page has its own,
+keyed by reader id so renamed slugs are invalidated too.
+"""
+import hashlib
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core.cache_versions import bump_version, get_version
+
+logger = logging.getLogger(__name__)
+
+DIRECTORY_VERSION_KEY = 'readers:directory:version'
+
+
+def directory_cache_ttl():
+    return getattr(settings, 'READER_DIRECTORY_CACHE_TTL', 300)
+
+
+def directory_fragment_key(params):
+    """Cache key for a directory results fragment, or None if the cache is down."""
+    version = get_version(DIRECTORY_VERSION_KEY)
+    if version is None:
+        return None
+    digest = hashlib.sha1(repr(params).encode('utf-8')).hexdigest()
+    return f"readers:directory:v{version}:{digest}"
+
+
+def invalidate_directory():
+    bump_version(DIRECTORY_VERSION_KEY)
+
+
+def _profile_version_key(reader_id):
+    return f"readers:profile:version:{reader_id}"
+
+
+def _profile_key(slug):
+    return f"readers:profile:{slug}"
+
+
+def profile_cache_ttl():
+    return getattr(settings, 'READER_PROFILE_CACHE_TTL', 600)
+
+
+def get_profile_fragment(slug):
+    """Return the cached fragment dict for `slug` (see set_profile_fragment) if still current."""
+    try:
+        entry = cache.get(_profile_key(slug))
+    except Exception as e:
+        logger.debug("Cache unavailable for profile %s: %s", slug, e)
+        return None
+    if not entry:
+        return None
+    if get_version(_profile_version_key(entry['reader_id'])) != entry['version']:
+        return None
+    return entry
+
+
+def set_profile_fragment(slug, version, data):
+    """
+    Cache a rendered profile built while `version` was current. `data` must
+    include 'reader_id'; everything else is returned as-is on a hit.
+    """
+    if version is None:
+        return
+    try:
+        cache.set(_profile_key(slug), dict(data, version=version), profile_cache_ttl())
+    except Exception as e:
+        logger.debug("Could not cache profile %s: %s", slug, e)
+
+
+def profile_version(reader_id):
+    return get_version(_profile_version_key(reader_id))
+
+
+def invalidate_profile(reader_id):
+    bump_version(_profile_version_key(reader_id))
@@ -0,0 +1,90 @@
+"""
+Maintenance of ReaderSearchIndex, the denormalized reader directory table.
+
+Signals in readers.signals call refresh_reader_index() for the one reader
+whose profile, reviews or rates changed. Bulk queryset updates/deletes bypass
+signals; run `manage.py rebuild_reader_index` after those.
+"""
+import logging
+from django.db.models import Avg, Count
+from .models import MODALITY_CHOICES, ReaderProfile, ReaderRate, ReaderSearchIndex, ReaderSpecialty, Review
+
+logger = logging.getLogger(__name__)
+
+MODALITIES = [m for m, _ in MODALITY_CHOICES]
+RATE_FIELDS = {m: f"{m}_rate" for m in MODALITIES}
+INDEX_UPDATE_FIELDS = [
+    'display_name', 'specialties', 'bio', 'is_verified', 'avg_rating', 'review_count',
+    'text_rate', 'voice_rate', 'video_rate', 'min_rate', 'max_rate',
+]
+
+
+def _display_name(reader):
+    profile = getattr(reader.user, 'profile', None)
+    name = profile.display_name if profile else ''
+    return (name or reader.user.get_full_name() or reader.slug)[:150]
+
+
+def _index_row(reader, stats, rates, tag_names):
+    """Build (unsaved) index row from a reader, its review stats, {modality: rate} and tag names."""
+    values = [r for r in rates.values() if r is not None]
+    row = ReaderSearchIndex(
+        reader=reader,
+        display_name=_display_name(reader),
+        specialties=', '.join(sorted(tag_names))[:500],
+        bio=reader.bio,
+        is_verified=reader.is_verified,
+        avg_rating=float(stats.get('avg') or 0),
+        review_count=stats.get('count') or 0,
+        min_rate=min(values) if values else None,
+        max_rate=max(values) if values else None,
+    )
+    for modality, field in RATE_FIELDS.items():
+        setattr(row, field, rates.get(modality))
+    return row
+
+
+def refresh_reader_index(reader_id):
+    """Recompute the index row for one reader."""
+    reader = ReaderProfile.objects.select_related('user__profile').filter(pk=reader_id).first()
+    if reader is None:
+        ReaderSearchIndex.objects.filter(reader_id=reader_id).delete()
+        return None
+    stats = Review.objects.filter(reader_id=reader_id).aggregate(avg=Avg('rating'), count=Count('id'))
+    rates = dict(ReaderRate.objects.filter(reader_id=reader_id).values_list('modality', 'rate_per_minute'))
+    tag_names = ReaderSpecialty.objects.filter(reader_id=reader_id).values_list('tag__name', flat=True)
+    row = _index_row(reader, stats, rates, tag_names)
+    ReaderSearchIndex.objects.update_or_create(
+        reader_id=reader_id,
+        defaults={f: getattr(row, f) for f in INDEX_UPDATE_FIELDS},
+    )
+    return row
+
+
+def rebuild_reader_index(batch_size=1000):
+    """Rebuild every index row with four grouped queries plus batched upserts."""
+    stats = {
+        r['reader_id']: r
+        for r in Review.objects.values('reader_id').annotate(avg=Avg('rating'), count=Count('id'))
+    }
+    rates = {}
+    for reader_id, modality, rate in ReaderRate.objects.values_list('reader_id', 'modality', 'rate_per_minute'):
+        rates.setdefault(reader_id, {})[modality] = rate
+    tag_names = {}
+    for reader_id, name in ReaderSpecialty.objects.values_list('reader_id', 'tag__name'):
+        tag_names.setdefault(reader_id, []).append(name)
+
+    rows = [
+        _index_row(reader, stats.get(reader.pk, {}), rates.get(reader.pk, {}), tag_names.get(reader.pk, []))
+        for reader in ReaderProfile.objects.select_related('user__profile').iterator(chunk_size=batch_size)
+    ]
+    ReaderSearchIndex.objects.bulk_create(
+        rows,
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=['reader'],
+        update_fields=INDEX_UPDATE_FIELDS,
+    )
+    ReaderSearchIndex.objects.exclude(reader_id__in=[r.reader_id for r in rows]).delete()
+    logger.info("Rebuilt reader search index (%d readers)", len(rows))
+    return len(rows)
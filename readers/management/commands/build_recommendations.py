@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from readers.recommendations import NEIGHBORS, TOP_K, build_recommendations
+
+
+class Command(BaseCommand):
+    help = 'Recompute reader recommendations for every client (normally run nightly by Celery beat).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int, default=TOP_K)
+        parser.add_argument('--neighbors', type=int, default=NEIGHBORS)
+
+    def handle(self, *args, **options):
+        if options['top_k'] < 1 or options['neighbors'] < 1:
+            raise CommandError('--top-k and --neighbors must be positive')
+        count = build_recommendations(k=options['top_k'], neighbors=options['neighbors'])
+        self.stdout.write(self.style.SUCCESS(f"Stored {count} recommendations"))
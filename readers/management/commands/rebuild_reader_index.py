@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from readers.indexing import rebuild_reader_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the denormalized reader search index from profiles, reviews and rates.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        count = rebuild_reader_index(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} readers"))
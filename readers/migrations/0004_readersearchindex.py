@@ -0,0 +1,75 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Avg, Count
+
+
+def populate_index(apps, schema_editor):
+    ReaderProfile = apps.get_model('readers', 'ReaderProfile')
+    ReaderRate = apps.get_model('readers', 'ReaderRate')
+    Review = apps.get_model('readers', 'Review')
+    ReaderSearchIndex = apps.get_model('readers', 'ReaderSearchIndex')
+    UserProfile = apps.get_model('accounts', 'UserProfile')
+
+    stats = {
+        r['reader_id']: r
+        for r in Review.objects.values('reader_id').annotate(avg=Avg('rating'), count=Count('id'))
+    }
+    rates = {}
+    for reader_id, modality, rate in ReaderRate.objects.values_list('reader_id', 'modality', 'rate_per_minute'):
+        rates.setdefault(reader_id, {})[modality] = rate
+    display_names = dict(UserProfile.objects.values_list('user_id', 'display_name'))
+
+    rows = []
+    for reader in ReaderProfile.objects.select_related('user'):
+        reader_rates = rates.get(reader.pk, {})
+        values = list(reader_rates.values())
+        name = display_names.get(reader.user_id) or f"{reader.user.first_name} {reader.user.last_name}".strip()
+        rows.append(ReaderSearchIndex(
+            reader_id=reader.pk,
+            display_name=(name or reader.slug)[:150],
+            specialties=reader.specialties,
+            is_verified=reader.is_verified,
+            avg_rating=float(stats.get(reader.pk, {}).get('avg') or 0),
+            review_count=stats.get(reader.pk, {}).get('count') or 0,
+            text_rate=reader_rates.get('text'),
+            voice_rate=reader_rates.get('voice'),
+            video_rate=reader_rates.get('video'),
+            min_rate=min(values) if values else None,
+            max_rate=max(values) if values else None,
+        ))
+    ReaderSearchIndex.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('readers', '0003_readeravailability_day_choices'),
+        ('accounts', '0002_userprofile_display_name_userprofile_phone'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReaderSearchIndex',
+            fields=[
+                ('reader', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_index', serialize=False, to='readers.readerprofile')),
+                ('display_name', models.CharField(blank=True, max_length=150)),
+                ('specialties', models.CharField(blank=True, max_length=500)),
+                ('is_verified', models.BooleanField(default=False)),
+                ('avg_rating', models.FloatField(default=0)),
+                ('review_count', models.PositiveIntegerField(default=0)),
+                ('text_rate', models.DecimalField(blank=True, decimal_places=2, max_digits=8, null=True)),
+                ('voice_rate', models.DecimalField(blank=True, decimal_places=2, max_digits=8, null=True)),
+                ('video_rate', models.DecimalField(blank=True, decimal_places=2, max_digits=8, null=True)),
+                ('min_rate', models.DecimalField(blank=True, decimal_places=2, max_digits=8, null=True)),
+                ('max_rate', models.DecimalField(blank=True, decimal_places=2, max_digits=8, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Reader search index',
+                'indexes': [models.Index(fields=['is_verified', '-avg_rating'], name='readers_idx_verified_rating'), models.Index(fields=['is_verified', '-review_count'], name='readers_idx_verified_reviews'), models.Index(fields=['is_verified', 'min_rate'], name='readers_idx_verified_minrate')],
+            },
+        ),
+        migrations.RunPython(populate_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,99 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:02
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+# Full-text objects queried by readers.search. Kept here rather than
+# imported, so later changes to the app code don't change this migration.
+INDEX_TABLE = 'readers_readersearchindex'
+FTS_TABLE = 'readers_readersearch_fts'
+
+POSTGRES_INSTALL = [
+    f"""
+    ALTER TABLE {INDEX_TABLE} ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(display_name, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(specialties, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(bio, '')), 'C')
+    ) STORED
+    """,
+    f"CREATE INDEX IF NOT EXISTS readers_idx_search_vector ON {INDEX_TABLE} USING GIN (search_vector)",
+]
+POSTGRES_UNINSTALL = [
+    "DROP INDEX IF EXISTS readers_idx_search_vector",
+    f"ALTER TABLE {INDEX_TABLE} DROP COLUMN IF EXISTS search_vector",
+]
+
+_FTS_COLUMNS = 'display_name, specialties, bio'
+SQLITE_INSTALL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        {_FTS_COLUMNS}, content='{INDEX_TABLE}', content_rowid='reader_id',
+        tokenize='porter unicode61'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS readers_search_ai AFTER INSERT ON {INDEX_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, {_FTS_COLUMNS})
+        VALUES (new.reader_id, new.display_name, new.specialties, new.bio);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS readers_search_ad AFTER DELETE ON {INDEX_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {_FTS_COLUMNS})
+        VALUES ('delete', old.reader_id, old.display_name, old.specialties, old.bio);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS readers_search_au AFTER UPDATE ON {INDEX_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {_FTS_COLUMNS})
+        VALUES ('delete', old.reader_id, old.display_name, old.specialties, old.bio);
+        INSERT INTO {FTS_TABLE}(rowid, {_FTS_COLUMNS})
+        VALUES (new.reader_id, new.display_name, new.specialties, new.bio);
+    END
+    """,
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+SQLITE_UNINSTALL = [
+    "DROP TRIGGER IF EXISTS readers_search_ai",
+    "DROP TRIGGER IF EXISTS readers_search_ad",
+    "DROP TRIGGER IF EXISTS readers_search_au",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+
+def copy_bio(apps, schema_editor):
+    ReaderProfile = apps.get_model('readers', 'ReaderProfile')
+    ReaderSearchIndex = apps.get_model('readers', 'ReaderSearchIndex')
+    ReaderSearchIndex.objects.update(
+        bio=Subquery(ReaderProfile.objects.filter(pk=OuterRef('reader_id')).values('bio')[:1])
+    )
+
+
+def create_fulltext(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for sql in {'postgresql': POSTGRES_INSTALL, 'sqlite': SQLITE_INSTALL}.get(vendor, []):
+        schema_editor.execute(sql)
+
+
+def drop_fulltext(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for sql in {'postgresql': POSTGRES_UNINSTALL, 'sqlite': SQLITE_UNINSTALL}.get(vendor, []):
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('readers', '0004_readersearchindex'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='readersearchindex',
+            name='bio',
+            field=models.TextField(blank=True),
+        ),
+        migrations.RunPython(copy_bio, migrations.RunPython.noop),
+        migrations.RunPython(create_fulltext, drop_fulltext),
+    ]
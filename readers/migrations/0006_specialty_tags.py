@@ -0,0 +1,98 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils.text import slugify
+
+
+def parse_specialties(raw):
+    """Split a comma-separated specialty string into {slug: name}, first spelling wins (as readers.tags did)."""
+    tags = {}
+    for part in (raw or '').split(','):
+        name = ' '.join(part.split())[:100]
+        slug = slugify(name)[:100]
+        if slug:
+            tags.setdefault(slug, name)
+    return tags
+
+
+def specialties_to_tags(apps, schema_editor):
+    ReaderProfile = apps.get_model('readers', 'ReaderProfile')
+    SpecialtyTag = apps.get_model('readers', 'SpecialtyTag')
+    ReaderSpecialty = apps.get_model('readers', 'ReaderSpecialty')
+
+    parsed = {
+        reader_id: parse_specialties(raw)
+        for reader_id, raw in ReaderProfile.objects.exclude(specialties='').values_list('pk', 'specialties')
+    }
+    names = {}
+    for tags in parsed.values():
+        for slug, name in tags.items():
+            names.setdefault(slug, name)
+    SpecialtyTag.objects.bulk_create([SpecialtyTag(slug=slug, name=name) for slug, name in names.items()], batch_size=1000)
+    tag_ids = dict(SpecialtyTag.objects.values_list('slug', 'pk'))
+    ReaderSpecialty.objects.bulk_create(
+        [ReaderSpecialty(reader_id=reader_id, tag_id=tag_ids[slug])
+         for reader_id, tags in parsed.items() for slug in tags],
+        batch_size=1000,
+    )
+
+
+def tags_to_specialties(apps, schema_editor):
+    ReaderProfile = apps.get_model('readers', 'ReaderProfile')
+    ReaderSpecialty = apps.get_model('readers', 'ReaderSpecialty')
+    names = {}
+    for reader_id, name in ReaderSpecialty.objects.order_by('tag__name').values_list('reader_id', 'tag__name'):
+        names.setdefault(reader_id, []).append(name)
+    for reader_id, tag_names in names.items():
+        ReaderProfile.objects.filter(pk=reader_id).update(specialties=', '.join(tag_names)[:500])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('readers', '0005_readersearchindex_fulltext'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SpecialtyTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('slug', models.SlugField(max_length=100, unique=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ReaderSpecialty',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reader', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='specialty_links', to='readers.readerprofile')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reader_links', to='readers.specialtytag')),
+            ],
+            options={
+                'verbose_name_plural': 'Reader specialties',
+            },
+        ),
+        migrations.AddField(
+            model_name='readerprofile',
+            name='tags',
+            field=models.ManyToManyField(blank=True, related_name='readers', through='readers.ReaderSpecialty', to='readers.specialtytag'),
+        ),
+        migrations.AddIndex(
+            model_name='readerspecialty',
+            index=models.Index(fields=['tag', 'reader'], name='readers_idx_tag_reader'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='readerspecialty',
+            unique_together={('reader', 'tag')},
+        ),
+        migrations.RunPython(specialties_to_tags, tags_to_specialties),
+        migrations.RemoveField(
+            model_name='readerprofile',
+            name='specialties',
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:12
+
+import readers.models
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def mark_slots_stale(apps, schema_editor):
+    ReaderProfile = apps.get_model('readers', 'ReaderProfile')
+    ReaderProfile.objects.filter(availability__isnull=False).distinct().update(
+        availability_updated_at=timezone.now(),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('readers', '0007_reader_recommendation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='readerprofile',
+            name='availability_updated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='readerprofile',
+            name='slots_synced_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='readerprofile',
+            name='timezone',
+            field=models.CharField(default='UTC', help_text='IANA zone the weekly availability is expressed in', max_length=64, validators=[readers.models.validate_timezone]),
+        ),
+        migrations.RunPython(mark_slots_stale, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,8 @@
 from decimal import Decimal
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
 from django.conf import settings
+from django.core.exceptions import ValidationError
 from django.db import models
 from django.urls import reverse
 
@@ -10,6 +13,13 @@ MODALITY_CHOICES = [
 ]
 
 
+def validate_timezone(value):
+    try:
+        ZoneInfo(value)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValidationError(f"Unknown time zone: {value}")
+
+
 class ReaderProfile(models.Model):
     user = models.OneToOneField(
         settings.AUTH_USER_MODEL,
@@ -19,9 +29,20 @@ class ReaderProfile(models.Model):
     slug = models.SlugField(unique=True, db_index=True)
     bio = models.TextField(blank=True)
     avatar_url = models.URLField(blank=True)
-    specialties = models.CharField(max_length=500, blank=True, help_text='Comma-separated tags')
+    tags = models.ManyToManyField(
+        'SpecialtyTag',
+        through='ReaderSpecialty',
+        related_name='readers',
+        blank=True,
+    )
     is_verified = models.BooleanField(default=False)
     stripe_connect_account_id = models.CharField(max_length=255, blank=True, db_index=True)
+    timezone = models.CharField(max_length=64, default='UTC', validators=[validate_timezone],
+                                help_text='IANA zone the weekly availability is expressed in')
+    # Slot materialization bookkeeping (scheduling.slots): slots are stale
+    # while availability_updated_at is later than slots_synced_at.
+    availability_updated_at = models.DateTimeField(null=True, blank=True)
+    slots_synced_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -31,10 +52,38 @@ class ReaderProfile(models.Model):
     def get_absolute_url(self):
         return reverse('reader_detail', kwargs={'slug': self.slug})
 
+    def get_zoneinfo(self):
+        try:
+            return ZoneInfo(self.timezone)
+        except (ZoneInfoNotFoundError, ValueError):
+            return ZoneInfo('UTC')
+
     def get_specialties_list(self):
-        if not self.specialties:
-            return []
-        return [s.strip() for s in self.specialties.split(',') if s.strip()]
+        """Specialty names; uses prefetched tags when available."""
+        return sorted(tag.name for tag in self.tags.all())
+
+
+class SpecialtyTag(models.Model):
+    """Normalized specialty; `slug` is the matching key (see readers.tags)."""
+    name = models.CharField(max_length=100)
+    slug = models.SlugField(max_length=100, unique=True)
+
+    class Meta:
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+
+class ReaderSpecialty(models.Model):
+    reader = models.ForeignKey(ReaderProfile, on_delete=models.CASCADE, related_name='specialty_links')
+    tag = models.ForeignKey(SpecialtyTag, on_delete=models.CASCADE, related_name='reader_links')
+
+    class Meta:
+        verbose_name_plural = 'Reader specialties'
+        unique_together = [('reader', 'tag')]
+        # Inverted index: tag -> readers, used for multi-specialty intersection
+        indexes = [models.Index(fields=['tag', 'reader'], name='readers_idx_tag_reader')]
 
 
 class ReaderRate(models.Model):
@@ -98,3 +147,65 @@ class Favorite(models.Model):
 
     class Meta:
         unique_together = [('client', 'reader')]
+
+
+class ReaderSearchIndex(models.Model):
+    """
+    Denormalized directory row per reader, kept current by readers.indexing.
+    Lets listings filter and sort on rating, price and modality in one query
+    instead of aggregating reviews and rates per reader.
+    """
+    reader = models.OneToOneField(
+        ReaderProfile,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='search_index',
+    )
+    display_name = models.CharField(max_length=150, blank=True)
+    specialties = models.CharField(max_length=500, blank=True)
+    bio = models.TextField(blank=True)
+    is_verified = models.BooleanField(default=False)
+    avg_rating = models.FloatField(default=0)
+    review_count = models.PositiveIntegerField(default=0)
+    text_rate = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True)
+    voice_rate = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True)
+    video_rate = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True)
+    min_rate = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True)
+    max_rate = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'Reader search index'
+        indexes = [
+            models.Index(fields=['is_verified', '-avg_rating'], name='readers_idx_verified_rating'),
+            models.Index(fields=['is_verified', '-review_count'], name='readers_idx_verified_reviews'),
+            models.Index(fields=['is_verified', 'min_rate'], name='readers_idx_verified_minrate'),
+        ]
+
+    def __str__(self):
+        return f"Index({self.reader_id})"
+
+    def rate_for(self, modality):
+        return getattr(self, f"{modality}_rate", None)
+
+
+class ReaderRecommendation(models.Model):
+    """
+    Precomputed "readers you may like" for a client, rebuilt nightly by
+    readers.recommendations. One row per (client, rank).
+    """
+    client = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='reader_recommendations',
+    )
+    reader = models.ForeignKey(ReaderProfile, on_delete=models.CASCADE, related_name='+')
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        ordering = ['client', 'rank']
+        unique_together = [('client', 'rank')]
+
+    def __str__(self):
+        return f"Recommendation({self.client_id} #{self.rank} -> {self.reader_id})"
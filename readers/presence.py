@@ -0,0 +1,217 @@
+"""
+Real-time reader presence ("available now").
+
+Readers heartbeat while the app is open; each heartbeat keeps them in one
+sorted set per modality they accept, scored by expiry. Session state changes
+(see readers.signals) put a reader in the in-session set until their last
+live session ends. Available readers for a modality are then
+
+    live(avail:<modality>) - live(busy) - live(in_session)
+
+which costs O(online readers), never a join against sessions.
+
+Presence lives in Redis (PRESENCE_REDIS_URL, defaulting to CACHE_URL) so all
+workers share it. Without Redis a per-process in-memory store is used, which
+is only correct for single-process development servers.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+MODALITIES = ('text', 'voice', 'video')
+STATUSES = ('online', 'busy', 'offline')
+# Session states in which the reader is occupied with a client.
+BUSY_SESSION_STATES = ('waiting', 'active', 'paused', 'reconnecting')
+
+KEY_PREFIX = 'presence'
+BUSY_KEY = f'{KEY_PREFIX}:busy'
+IN_SESSION_KEY = f'{KEY_PREFIX}:in_session'
+
+
+def _avail_key(modality):
+    return f'{KEY_PREFIX}:avail:{modality}'
+
+
+class LocalPresenceStore:
+    """In-process stand-in for the Redis sorted sets: {key: {member: expiry}}."""
+
+    def __init__(self):
+        self._sets = {}
+        self._lock = threading.Lock()
+
+    def apply(self, adds=None, removes=None):
+        with self._lock:
+            for key, mapping in (removes or {}).items():
+                entries = self._sets.get(key, {})
+                for member in mapping:
+                    entries.pop(member, None)
+            for key, mapping in (adds or {}).items():
+                self._sets.setdefault(key, {}).update(mapping)
+
+    def live(self, keys, now):
+        with self._lock:
+            result = []
+            for key in keys:
+                entries = self._sets.get(key, {})
+                for member in [m for m, expiry in entries.items() if expiry <= now]:
+                    del entries[member]
+                result.append(set(entries))
+            return result
+
+    def pop_expired(self, key, now):
+        with self._lock:
+            entries = self._sets.get(key, {})
+            expired = [m for m, expiry in entries.items() if expiry <= now]
+            for member in expired:
+                del entries[member]
+            return expired
+
+    def clear(self):
+        with self._lock:
+            self._sets.clear()
+
+
+class RedisPresenceStore:
+    """Sorted sets in Redis; expired members are trimmed on read."""
+
+    def __init__(self, url):
+        import redis
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+
+    def apply(self, adds=None, removes=None):
+        pipe = self.client.pipeline(transaction=False)
+        for key, members in (removes or {}).items():
+            if members:
+                pipe.zrem(key, *members)
+        for key, mapping in (adds or {}).items():
+            if mapping:
+                pipe.zadd(key, mapping)
+        pipe.execute()
+
+    def live(self, keys, now):
+        pipe = self.client.pipeline(transaction=False)
+        for key in keys:
+            pipe.zremrangebyscore(key, '-inf', now)
+            pipe.zrange(key, 0, -1)
+        replies = pipe.execute()
+        return [{int(m) for m in members} for members in replies[1::2]]
+
+    def pop_expired(self, key, now):
+        # MULTI/EXEC: concurrent callers never pop the same member twice.
+        pipe = self.client.pipeline(transaction=True)
+        pipe.zrangebyscore(key, '-inf', now)
+        pipe.zremrangebyscore(key, '-inf', now)
+        members, _ = pipe.execute()
+        return members
+
+    def clear(self):
+        keys = [_avail_key(m) for m in MODALITIES] + [BUSY_KEY, IN_SESSION_KEY]
+        self.client.delete(*keys)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                url = getattr(settings, 'PRESENCE_REDIS_URL', '')
+                _store = RedisPresenceStore(url) if url else LocalPresenceStore()
+    return _store
+
+
+def _heartbeat_ttl():
+    return getattr(settings, 'PRESENCE_HEARTBEAT_TTL', 90)
+
+
+# Presence is best-effort: a Redis outage degrades to "nobody available"
+# rather than breaking heartbeats, session transitions or the directory.
+def _apply(adds=None, removes=None):
+    try:
+        get_store().apply(adds=adds, removes=removes)
+    except Exception as e:
+        logger.warning("Presence update failed: %s", e)
+
+
+def _live(keys):
+    try:
+        return get_store().live(keys, time.time())
+    except Exception as e:
+        logger.warning("Presence read failed: %s", e)
+        return [set() for _ in keys]
+
+
+def heartbeat(reader_id, status='online', modalities=MODALITIES):
+    """
+    Record a heartbeat for the reader (User id). 'online' advertises the
+    given modalities until the heartbeat TTL lapses; 'busy' keeps the reader
+    listed as present but unavailable; 'offline' removes them at once.
+    """
+    if status not in STATUSES:
+        raise ValueError(f"Unknown presence status: {status}")
+    expiry = time.time() + _heartbeat_ttl()
+    modalities = set(modalities) & set(MODALITIES)
+    adds, removes = {}, {}
+    if status == 'online':
+        for m in MODALITIES:
+            if m in modalities:
+                adds[_avail_key(m)] = {reader_id: expiry}
+            else:
+                removes[_avail_key(m)] = [reader_id]
+        removes[BUSY_KEY] = [reader_id]
+    elif status == 'busy':
+        adds[BUSY_KEY] = {reader_id: expiry}
+    else:
+        for m in MODALITIES:
+            removes[_avail_key(m)] = [reader_id]
+        removes[BUSY_KEY] = [reader_id]
+    _apply(adds=adds, removes=removes)
+
+
+def set_in_session(reader_id, in_session):
+    if in_session:
+        expiry = time.time() + getattr(settings, 'PRESENCE_SESSION_TTL', 6 * 3600)
+        _apply(adds={IN_SESSION_KEY: {reader_id: expiry}})
+    else:
+        _apply(removes={IN_SESSION_KEY: [reader_id]})
+
+
+def session_state_changed(reader_id, state):
+    """Flip a reader to busy while any of their sessions is live."""
+    if state in BUSY_SESSION_STATES:
+        set_in_session(reader_id, True)
+        return
+    from readings.models import Session
+    still_busy = Session.objects.filter(reader_id=reader_id, state__in=BUSY_SESSION_STATES).exists()
+    set_in_session(reader_id, still_busy)
+
+
+def available_reader_ids(modality=None):
+    """User ids of readers online and free now, optionally for one modality."""
+    modalities = [modality] if modality else list(MODALITIES)
+    keys = [_avail_key(m) for m in modalities] + [BUSY_KEY, IN_SESSION_KEY]
+    *avail, busy, in_session = _live(keys)
+    return set().union(*avail) - busy - in_session
+
+
+def reader_statuses(reader_ids):
+    """{reader_id: 'online' | 'busy' | 'offline'} for the given User ids."""
+    keys = [_avail_key(m) for m in MODALITIES] + [BUSY_KEY, IN_SESSION_KEY]
+    *avail, busy, in_session = _live(keys)
+    online = set().union(*avail)
+    statuses = {}
+    for reader_id in reader_ids:
+        if reader_id in busy or reader_id in in_session:
+            statuses[reader_id] = 'busy'
+        elif reader_id in online:
+            statuses[reader_id] = 'online'
+        else:
+            statuses[reader_id] = 'offline'
+    return statuses
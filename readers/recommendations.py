@@ -0,0 +1,170 @@
+"""
+Offline item-item collaborative filtering for "readers you may like".
+
+The nightly batch (readers.tasks.build_reader_recommendations):
+1. builds a sparse client x reader interaction matrix from sessions,
+   reviews and favorites, each interaction type weighted;
+2. computes cosine similarity between reader columns, keeping each
+   reader's NEIGHBORS most similar readers;
+3. scores every client against those neighbourhoods, drops readers the
+   client already knows and keeps the top K;
+4. replaces ReaderRecommendation in one transaction.
+Pages read the results through readers.recommended, which doesn't import
+NumPy.
+
+All matrix work is vectorized NumPy/SciPy; clients are scored in chunks so
+memory stays bounded regardless of the client count.
+"""
+import logging
+import time
+
+import numpy as np
+from scipy import sparse
+from django.db import transaction
+from django.db.models import Count
+
+logger = logging.getLogger(__name__)
+
+TOP_K = 10
+NEIGHBORS = 50
+CLIENT_CHUNK = 50000
+
+# Interaction weights. Sessions are counted per reader and log-damped so
+# one heavy relationship doesn't drown the rest of a client's history.
+SESSION_WEIGHT = 1.0
+FAVORITE_WEIGHT = 3.0
+# Review weight by star rating; poor reviews count against similarity.
+REVIEW_WEIGHTS = {1: -2.0, 2: -1.0, 3: 0.5, 4: 1.5, 5: 2.5}
+SESSION_STATES = ('ended', 'finalized')
+
+
+def _top_k_per_row(matrix, k):
+    """
+    Keep the k largest positive entries of each row of a CSR matrix
+    (ties broken by column). Returns (rows, cols, values) sorted by row,
+    then by descending value.
+    """
+    matrix = matrix.tocsr()
+    matrix.eliminate_zeros()
+    counts = np.diff(matrix.indptr)
+    rows = np.repeat(np.arange(matrix.shape[0]), counts)
+    cols, data = matrix.indices, matrix.data
+    positive = data > 0
+    rows, cols, data = rows[positive], cols[positive], data[positive]
+    order = np.lexsort((cols, -data, rows))
+    rows, cols, data = rows[order], cols[order], data[order]
+    # Position of each entry within its row.
+    starts = np.searchsorted(rows, rows, side='left')
+    keep = (np.arange(len(rows)) - starts) < k
+    return rows[keep], cols[keep], data[keep]
+
+
+def item_similarity(interactions, neighbors=NEIGHBORS):
+    """
+    Cosine similarity between the columns (readers) of `interactions`,
+    pruned to each reader's `neighbors` nearest readers. Self-similarity
+    is removed.
+    """
+    interactions = interactions.tocsc()
+    norms = np.sqrt(np.asarray(interactions.multiply(interactions).sum(axis=0)).ravel())
+    inv = np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0)
+    normalized = interactions @ sparse.diags(inv)
+    sim = (normalized.T @ normalized).tocsr()
+    sim.setdiag(0)
+    rows, cols, data = _top_k_per_row(sim, neighbors)
+    return sparse.csr_matrix((data, (rows, cols)), shape=sim.shape)
+
+
+def recommend(interactions, k=TOP_K, neighbors=NEIGHBORS, chunk=CLIENT_CHUNK):
+    """
+    Score every client (row) of the client x reader `interactions` matrix.
+    Yields (client_rows, reader_cols, scores) per chunk, top `k` readers per
+    client, excluding readers the client already interacted with.
+    """
+    interactions = interactions.tocsr().astype(np.float32)
+    sim = item_similarity(interactions, neighbors).astype(np.float32)
+    for start in range(0, interactions.shape[0], chunk):
+        block = interactions[start:start + chunk]
+        scores = (block @ sim).tocsr()
+        # Zero out readers already known to the client (any interaction).
+        known = block.copy()
+        known.data[:] = 1
+        scores = scores - scores.multiply(known)
+        rows, cols, data = _top_k_per_row(scores, k)
+        yield rows + start, cols, data
+
+
+def interaction_matrix():
+    """
+    Load interactions. Returns (matrix, client_ids, reader_ids) where row i
+    is client_ids[i] and column j is ReaderProfile reader_ids[j].
+    """
+    from readings.models import Session
+    from .models import Favorite, ReaderProfile, Review
+
+    profile_for_user = dict(ReaderProfile.objects.values_list('user_id', 'pk'))
+    clients, readers, weights = [], [], []
+
+    sessions = (
+        Session.objects.filter(state__in=SESSION_STATES)
+        .values_list('client_id', 'reader_id')
+        .annotate(n=Count('id'))
+        .order_by()
+    )
+    for client_id, reader_user_id, n in sessions.iterator(chunk_size=10000):
+        reader_id = profile_for_user.get(reader_user_id)
+        if reader_id is not None:
+            clients.append(client_id)
+            readers.append(reader_id)
+            weights.append(SESSION_WEIGHT * float(np.log1p(n)))
+
+    for client_id, reader_id, rating in Review.objects.values_list('client_id', 'reader_id', 'rating').iterator(chunk_size=10000):
+        clients.append(client_id)
+        readers.append(reader_id)
+        weights.append(REVIEW_WEIGHTS.get(rating, 0.0))
+
+    for client_id, reader_id in Favorite.objects.values_list('client_id', 'reader_id').iterator(chunk_size=10000):
+        clients.append(client_id)
+        readers.append(reader_id)
+        weights.append(FAVORITE_WEIGHT)
+
+    client_ids, client_idx = np.unique(np.asarray(clients, dtype=np.int64), return_inverse=True)
+    reader_ids, reader_idx = np.unique(np.asarray(readers, dtype=np.int64), return_inverse=True)
+    # Duplicate (client, reader) pairs are summed by the COO -> CSR conversion.
+    matrix = sparse.coo_matrix(
+        (np.asarray(weights, dtype=np.float32), (client_idx, reader_idx)),
+        shape=(len(client_ids), len(reader_ids)),
+    ).tocsr()
+    return matrix, client_ids, reader_ids
+
+
+def build_recommendations(k=TOP_K, neighbors=NEIGHBORS, batch_size=5000):
+    """Recompute and store recommendations for every client. Returns the row count."""
+    from .models import ReaderRecommendation
+
+    started = time.monotonic()
+    matrix, client_ids, reader_ids = interaction_matrix()
+    loaded = time.monotonic()
+
+    rows = []
+    for client_rows, reader_cols, scores in recommend(matrix, k, neighbors):
+        ranks = np.arange(len(client_rows)) - np.searchsorted(client_rows, client_rows, side='left')
+        rows.extend(zip(client_ids[client_rows].tolist(), reader_ids[reader_cols].tolist(),
+                        ranks.tolist(), scores.tolist()))
+    computed = time.monotonic()
+
+    with transaction.atomic():
+        ReaderRecommendation.objects.all().delete()
+        ReaderRecommendation.objects.bulk_create(
+            (ReaderRecommendation(client_id=c, reader_id=r, rank=rank, score=score)
+             for c, r, rank, score in rows),
+            batch_size=batch_size,
+        )
+    logger.info(
+        "Built %d reader recommendations for %d clients from %d interactions "
+        "(load %.1fs, compute %.1fs, write %.1fs)",
+        len(rows), len(client_ids), matrix.nnz,
+        loaded - started, computed - loaded, time.monotonic() - computed,
+    )
+    return len(rows)
+
@@ -0,0 +1,19 @@
+"""
+Serving side of "readers you may like": reads the rows the nightly batch
+in readers.recommendations stores. Kept apart from that module so web
+workers never import NumPy/SciPy.
+"""
+
+
+def recommended_readers(user, limit=6):
+    """The user's precomputed recommendations as ReaderProfiles, in one query."""
+    from .models import ReaderRecommendation
+
+    if not user.is_authenticated:
+        return []
+    recs = (
+        ReaderRecommendation.objects.filter(client=user, rank__lt=limit, reader__is_verified=True)
+        .select_related('reader__user')
+        .order_by('rank')
+    )
+    return [rec.reader for rec in recs]
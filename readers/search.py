@@ -0,0 +1,128 @@
+"""
+Full-text reader search over display name, specialties and bio.
+
+Backed by ReaderSearchIndex:
+- PostgreSQL: a generated, weighted `search_vector` tsvector column with a
+  GIN index, ranked with ts_rank.
+- SQLite: an external-content FTS5 table kept in sync by triggers, ranked
+  with bm25.
+Both are created by migration readers.0005. On any other backend, or if
+the FTS objects are missing, search falls back to substring matching.
+
+Matching and ranking are subqueries of the caller's queryset, so its
+other filters and its pagination apply to every match, not to a capped
+list of top-ranked ids.
+"""
+import logging
+import re
+
+from django.db import DatabaseError, connections
+from django.db.models import Expression, F, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+logger = logging.getLogger(__name__)
+
+INDEX_TABLE = 'readers_readersearchindex'
+FTS_TABLE = 'readers_readersearch_fts'
+_TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+
+class MatchRank(Expression):
+    """
+    Rank of the reader in `reader` for a full-text query: a correlated
+    scalar subquery `sql`, with `{reader}` standing for the outer reader id.
+    Lower is better.
+    """
+    output_field = FloatField()
+
+    def __init__(self, reader, sql, params):
+        super().__init__()
+        self.reader, self.sql, self.params = reader, sql, params
+
+    def get_source_expressions(self):
+        return [self.reader]
+
+    def set_source_expressions(self, exprs):
+        self.reader, = exprs
+
+    def as_sql(self, compiler, connection):
+        reader_sql, reader_params = compiler.compile(self.reader)
+        return f'({self.sql.format(reader=reader_sql)})', [*self.params, *reader_params]
+
+
+def _terms(query):
+    return _TERM_RE.findall(query.lower())[:10]
+
+
+def _postgres_search(terms):
+    tsquery = ' & '.join(f"{t}:*" for t in terms)
+    match = f"SELECT reader_id FROM {INDEX_TABLE} WHERE search_vector @@ to_tsquery('english', %s)"
+    # float8, so the rank survives a round trip through a keyset cursor.
+    rank = (
+        f"SELECT -ts_rank(s.search_vector, to_tsquery('english', %s))::float8 "
+        f"FROM {INDEX_TABLE} s WHERE s.reader_id = {{reader}}"
+    )
+    return match, rank, tsquery
+
+
+def _sqlite_search(terms):
+    fts_query = ' '.join('"{}"*'.format(t.replace('"', '""')) for t in terms)
+    match = f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s"
+    # Column weights mirror the Postgres A/B/C weights (name > specialties > bio).
+    rank = (
+        f"SELECT bm25({FTS_TABLE}, 10.0, 5.0, 1.0) FROM {FTS_TABLE} "
+        f"WHERE {FTS_TABLE} MATCH %s AND rowid = {{reader}}"
+    )
+    return match, rank, fts_query
+
+
+_BACKENDS = {'postgresql': _postgres_search, 'sqlite': _sqlite_search}
+_installed = set()
+
+
+def _fulltext_installed(connection):
+    """Whether migration readers.0005 created the FTS objects on `connection`."""
+    key = (connection.alias, connection.settings_dict['NAME'])
+    if key in _installed:
+        return True
+    try:
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                found = FTS_TABLE in connection.introspection.table_names(cursor)
+            else:
+                columns = connection.introspection.get_table_description(cursor, INDEX_TABLE)
+                found = any(column.name == 'search_vector' for column in columns)
+    except DatabaseError as e:
+        logger.warning("Full-text reader search unavailable, falling back: %s", e)
+        return False
+    if found:
+        _installed.add(key)
+    return found
+
+
+def apply_search(queryset, query, reader_field='reader_id', prefix=''):
+    """
+    Restrict `queryset` to readers matching `query`, annotated with
+    `search_rank` (lower is better) and ordered by it, then by
+    `reader_field`. `reader_field` names the reader id on the queryset's
+    model and `prefix` the path to ReaderSearchIndex for the substring
+    fallback (e.g. 'search_index__' from ReaderProfile), where every
+    match ranks equal.
+    """
+    terms = _terms(query)
+    if not terms:
+        return queryset.none()
+    connection = connections[queryset.db]
+    backend = _BACKENDS.get(connection.vendor)
+    if backend is None or not _fulltext_installed(connection):
+        return queryset.filter(
+            Q(**{f"{prefix}display_name__icontains": query})
+            | Q(**{f"{prefix}specialties__icontains": query})
+            | Q(**{f"{prefix}bio__icontains": query})
+        ).annotate(search_rank=Value(0.0, output_field=FloatField())).order_by('search_rank', reader_field)
+    match, rank, param = backend(terms)
+    return (
+        queryset.filter(**{f"{reader_field}__in": RawSQL(match, [param])})
+        .annotate(search_rank=MatchRank(F(reader_field), rank, [param]))
+        .order_by('search_rank', reader_field)
+    )
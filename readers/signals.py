@@ -0,0 +1,95 @@
+"""
+Keep ReaderSearchIndex and cached directory/profile fragments in step with
+profile, review and rate changes, and reader presence in step with session
+state.
+"""
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from accounts.models import UserProfile
+from readings.models import Session
+from .caching import invalidate_directory, invalidate_profile
+from .indexing import refresh_reader_index
+from .presence import session_state_changed
+from .models import ReaderAvailability, ReaderProfile, ReaderRate, Review
+
+# ReaderProfile columns shown in the directory or copied into the index;
+# saves touching none of them (e.g. stripe_connect_account_id) are ignored.
+# Specialty changes go through readers.tags.set_specialties.
+DIRECTORY_PROFILE_FIELDS = {'bio', 'avatar_url', 'is_verified', 'slug', 'user'}
+
+
+def _reader_id_for_user(user_id):
+    return ReaderProfile.objects.filter(user_id=user_id).values_list('pk', flat=True).first()
+
+
+@receiver(post_save, sender=ReaderProfile)
+def reader_profile_saved(sender, instance, update_fields=None, **kwargs):
+    if update_fields and not DIRECTORY_PROFILE_FIELDS.intersection(update_fields):
+        return
+    refresh_reader_index(instance.pk)
+    invalidate_directory()
+    invalidate_profile(instance.pk)
+
+
+@receiver(post_delete, sender=ReaderProfile)
+def reader_profile_deleted(sender, instance, **kwargs):
+    invalidate_directory()
+    invalidate_profile(instance.pk)
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def review_changed(sender, instance, **kwargs):
+    refresh_reader_index(instance.reader_id)
+    invalidate_profile(instance.reader_id)
+
+
+@receiver(post_save, sender=ReaderRate)
+@receiver(post_delete, sender=ReaderRate)
+def rate_changed(sender, instance, **kwargs):
+    refresh_reader_index(instance.reader_id)
+    invalidate_directory()
+    invalidate_profile(instance.reader_id)
+
+
+@receiver(post_save, sender=UserProfile)
+def user_profile_saved(sender, instance, **kwargs):
+    reader_id = _reader_id_for_user(instance.user_id)
+    if reader_id is not None:
+        refresh_reader_index(reader_id)
+        invalidate_directory()
+        invalidate_profile(reader_id)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def user_saved(sender, instance, created=False, update_fields=None, **kwargs):
+    # Reader names fall back to the User's full name; ignore login bookkeeping.
+    if created or (update_fields and set(update_fields) <= {'last_login'}):
+        return
+    # The login sync path has the profile select_related, so clients cost nothing.
+    profile = getattr(instance, 'profile', None)
+    if profile is None or profile.role != 'reader':
+        return
+    reader_id = _reader_id_for_user(instance.pk)
+    if reader_id is not None:
+        refresh_reader_index(reader_id)
+        invalidate_directory()
+        invalidate_profile(reader_id)
+
+
+@receiver(post_save, sender=Session)
+def session_saved(sender, instance, update_fields=None, **kwargs):
+    # Finalizing changes nothing for the reader, released when the session ended.
+    if (update_fields and 'state' not in update_fields) or instance.state == 'finalized':
+        return
+    session_state_changed(instance.reader_id, instance.state)
+
+
+@receiver(post_save, sender=ReaderAvailability)
+@receiver(post_delete, sender=ReaderAvailability)
+def availability_changed(sender, instance, **kwargs):
+    # Slots are regenerated by scheduling.tasks.refresh_stale_slots.
+    from scheduling.slots import mark_availability_changed
+    mark_availability_changed(instance.reader_id)
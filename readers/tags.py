@@ -0,0 +1,112 @@
+"""
+Specialty tags: normalization, assignment, filtering and facet counts.
+
+Specialties are matched on their slug, so "Tarot", " tarot " and "TAROT"
+are one tag and "tarot" never matches "anti-tarot".
+"""
+from django.db import transaction
+from django.db.models import Count
+from django.utils.text import slugify
+
+from .models import ReaderSpecialty, SpecialtyTag
+
+
+def normalize_tag(name):
+    """Return (slug, display name) for a raw specialty string."""
+    name = ' '.join(name.split())[:100]
+    return slugify(name)[:100], name
+
+
+def parse_specialties(raw):
+    """Split a comma-separated specialty string into {slug: name}, first spelling wins."""
+    tags = {}
+    for part in (raw or '').split(','):
+        slug, name = normalize_tag(part)
+        if slug:
+            tags.setdefault(slug, name)
+    return tags
+
+
+def parse_filter_slugs(values):
+    """Normalize ?specialty=... values (repeated and/or comma-separated) to slugs."""
+    slugs = []
+    for value in values:
+        for slug in parse_specialties(value):
+            if slug not in slugs:
+                slugs.append(slug)
+    return slugs
+
+
+def get_or_create_tags(names_by_slug):
+    """Return {slug: SpecialtyTag}, creating missing tags in one bulk insert."""
+    if not names_by_slug:
+        return {}
+    SpecialtyTag.objects.bulk_create(
+        [SpecialtyTag(slug=slug, name=name) for slug, name in names_by_slug.items()],
+        ignore_conflicts=True,
+    )
+    return {t.slug: t for t in SpecialtyTag.objects.filter(slug__in=names_by_slug)}
+
+
+def set_specialties(reader, specialties):
+    """
+    Replace a reader's specialties. Accepts a comma-separated string or an
+    iterable of names. Only the difference is written.
+    """
+    from .caching import invalidate_directory, invalidate_profile
+    from .indexing import refresh_reader_index
+
+    if isinstance(specialties, str):
+        wanted = parse_specialties(specialties)
+    else:
+        wanted = parse_specialties(','.join(specialties))
+    with transaction.atomic():
+        tags = get_or_create_tags(wanted)
+        current = dict(
+            ReaderSpecialty.objects.filter(reader=reader).values_list('tag__slug', 'tag_id')
+        )
+        ReaderSpecialty.objects.filter(
+            reader=reader, tag_id__in=[tag_id for slug, tag_id in current.items() if slug not in wanted]
+        ).delete()
+        ReaderSpecialty.objects.bulk_create(
+            [ReaderSpecialty(reader=reader, tag=tags[slug]) for slug in wanted if slug not in current],
+            ignore_conflicts=True,
+        )
+    refresh_reader_index(reader.pk)
+    invalidate_directory()
+    invalidate_profile(reader.pk)
+
+
+def filter_by_specialties(queryset, slugs, reader_field='pk'):
+    """
+    Keep readers that have every tag in `slugs`: one grouped subquery over the
+    (tag, reader) index instead of chained substring filters.
+    """
+    if not slugs:
+        return queryset
+    matching = (
+        ReaderSpecialty.objects.filter(tag__slug__in=slugs)
+        .values('reader_id')
+        .annotate(matched=Count('tag_id'))
+        .filter(matched=len(slugs))
+        .values('reader_id')
+    )
+    return queryset.filter(**{f"{reader_field}__in": matching})
+
+
+def specialty_facets(readers=None, limit=50):
+    """
+    [{'slug', 'name', 'count'}] for tags among `readers` (a ReaderProfile
+    queryset; all verified readers by default), computed in one grouped query.
+    """
+    links = ReaderSpecialty.objects.all()
+    if readers is None:
+        links = links.filter(reader__is_verified=True)
+    else:
+        links = links.filter(reader__in=readers.values('pk'))
+    rows = (
+        links.values('tag__slug', 'tag__name')
+        .annotate(count=Count('reader_id'))
+        .order_by('-count', 'tag__slug')[:limit]
+    )
+    return [{'slug': r['tag__slug'], 'name': r['tag__name'], 'count': r['count']} for r in rows]
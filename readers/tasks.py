@@ -0,0 +1,17 @@
+"""
+Celery tasks for the reader directory.
+"""
+
+import logging
+from celery import shared_task
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def build_reader_recommendations():
+    """Nightly: rebuild "readers you may like" for every client."""
+    from .recommendations import build_recommendations
+
+    count = build_recommendations()
+    return {'recommendations': count}
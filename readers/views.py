@@ -1,35 +1,158 @@
+from urllib.parse import urlencode
+from zoneinfo import available_timezones
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseBadRequest
 from django.shortcuts import render, get_object_or_404, redirect
-from django.db.models import Q, Avg, Count
+from django.template.loader import render_to_string
+from django.utils.dateparse import parse_time
+from django.utils.safestring import mark_safe
+from django.db.models import Prefetch, prefetch_related_objects
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.http import require_POST
-from .models import ReaderProfile, ReaderRate, ReaderAvailability, Review, Favorite
+from .models import ReaderProfile, ReaderRate, ReaderAvailability, Review, Favorite, validate_timezone
 from accounts.decorators import require_role
+from core.pagination import decode_cursor, keyset_page
+from scheduling.slots import mark_availability_changed, materialize_slots
+from . import presence
+from .caching import (
+    directory_cache_ttl, directory_fragment_key, get_profile_fragment, profile_version, set_profile_fragment,
+)
+from .recommended import recommended_readers
+from .search import apply_search
+from .tags import filter_by_specialties, parse_filter_slugs, specialty_facets
 
 
-def reader_list(request):
+DIRECTORY_PAGE_SIZE = 24
+
+
+def _page_key(q):
+    # Search results page along their rank (ties broken by pk); everything else along pk.
+    return ('search_rank', 'pk') if q else 'pk'
+
+
+def _render_directory_page(path, specialties, q, modality, cursor, available_ids=None):
+    """Render one keyset page of directory results (cards + infinite-scroll trigger)."""
     qs = ReaderProfile.objects.all().select_related('user').prefetch_related('rates')
-    specialty = request.GET.get('specialty', '').strip()
-    modality = request.GET.get('modality', '')
-    if specialty:
-        qs = qs.filter(specialties__icontains=specialty)
+    if available_ids is not None:
+        qs = qs.filter(user_id__in=available_ids)
+    if specialties:
+        qs = filter_by_specialties(qs, specialties)
+    if q:
+        qs = apply_search(qs, q, reader_field='pk', prefix='search_index__')
     if modality:
         qs = qs.filter(rates__modality=modality).distinct()
-    readers = qs
-    return render(request, 'readers/list.html', {
+    readers, next_cursor = keyset_page(qs, cursor, DIRECTORY_PAGE_SIZE, key=_page_key(q))
+    next_url = None
+    if next_cursor:
+        # Only the filters in the cache key: the page is shared by every
+        # visitor, whatever else was in the first one's query string.
+        params = [('specialty', slug) for slug in specialties]
+        params += [(name, value) for name, value in (('q', q), ('modality', modality)) if value]
+        if available_ids is not None:
+            params.append(('available', '1'))
+        next_url = f"{path}?{urlencode([*params, ('cursor', next_cursor)])}"
+    return render_to_string('readers/_list_results.html', {
         'readers': readers,
-        'specialty_filter': specialty,
+        'next_url': next_url,
+        'is_first_page': not cursor,
+    })
+
+
+def _cached(key, build):
+    if key is None:
+        return build()
+    value = cache.get(key)
+    if value is None:
+        value = build()
+        cache.set(key, value, directory_cache_ttl())
+    return value
+
+
+def reader_list(request):
+    # Everything below is part of the shared cache key, so it is normalized
+    # and validated first: junk values must not each get their own entry.
+    specialties = parse_filter_slugs(request.GET.getlist('specialty'))
+    q = ' '.join(request.GET.get('q', '').split()).lower()
+    modality = request.GET.get('modality', '')
+    if modality and modality not in presence.MODALITIES:
+        return HttpResponseBadRequest('Unknown modality')
+    cursor = request.GET.get('cursor') or None
+    after = decode_cursor(cursor, _page_key(q))
+    if cursor and after is None:
+        return HttpResponseBadRequest('Invalid cursor')
+    available_ids = None
+    if request.GET.get('available'):
+        # "Available now" comes from the presence store, not the database;
+        # the online set is part of the cache key.
+        available_ids = sorted(presence.available_reader_ids(modality or None))
+
+    # Results don't depend on the viewer, so one cached fragment per filter
+    # combination and page serves everyone until a reader changes.
+    results_html = mark_safe(_cached(
+        directory_fragment_key((
+            'results', request.path, tuple(specialties), q, modality, after,
+            tuple(available_ids) if available_ids is not None else None,
+        )),
+        lambda: _render_directory_page(request.path, specialties, q, modality, cursor, available_ids),
+    ))
+    if request.htmx and cursor:
+        return HttpResponse(results_html)
+
+    facets = _cached(directory_fragment_key(('facets',)), specialty_facets)
+    return render(request, 'readers/list.html', {
+        'results_html': results_html,
+        'specialty_filter': ', '.join(specialties),
+        'selected_specialties': specialties,
+        'specialty_facets': facets,
+        'search_query': q,
         'modality_filter': modality,
+        'available_filter': available_ids is not None,
+        # Per-user, so kept outside the shared cached fragment.
+        'recommended_readers': recommended_readers(request.user, limit=4),
     })
 
 
+def _build_profile_fragment(slug):
+    reader = get_object_or_404(ReaderProfile.objects.select_related('user', 'search_index'), slug=slug)
+    # Read the version before loading dependent rows, so a change racing
+    # with this render leaves the entry stale rather than wrongly current.
+    version = profile_version(reader.pk)
+    prefetch_related_objects([reader], 'rates', 'tags', Prefetch(
+        'reviews',
+        queryset=Review.objects.select_related('client').order_by('-created_at')[:10],
+        to_attr='recent_reviews',
+    ))
+    index = getattr(reader, 'search_index', None)
+    review_count = index.review_count if index else 0
+    data = {
+        'reader_id': reader.pk,
+        'title': reader.user.get_full_name() or reader.slug,
+        'html': render_to_string('readers/_profile_public.html', {
+            'reader': reader,
+            'reviews': reader.recent_reviews,
+            'avg_rating': index.avg_rating if review_count else None,
+            'review_count': review_count,
+        }),
+    }
+    set_profile_fragment(slug, version, data)
+    return data
+
+
 def reader_profile(request, slug):
-    reader = get_object_or_404(ReaderProfile.objects.select_related('user').prefetch_related('rates', 'availability'), slug=slug)
-    reviews = Review.objects.filter(reader=reader).select_related('client').order_by('-created_at')[:10]
-    review_stats = Review.objects.filter(reader=reader).aggregate(a=Avg('rating'), c=Count('id'))
-    avg_rating = review_stats['a']
-    review_count = review_stats['c'] or 0
-    is_favorite = request.user.is_authenticated and Favorite.objects.filter(client=request.user, reader=reader).exists()
-    return render(request, 'readers/profile.html', {'reader': reader, 'reviews': reviews, 'avg_rating': avg_rating, 'review_count': review_count, 'is_favorite': is_favorite})
+    # The public page is shared by every visitor; only favorite state is per-user.
+    profile = get_profile_fragment(slug) or _build_profile_fragment(slug)
+    is_favorite = request.user.is_authenticated and Favorite.objects.filter(
+        client=request.user, reader_id=profile['reader_id'],
+    ).exists()
+    return render(request, 'readers/profile.html', {
+        'profile_html': mark_safe(profile['html']),
+        'profile_title': profile['title'],
+        'reader_slug': slug,
+        'is_favorite': is_favorite,
+    })
 
 
 @login_required
@@ -40,15 +163,43 @@ def reader_availability(request):
         return redirect('profile')
     slots = ReaderAvailability.objects.filter(reader=rp).order_by('day_of_week', 'start_time')
     if request.method == 'POST':
-        ReaderAvailability.objects.filter(reader=rp).delete()
+        changed = False
+        tz_name = request.POST.get('timezone', rp.timezone)
+        if tz_name != rp.timezone:
+            try:
+                validate_timezone(tz_name)
+            except ValidationError:
+                return redirect('reader_availability')
+            rp.timezone = tz_name
+            rp.save(update_fields=['timezone'])
+            changed = True
+
+        desired = set()
         for i in range(7):
-            start = request.POST.get(f'day_{i}_start')
-            end = request.POST.get(f'day_{i}_end')
+            start = parse_time(request.POST.get(f'day_{i}_start') or '')
+            end = parse_time(request.POST.get(f'day_{i}_end') or '')
             if start and end:
-                ReaderAvailability.objects.create(reader=rp, day_of_week=i, start_time=start, end_time=end)
+                desired.add((i, start, end))
+        existing = {(w.day_of_week, w.start_time, w.end_time): w.pk for w in slots}
+        removed = [pk for key, pk in existing.items() if key not in desired]
+        added = desired.difference(existing)
+        if removed or added:
+            with transaction.atomic():
+                ReaderAvailability.objects.filter(pk__in=removed).delete()
+                ReaderAvailability.objects.bulk_create(
+                    [ReaderAvailability(reader=rp, day_of_week=day, start_time=start, end_time=end)
+                     for day, start, end in sorted(added)]
+                )
+            changed = True
+        if changed:
+            # Bulk writes skip signals; regenerate this reader's slots now.
+            mark_availability_changed(rp.pk)
+            materialize_slots([rp.pk])
         return redirect('reader_availability')
     days = [(0, 'Monday'), (1, 'Tuesday'), (2, 'Wednesday'), (3, 'Thursday'), (4, 'Friday'), (5, 'Saturday'), (6, 'Sunday')]
-    return render(request, 'readers/availability.html', {'reader_profile': rp, 'slots': slots, 'days': days})
+    return render(request, 'readers/availability.html', {
+        'reader_profile': rp, 'slots': slots, 'days': days, 'timezones': sorted(available_timezones()),
+    })
 
 
 @login_required
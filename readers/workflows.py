@@ -2,13 +2,18 @@
 
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
-from django.db.models import Q, Avg, Count
+from django.db.models import Q, F, Avg, OuterRef, Subquery
 from django.utils import timezone
 from django.http import JsonResponse
 from django import forms
 import json
 
-from readers.models import ReaderProfile, ReaderRate, ReaderAvailability, Review, Favorite
+from readers.models import (
+    ReaderProfile, ReaderRate, ReaderAvailability, Review, Favorite, ReaderSearchIndex, ReaderRecommendation,
+)
+from readers.indexing import RATE_FIELDS
+from readers.search import apply_search
+from readers.tags import filter_by_specialties, parse_filter_slugs
 from scheduling.models import ScheduledSlot, Booking
 from readings.models import Session
 from wallets.models import Wallet, debit_wallet
@@ -16,51 +21,82 @@ from live.models import Livestream, Gift, GiftPurchase
 from decimal import Decimal
 
 
+PRICE_RANGES = {
+    'under-2': (None, Decimal('2')),
+    '2-5': (Decimal('2'), Decimal('5')),
+    '5-10': (Decimal('5'), Decimal('10')),
+    'over-10': (Decimal('10'), None),
+}
+
+
+def _rate_in_range(field, low, high):
+    q = Q(**{f"{field}__isnull": False})
+    if low is not None:
+        q &= Q(**{f"{field}__gte": low})
+    if high is not None:
+        q &= Q(**{f"{field}__lt": high})
+    return q
+
+
 def browse_readers(request):
-    """Browse and filter readers."""
-    readers = ReaderProfile.objects.filter(is_verified=True).select_related('user')
+    """Browse and filter readers. One query against ReaderSearchIndex."""
+    readers = ReaderSearchIndex.objects.filter(is_verified=True).select_related('reader')
     
     # Filters
     modality = request.GET.get('modality')
     price = request.GET.get('price')
     rating = request.GET.get('rating')
     q = request.GET.get('q')
+    specialties = parse_filter_slugs(request.GET.getlist('specialty'))
     sort = request.GET.get('sort', 'featured')
     
-    if modality:
-        readers = readers.filter(rates__modality=modality)
+    rate_field = RATE_FIELDS.get(modality)
+    if rate_field:
+        readers = readers.filter(**{f"{rate_field}__isnull": False})
     
-    if price:
-        if price == 'under-2':
-            readers = readers.filter(rates__rate_per_minute__lt=2)
-        elif price == '2-5':
-            readers = readers.filter(rates__rate_per_minute__gte=2, rates__rate_per_minute__lt=5)
-        elif price == '5-10':
-            readers = readers.filter(rates__rate_per_minute__gte=5, rates__rate_per_minute__lt=10)
-        elif price == 'over-10':
-            readers = readers.filter(rates__rate_per_minute__gte=10)
+    if price in PRICE_RANGES:
+        low, high = PRICE_RANGES[price]
+        if rate_field:
+            readers = readers.filter(_rate_in_range(rate_field, low, high))
+        else:
+            # Any offered modality within the range
+            any_rate = Q()
+            for field in RATE_FIELDS.values():
+                any_rate |= _rate_in_range(field, low, high)
+            readers = readers.filter(any_rate)
     
     if rating:
-        rating_val = float(rating)
-        readers = readers.annotate(avg_rating=Avg('reviews__rating')).filter(avg_rating__gte=rating_val)
+        try:
+            readers = readers.filter(avg_rating__gte=float(rating))
+        except ValueError:
+            pass
+    
+    if specialties:
+        readers = filter_by_specialties(readers, specialties, reader_field='reader_id')
     
     if q:
-        readers = readers.filter(Q(user__profile__display_name__icontains=q) | Q(specialties__icontains=q))
+        # Ranked full-text match; best matches first unless another sort is chosen
+        readers = apply_search(readers, q)
     
     # Sort
     if sort == 'rating':
-        readers = readers.annotate(avg_rating=Avg('reviews__rating')).order_by('-avg_rating')
+        readers = readers.order_by('-avg_rating', '-review_count')
     elif sort == 'price_low':
-        readers = readers.annotate(min_rate=Min('rates__rate_per_minute')).order_by('min_rate')
+        readers = readers.order_by(F(rate_field or 'min_rate').asc(nulls_last=True))
     elif sort == 'reviews':
-        readers = readers.annotate(review_count=Count('reviews')).order_by('-review_count')
-    
-    # Add computed fields
-    for reader in readers:
-        reader.avg_rating = reader.reviews.aggregate(avg=Avg('rating'))['avg'] or 0
-        reader.review_count = reader.reviews.count()
-        rates = ReaderRate.objects.filter(reader=reader)
-        reader.rates = {r.modality: r.rate_per_minute for r in rates}
+        readers = readers.order_by('-review_count')
+    elif not q:
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            # Featured: the client's recommendations first, then everyone else
+            rec_rank = ReaderRecommendation.objects.filter(
+                client=user, reader_id=OuterRef('reader_id'),
+            ).values('rank')[:1]
+            readers = readers.annotate(rec_rank=Subquery(rec_rank)).order_by(
+                F('rec_rank').asc(nulls_last=True), 'reader_id',
+            )
+        else:
+            readers = readers.order_by('reader_id')
     
     return render(request, 'readers/browse.html', {'readers': readers})
 
@@ -74,11 +110,14 @@ def reader_detail(request, slug):
     
     rates = ReaderRate.objects.filter(reader=reader)
     
-    availability = ReaderAvailability.objects.filter(reader=reader)
+    # One query for the week; first window per day, as before
+    by_day = {}
+    for window in ReaderAvailability.objects.filter(reader=reader).order_by('day_of_week', 'pk'):
+        by_day.setdefault(window.day_of_week, window)
     days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
     availability_by_day = []
     for day_num in range(7):
-        day_avail = availability.filter(day_of_week=day_num).first()
+        day_avail = by_day.get(day_num)
         status = f"{day_avail.start_time.strftime('%H:%M')} - {day_avail.end_time.strftime('%H:%M')}" if day_avail else "Not Available"
         availability_by_day.append((days[day_num], status))
     
@@ -134,6 +173,19 @@ def book_reader(request, slug):
     return render(request, 'readers/book.html', context)
 
 
+@login_required
+def session_join(request, session_id):
+    """Session room for a booked reading."""
+    session = get_object_or_404(
+        Session.objects.select_related('reader__profile', 'reader__reader_profile')
+        .prefetch_related('reader__reader_profile__tags'),
+        id=session_id,
+    )
+    if request.user != session.client and request.user != session.reader:
+        return redirect('reader_list')
+    return render(request, 'readings/session_join.html', {'session': session})
+
+
 @login_required
 def toggle_favorite(request, reader_id):
     """Add/remove reader from favorites."""
@@ -1,7 +1,16 @@
 from django.contrib import admin
-from .models import Session
+from .models import Session, SessionEvent
 
 
 @admin.register(Session)
 class SessionAdmin(admin.ModelAdmin):
     list_display = ('pk', 'client', 'reader', 'modality', 'state', 'billing_minutes', 'created_at')
+
+
+@admin.register(SessionEvent)
+class SessionEventAdmin(admin.ModelAdmin):
+    list_display = ('session', 'kind', 'user', 'created_at')
+    readonly_fields = ('session', 'kind', 'user', 'data', 'created_at')
+    search_fields = ('=session__id',)
+    list_select_related = ('session', 'user')
+    show_full_result_count = False
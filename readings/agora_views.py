@@ -10,8 +10,12 @@ from django.http import JsonResponse
 from django.views.decorators.http import require_http_methods, require_POST
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import get_object_or_404
+from django.db import transaction
+from django.db.models import F, Q
 from django.utils import timezone
 from django.conf import settings
+from core import outbox
+from . import timeline
 from .agora_token import RtcTokenBuilder, ROLE_PUBLISHER, ROLE_SUBSCRIBER
 from .models import Session
 from wallets.models import Wallet
@@ -57,7 +61,7 @@ def get_rtc_token(request, session_id):
         # Ensure channel name exists
         if not session.channel_name:
             session.channel_name = f"session_{session.id}_{int(timezone.now().timestamp())}"
-            session.save()
+            session.save(update_fields=['channel_name'])
         
         # Generate RTC token
         privilege_expire_ts = int(timezone.now().timestamp()) + 1200
@@ -117,22 +121,22 @@ def session_join(request, session_id):
             if wallet.balance < session.rate_per_minute:
                 return JsonResponse({'error': 'Insufficient balance'}, status=402)
         
+        # Clear grace_until if reconnecting
+        fields = {'grace_until': None}
+        
         # Generate Agora channel name if not exists
         if not session.channel_name:
-            session.channel_name = f"session_{session.id}_{int(timezone.now().timestamp())}"
+            fields['channel_name'] = f"session_{session.id}_{int(timezone.now().timestamp())}"
         
         # Set started_at on first join
         if not session.started_at:
-            session.started_at = timezone.now()
+            fields['started_at'] = timezone.now()
         
-        # Clear grace_until if reconnecting
-        session.grace_until = None
-        
-        # Transition to active
-        if not session.transition('active'):
+        # Transition to active (fails if another request moved the session first)
+        if not session.transition('active', when=Q(state__in=['waiting', 'paused']), **fields):
             return JsonResponse({'error': 'Invalid state transition'}, status=400)
         
-        session.save()
+        timeline.record(session, 'join', request.user)
         logger.info(f"Session {session_id} joined by user {request.user.id}")
         
         # Generate token
@@ -177,15 +181,15 @@ def session_leave(request, session_id):
         if session.state not in ['active', 'paused']:
             return JsonResponse({'error': f'Cannot leave from state {session.state}'}, status=400)
         
-        # Set grace period (5 minutes)
-        session.grace_until = timezone.now() + timedelta(minutes=5)
-        session.reconnect_count += 1
-        
-        # Transition to paused (allow reconnect)
-        if not session.transition('paused'):
+        # Transition to paused (allow reconnect) with a 5 minute grace period
+        if not session.transition(
+            'paused',
+            grace_until=timezone.now() + timedelta(minutes=5),
+            reconnect_count=F('reconnect_count') + 1,
+        ):
             return JsonResponse({'error': 'Invalid state transition'}, status=400)
         
-        session.save()
+        timeline.record(session, 'leave', request.user)
         logger.info(f"Session {session_id} left by user {request.user.id}, grace until {session.grace_until}")
         
         return JsonResponse({
@@ -228,12 +232,13 @@ def session_reconnect(request, session_id):
             if wallet.balance < session.rate_per_minute:
                 return JsonResponse({'error': 'Insufficient balance for reconnect'}, status=402)
         
-        # Transition back to active
-        if not session.transition('active'):
+        # Transition back to active, unless the grace period ran out meanwhile
+        if not session.transition(
+            'active', when=Q(state='paused', grace_until__gte=timezone.now()), grace_until=None,
+        ):
             return JsonResponse({'error': 'Invalid state transition'}, status=400)
         
-        session.grace_until = None
-        session.save()
+        timeline.record(session, 'reconnect', request.user)
         logger.info(f"Session {session_id} reconnected by user {request.user.id}")
         
         # Generate new token
@@ -277,24 +282,20 @@ def session_end(request, session_id):
         if session.state not in ['active', 'paused', 'reconnecting']:
             return JsonResponse({'error': f'Cannot end from state {session.state}'}, status=400)
         
-        # Record summary if provided
+        # Set ended_at, and record summary if provided
+        fields = {'ended_at': timezone.now()}
         summary = request.POST.get('summary', '')
         if summary:
-            session.summary = summary[:1000]
+            fields['summary'] = summary[:1000]
         
-        # Set ended_at
-        session.ended_at = timezone.now()
-        
-        # Transition to ended
-        if not session.transition('ended'):
-            return JsonResponse({'error': 'Invalid state transition'}, status=400)
-        
-        session.save()
-        logger.info(f"Session {session_id} ended by user {request.user.id}")
-        
-        # Queue finalization task
+        # Transition to ended, queueing finalization in the same transaction
         from readings.tasks import session_finalize
-        session_finalize.delay(session_id)
+        with transaction.atomic():
+            if not session.transition('ended', when=Q(state__in=['active', 'paused', 'reconnecting']), **fields):
+                return JsonResponse({'error': 'Invalid state transition'}, status=400)
+            timeline.record(session, 'end', request.user)
+            outbox.enqueue(session_finalize, session_id)
+        logger.info(f"Session {session_id} ended by user {request.user.id}")
         
         return JsonResponse({
             'success': True,
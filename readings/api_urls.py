@@ -1,12 +1,27 @@
+from django.conf import settings
 from django.urls import path
-from .agora_views import (
-    get_rtc_token,
-    session_join,
-    session_leave,
-    session_reconnect,
-    session_end,
-    get_livestream_token,
-)
+
+# ASGI deployments serve the async variants (see soulseer/asgi.py).
+if getattr(settings, 'READINGS_ASYNC_VIEWS', False):
+    from .async_agora_views import (
+        get_rtc_token,
+        session_join,
+        session_leave,
+        session_reconnect,
+        session_end,
+        get_livestream_token,
+    )
+else:
+    from .agora_views import (
+        get_rtc_token,
+        session_join,
+        session_leave,
+        session_reconnect,
+        session_end,
+        get_livestream_token,
+    )
+from .api_views import session_heartbeat
+from .stream_views import session_events
 
 urlpatterns = [
     # Session RTC token generation
@@ -17,6 +32,8 @@ urlpatterns = [
     path('sessions/<int:session_id>/leave/', session_leave, name='api_session_leave'),
     path('sessions/<int:session_id>/reconnect/', session_reconnect, name='api_session_reconnect'),
     path('sessions/<int:session_id>/end/', session_end, name='api_session_end'),
+    path('sessions/<int:session_id>/heartbeat/', session_heartbeat, name='api_session_heartbeat'),
+    path('sessions/<int:session_id>/events/', session_events, name='api_session_events'),
 
     # Livestream RTC token generation
     path('livestreams/<int:livestream_id>/rtc-token/', get_livestream_token, name='get_livestream_token'),
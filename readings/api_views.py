@@ -0,0 +1,32 @@
+"""
+Session heartbeat endpoint. Kept free of ORM and login-session access so
+it can be called every few seconds by every participant.
+"""
+import json
+
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+
+from . import heartbeats
+
+
+@csrf_exempt  # Authenticated by the signed token, not by cookies.
+@require_POST
+def session_heartbeat(request, session_id):
+    """
+    Participant heartbeat; send every heartbeatInterval seconds while connected.
+
+    POST /api/sessions/{session_id}/heartbeat/
+    {"token": "<heartbeatToken from the session page>"}
+    """
+    try:
+        token = json.loads(request.body or b'{}').get('token', '')
+    except (ValueError, AttributeError):
+        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+    claims = heartbeats.read_token(token)
+    if claims is None or claims[0] != session_id:
+        return JsonResponse({'error': 'Invalid heartbeat token'}, status=403)
+    if not heartbeats.beat(session_id, claims[1]):
+        return JsonResponse({'error': 'Heartbeat store unavailable'}, status=503)
+    return JsonResponse({'success': True, 'interval': heartbeats.heartbeat_interval()})
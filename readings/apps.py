@@ -5,3 +5,6 @@ class ReadingsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'readings'
     verbose_name = 'Readings / Sessions'
+
+    def ready(self):
+        from . import signals  # noqa: F401
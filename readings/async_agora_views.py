@@ -0,0 +1,277 @@
+"""
+Async versions of the Agora session API views (readings.agora_views).
+
+Same URLs, requests and responses, written against Django's async ORM.
+Under ASGI (soulseer.asgi sets READINGS_ASYNC_VIEWS) a request waiting
+on the database, the broker or Agora no longer holds a whole worker, so
+concurrent join traffic is bounded by connections rather than by the
+number of gunicorn processes. Compare with
+`manage.py benchmark_session_api`.
+"""
+import logging
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.db import transaction
+from django.db.models import F, Q
+from django.http import JsonResponse
+from django.utils import timezone
+from django.views.decorators.http import require_POST
+
+from core import outbox
+from . import timeline
+from .agora_token import RtcTokenBuilder, ROLE_PUBLISHER, ROLE_SUBSCRIBER
+from .models import Session
+from wallets.models import Wallet
+
+logger = logging.getLogger(__name__)
+
+
+def _rtc_token(channel, uid, role=ROLE_PUBLISHER, ttl=1200):
+    return RtcTokenBuilder.build_token_with_uid(
+        app_id=settings.AGORA_APP_ID,
+        app_certificate=settings.AGORA_CERTIFICATE,
+        channel_name=channel,
+        uid=uid,
+        role=role,
+        privilege_expire_ts=int(timezone.now().timestamp()) + ttl,
+    )
+
+
+async def _participant_session(request, session_id):
+    """(user, session, error response) for a session the user takes part in."""
+    user = await request.auser()
+    session = await Session.objects.filter(pk=session_id).afirst()
+    if session is None:
+        return user, None, JsonResponse({'error': 'Session not found'}, status=404)
+    if user.pk not in (session.client_id, session.reader_id):
+        return user, None, JsonResponse({'error': 'Unauthorized'}, status=403)
+    return user, session, None
+
+
+async def _client_balance_ok(session, minimum):
+    wallet = await Wallet.objects.filter(user_id=session.client_id).only('balance').afirst()
+    if wallet is None:
+        raise Wallet.DoesNotExist
+    return wallet.balance >= minimum
+
+
+@sync_to_async
+def _end(session, user, fields):
+    """End `session`, queueing its finalization in the same transaction."""
+    from readings.tasks import session_finalize
+
+    with transaction.atomic():
+        if not session.transition('ended', when=Q(state__in=['active', 'paused', 'reconnecting']), **fields):
+            return False
+        timeline.record(session, 'end', user)
+        outbox.enqueue(session_finalize, session.pk)
+    return True
+
+
+@login_required
+@require_POST
+async def get_rtc_token(request, session_id):
+    """Async get_rtc_token: POST /api/sessions/{session_id}/rtc-token/"""
+    try:
+        user, session, error = await _participant_session(request, session_id)
+        if error:
+            return error
+        if session.state not in ['active', 'waiting']:
+            return JsonResponse({'error': f'Session not active (state={session.state})'}, status=400)
+        if user.pk == session.client_id and not await _client_balance_ok(session, session.rate_per_minute):
+            return JsonResponse({'error': 'Insufficient balance'}, status=402)
+
+        if not session.channel_name:
+            session.channel_name = f"session_{session.id}_{int(timezone.now().timestamp())}"
+            await session.asave(update_fields=['channel_name'])
+
+        token = _rtc_token(session.channel_name, user.pk)
+        logger.info(f"RTC token generated for session {session_id}, user {user.pk}")
+        return JsonResponse({
+            'token': token,
+            'channel': session.channel_name,
+            'uid': user.pk,
+            'expireTime': 1200,
+            'appId': settings.AGORA_APP_ID,
+        })
+    except Wallet.DoesNotExist:
+        return JsonResponse({'error': 'Wallet not found'}, status=404)
+    except Exception as e:
+        logger.error(f"RTC token generation error: {e}")
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+@login_required
+@require_POST
+async def session_join(request, session_id):
+    """Async session_join: POST /api/sessions/{session_id}/join/"""
+    try:
+        user, session, error = await _participant_session(request, session_id)
+        if error:
+            return error
+        if session.state not in ['waiting', 'paused']:
+            return JsonResponse({'error': f'Cannot join from state {session.state}'}, status=400)
+        if user.pk == session.client_id and not await _client_balance_ok(session, session.rate_per_minute):
+            return JsonResponse({'error': 'Insufficient balance'}, status=402)
+
+        fields = {'grace_until': None}
+        if not session.channel_name:
+            fields['channel_name'] = f"session_{session.id}_{int(timezone.now().timestamp())}"
+        if not session.started_at:
+            fields['started_at'] = timezone.now()
+        if not await session.atransition('active', when=Q(state__in=['waiting', 'paused']), **fields):
+            return JsonResponse({'error': 'Invalid state transition'}, status=400)
+        await sync_to_async(timeline.record)(session, 'join', user)
+        logger.info(f"Session {session_id} joined by user {user.pk}")
+
+        return JsonResponse({
+            'success': True,
+            'token': _rtc_token(session.channel_name, user.pk),
+            'channel': session.channel_name,
+            'uid': user.pk,
+            'appId': settings.AGORA_APP_ID,
+        })
+    except Wallet.DoesNotExist:
+        return JsonResponse({'error': 'Wallet not found'}, status=404)
+    except Exception as e:
+        logger.error(f"Session join error: {e}")
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+@login_required
+@require_POST
+async def session_leave(request, session_id):
+    """Async session_leave: POST /api/sessions/{session_id}/leave/"""
+    try:
+        user, session, error = await _participant_session(request, session_id)
+        if error:
+            return error
+        if session.state not in ['active', 'paused']:
+            return JsonResponse({'error': f'Cannot leave from state {session.state}'}, status=400)
+
+        if not await session.atransition(
+            'paused',
+            grace_until=timezone.now() + timedelta(minutes=5),
+            reconnect_count=F('reconnect_count') + 1,
+        ):
+            return JsonResponse({'error': 'Invalid state transition'}, status=400)
+        await sync_to_async(timeline.record)(session, 'leave', user)
+        logger.info(f"Session {session_id} left by user {user.pk}, grace until {session.grace_until}")
+
+        return JsonResponse({
+            'success': True,
+            'state': session.state,
+            'graceUntil': session.grace_until.isoformat(),
+            'reconnectCount': session.reconnect_count,
+        })
+    except Exception as e:
+        logger.error(f"Session leave error: {e}")
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+@login_required
+@require_POST
+async def session_reconnect(request, session_id):
+    """Async session_reconnect: POST /api/sessions/{session_id}/reconnect/"""
+    try:
+        user, session, error = await _participant_session(request, session_id)
+        if error:
+            return error
+        if session.state != 'paused':
+            return JsonResponse({'error': 'Can only reconnect from paused state'}, status=400)
+        if not session.grace_until or timezone.now() > session.grace_until:
+            return JsonResponse({'error': 'Reconnect grace period expired'}, status=410)
+        if user.pk == session.client_id and not await _client_balance_ok(session, session.rate_per_minute):
+            return JsonResponse({'error': 'Insufficient balance for reconnect'}, status=402)
+
+        if not await session.atransition(
+            'active', when=Q(state='paused', grace_until__gte=timezone.now()), grace_until=None,
+        ):
+            return JsonResponse({'error': 'Invalid state transition'}, status=400)
+        await sync_to_async(timeline.record)(session, 'reconnect', user)
+        logger.info(f"Session {session_id} reconnected by user {user.pk}")
+
+        return JsonResponse({
+            'success': True,
+            'token': _rtc_token(session.channel_name, user.pk),
+            'channel': session.channel_name,
+            'uid': user.pk,
+        })
+    except Wallet.DoesNotExist:
+        return JsonResponse({'error': 'Wallet not found'}, status=404)
+    except Exception as e:
+        logger.error(f"Session reconnect error: {e}")
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+@login_required
+@require_POST
+async def session_end(request, session_id):
+    """Async session_end: POST /api/sessions/{session_id}/end/"""
+    try:
+        user, session, error = await _participant_session(request, session_id)
+        if error:
+            return error
+        if session.state not in ['active', 'paused', 'reconnecting']:
+            return JsonResponse({'error': f'Cannot end from state {session.state}'}, status=400)
+
+        fields = {'ended_at': timezone.now()}
+        summary = request.POST.get('summary', '')
+        if summary:
+            fields['summary'] = summary[:1000]
+        if not await _end(session, user, fields):
+            return JsonResponse({'error': 'Invalid state transition'}, status=400)
+        logger.info(f"Session {session_id} ended by user {user.pk}")
+
+        return JsonResponse({
+            'success': True,
+            'state': session.state,
+            'endedAt': session.ended_at.isoformat(),
+            'billingMinutes': session.billing_minutes,
+            'totalCharge': float(session.rate_per_minute * session.billing_minutes),
+        })
+    except Exception as e:
+        logger.error(f"Session end error: {e}")
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+@login_required
+@require_POST
+async def get_livestream_token(request, livestream_id):
+    """Async get_livestream_token: POST /api/livestreams/{livestream_id}/rtc-token/"""
+    from live.models import Livestream
+
+    try:
+        user = await request.auser()
+        livestream = await Livestream.objects.filter(pk=livestream_id).afirst()
+        if livestream is None:
+            return JsonResponse({'error': 'Livestream not found'}, status=404)
+        if not livestream.started_at or livestream.ended_at:
+            return JsonResponse({'error': 'Livestream not active'}, status=400)
+
+        is_host = user.pk == livestream.reader_id
+        if livestream.visibility == 'premium' and not is_host:
+            # Premium streams require a minimum wallet balance ($1.00)
+            wallet = await Wallet.objects.filter(user_id=user.pk).only('balance').afirst()
+            if wallet is None:
+                return JsonResponse({'error': 'Premium stream: wallet required'}, status=402)
+            if wallet.balance < 1:
+                return JsonResponse({'error': 'Premium stream: insufficient wallet balance'}, status=402)
+        elif livestream.visibility == 'private' and not is_host:
+            return JsonResponse({'error': 'Private livestream'}, status=403)
+
+        token = _rtc_token(
+            livestream.agora_channel, user.pk, role=ROLE_PUBLISHER if is_host else ROLE_SUBSCRIBER, ttl=3600,
+        )
+        return JsonResponse({
+            'token': token,
+            'channel': livestream.agora_channel,
+            'uid': user.pk,
+            'appId': settings.AGORA_APP_ID,
+        })
+    except Exception as e:
+        logger.error(f"Livestream token error: {e}")
+        return JsonResponse({'error': str(e)}, status=500)
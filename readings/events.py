@@ -0,0 +1,152 @@
+"""
+Live session events (state changes, billed minutes, grace deadlines) for
+the SSE stream in readings.stream_views.
+
+Lifecycle and billing code calls publish(); events go out on commit over
+Redis pub/sub (SESSION_EVENTS_REDIS_URL, channel session-events:<id>) so
+whichever ASGI worker holds a participant's stream receives them. Each
+ASGI process keeps one Redis connection for all of its streams: a hub
+subscribes to a session's channel while at least one local stream wants
+it and fans messages out to per-stream queues. Without Redis, events only
+reach streams in the publishing process (single-process development).
+"""
+import asyncio
+import json
+import logging
+import threading
+
+from django.conf import settings
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = 'session-events'
+# Per-stream buffer; a client too slow to drain it misses events, not memory.
+QUEUE_SIZE = 100
+
+
+def _channel(session_id):
+    return f'{CHANNEL_PREFIX}:{session_id}'
+
+
+def _redis_url():
+    return getattr(settings, 'SESSION_EVENTS_REDIS_URL', '')
+
+
+_publisher = None
+_publisher_lock = threading.Lock()
+
+
+def _get_publisher():
+    global _publisher
+    if _publisher is None:
+        with _publisher_lock:
+            if _publisher is None:
+                import redis
+                _publisher = redis.Redis.from_url(_redis_url())
+    return _publisher
+
+
+def publish(session_id, event, data):
+    """Send `event` with JSON `data` to the session's streams once the current transaction commits."""
+    message = json.dumps({'event': event, 'data': data}, default=str)
+    transaction.on_commit(lambda: _send(session_id, message))
+
+
+def _send(session_id, message):
+    # Best-effort: a stream that misses an event catches up from its next one.
+    try:
+        if _redis_url():
+            _get_publisher().publish(_channel(session_id), message)
+        else:
+            get_hub().dispatch(_channel(session_id), message)
+    except Exception as e:
+        logger.warning("Session %s event not published: %s", session_id, e)
+
+
+def session_state_event(session):
+    return {
+        'state': session.state,
+        'graceUntil': session.grace_until.isoformat() if session.grace_until else None,
+        'endedAt': session.ended_at.isoformat() if session.ended_at else None,
+        'billingMinutes': session.billing_minutes,
+    }
+
+
+class EventHub:
+    """Per-process fan-out from channels to the asyncio queues of local streams."""
+
+    def __init__(self):
+        self._queues = {}  # channel -> {queue: loop}
+        self._lock = threading.Lock()
+        self._pubsub = None
+        self._reader = None
+
+    def dispatch(self, channel, message):
+        with self._lock:
+            targets = list(self._queues.get(channel, {}).items())
+        for queue, loop in targets:
+            loop.call_soon_threadsafe(_offer, queue, message)
+
+    async def subscribe(self, session_id):
+        channel = _channel(session_id)
+        queue = asyncio.Queue(QUEUE_SIZE)
+        with self._lock:
+            first = channel not in self._queues
+            self._queues.setdefault(channel, {})[queue] = asyncio.get_running_loop()
+        if first and _redis_url():
+            await self._redis_subscribe(channel)
+        return queue
+
+    async def unsubscribe(self, session_id, queue):
+        channel = _channel(session_id)
+        with self._lock:
+            queues = self._queues.get(channel, {})
+            queues.pop(queue, None)
+            last = not queues
+            if last:
+                self._queues.pop(channel, None)
+        if last and self._pubsub is not None:
+            await self._pubsub.unsubscribe(channel)
+
+    async def _redis_subscribe(self, channel):
+        if self._pubsub is None:
+            import redis.asyncio as aioredis
+            self._pubsub = aioredis.Redis.from_url(_redis_url(), decode_responses=True).pubsub()
+        await self._pubsub.subscribe(channel)
+        if self._reader is None or self._reader.done():
+            self._reader = asyncio.create_task(self._read())
+
+    async def _read(self):
+        while True:
+            with self._lock:
+                if not self._queues:
+                    return
+            try:
+                message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            except Exception as e:
+                logger.warning("Session event subscription failed: %s", e)
+                await asyncio.sleep(1)
+                continue
+            if message and message['type'] == 'message':
+                self.dispatch(message['channel'], message['data'])
+
+
+def _offer(queue, message):
+    try:
+        queue.put_nowait(message)
+    except asyncio.QueueFull:
+        pass
+
+
+_hub = None
+_hub_lock = threading.Lock()
+
+
+def get_hub():
+    global _hub
+    if _hub is None:
+        with _hub_lock:
+            if _hub is None:
+                _hub = EventHub()
+    return _hub
@@ -0,0 +1,69 @@
+"""
+Participant heartbeats for live sessions.
+
+The session page posts a heartbeat every SESSION_HEARTBEAT_INTERVAL
+seconds carrying a signed token for (session, participant), so the
+endpoint needs neither the database nor the login session: it checks the
+signature and pushes the participant's deadline forward in one sorted set
+of the presence store (Redis, or process memory in development). The
+sweeper pops the entries whose deadline passed, i.e. participants that
+missed SESSION_HEARTBEAT_MISSES heartbeats in a row, and pauses their
+sessions through the usual grace period flow.
+
+Participants that never sent a heartbeat (e.g. older clients) are not
+tracked and are never paused by the sweeper.
+"""
+import logging
+import time
+
+from django.conf import settings
+from django.core import signing
+
+from readers.presence import get_store
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_KEY = 'heartbeat:sessions'
+TOKEN_SALT = 'readings.heartbeat'
+
+
+def heartbeat_interval():
+    return getattr(settings, 'SESSION_HEARTBEAT_INTERVAL', 10)
+
+
+def heartbeat_misses():
+    return getattr(settings, 'SESSION_HEARTBEAT_MISSES', 3)
+
+
+def make_token(session_id, user_id):
+    return signing.dumps([session_id, user_id], salt=TOKEN_SALT)
+
+
+def read_token(token):
+    """(session_id, user_id) from a heartbeat token, or None if it's not genuine."""
+    try:
+        session_id, user_id = signing.loads(token, salt=TOKEN_SALT)
+    except (signing.BadSignature, TypeError, ValueError):
+        return None
+    return session_id, user_id
+
+
+def beat(session_id, user_id, now=None):
+    """Record a heartbeat. Returns False if the store is unreachable."""
+    deadline = (now or time.time()) + heartbeat_interval() * heartbeat_misses()
+    try:
+        get_store().apply(adds={HEARTBEAT_KEY: {f'{session_id}:{user_id}': deadline}})
+    except Exception as e:
+        logger.warning("Heartbeat for session %s failed: %s", session_id, e)
+        return False
+    return True
+
+
+def silent_session_ids(now=None):
+    """Pop participants past their deadline; returns the ids of their sessions."""
+    try:
+        members = get_store().pop_expired(HEARTBEAT_KEY, now or time.time())
+    except Exception as e:
+        logger.warning("Heartbeat sweep failed: %s", e)
+        return set()
+    return {int(str(member).split(':', 1)[0]) for member in members}
@@ -0,0 +1,240 @@
+"""
+Session lifecycle engine, run once a minute by the session_lifecycle task.
+
+Each cycle reads every session that needs work in one query on the state
+index and groups them by action:
+- active sessions are billed their next minute, or paused when the
+  client's balance runs out (ended if they have no wallet);
+- paused/reconnecting sessions past grace_until are ended, a backstop for
+  expire_session_grace runs lost to a broker outage;
+- sessions ended at least FINALIZE_DELAY ago are finalized, a sweep for
+  those session_end and expire_session_grace did not finalize. The delay
+  lets late charges and heartbeats settle first, so sessions ended during
+  a cycle wait for a later one.
+Groups are applied in batches: a billing batch is one insert of
+LedgerEntry rows plus one UPDATE each for wallets and sessions, state
+changes go through Session.transition_many, and a finalization batch
+reconciles its wallets in one aggregate. Each batch hands its audit
+events to core.audit together. Charges are keyed by session and minute
+and transitions are compare-and-swap, so a retried cycle or a
+concurrent session_finalize does no double work.
+"""
+import logging
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, Q, Sum, Value, When
+from django.utils import timezone
+
+from core import audit
+from . import events, timeline
+from .models import Session
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+GRACE_PERIOD = timedelta(minutes=5)
+FINALIZE_DELAY = timedelta(minutes=5)
+
+
+def charge_key(session_id, minute):
+    return f"session_{session_id}_min_{minute}"
+
+
+def run_cycle(now=None):
+    """One pass over all sessions needing action. Returns counts per action."""
+    now = now or timezone.now()
+    groups = defaultdict(list)
+    for session in _sessions_due(now):
+        if session.state == 'active':
+            groups['bill'].append(session)
+        elif session.state == 'ended':
+            groups['finalize'].append(session)
+        else:
+            groups['expire'].append(session)
+
+    counts = {'billed': 0, 'paused': 0, 'ended': 0, 'finalized': 0}
+    for batch in _batches(groups['bill']):
+        billed, paused, ended = bill(batch, now)
+        counts['billed'] += len(billed)
+        counts['paused'] += len(paused)
+        counts['ended'] += len(ended)
+    for batch in _batches(groups['expire']):
+        counts['ended'] += len(end_expired(batch, now))
+    for batch in _batches(groups['finalize']):
+        counts['finalized'] += len(finalize(batch, now))
+
+    logger.info("Session lifecycle: %s", ', '.join(f"{n} {action}" for action, n in counts.items()))
+    return counts
+
+
+def _sessions_due(now):
+    return list(
+        Session.objects.filter(
+            Q(state='active')
+            | Q(state='ended', ended_at__lte=now - FINALIZE_DELAY)
+            | Q(state__in=['paused', 'reconnecting'], grace_until__lt=now)
+        ).order_by('pk')
+    )
+
+
+def _batches(sessions):
+    for i in range(0, len(sessions), BATCH_SIZE):
+        yield sessions[i:i + BATCH_SIZE]
+
+
+def bill(sessions, now):
+    """
+    Charge each session still active its next minute.
+    Returns (sessions charged, sessions paused, sessions ended).
+    """
+    from wallets.models import LedgerEntry, Wallet, ledger_audit_event
+
+    charged, balances, low, no_wallet = [], {}, [], []
+    with transaction.atomic():
+        # Locked so a concurrent leave or end waits for the charge to land.
+        sessions = list(
+            Session.objects.select_for_update()
+            .filter(pk__in=[s.pk for s in sessions], state='active').order_by('pk')
+        )
+        wallets = {
+            w.user_id: w for w in Wallet.objects.select_for_update()
+            .filter(user_id__in={s.client_id for s in sessions}).order_by('pk')
+        }
+        keys = {s.pk: charge_key(s.pk, s.billing_minutes + 1) for s in sessions}
+        already = set(LedgerEntry.objects.filter(
+            idempotency_key__in=keys.values(),
+        ).values_list('idempotency_key', flat=True))
+
+        entries, debits = [], defaultdict(Decimal)
+        for s in sessions:
+            rate = s.rate_per_minute
+            wallet = wallets.get(s.client_id)
+            if rate <= 0:
+                logger.warning(f"Session {s.pk} has zero rate, skipping")
+            elif keys[s.pk] in already:
+                logger.info(f"Session {s.pk} already charged for minute {s.billing_minutes + 1}, skipping")
+            elif wallet is None:
+                logger.error(f"Session {s.pk} wallet not found, ending session")
+                no_wallet.append(s)
+            elif wallet.balance < rate:
+                logger.info(f"Session {s.pk} low balance (${wallet.balance} < ${rate}), pausing")
+                low.append(s)
+            else:
+                wallet.balance -= rate
+                debits[wallet.pk] += rate
+                balances[s.pk] = wallet.balance
+                entries.append(LedgerEntry(
+                    wallet=wallet, amount=-rate, entry_type='session_charge', idempotency_key=keys[s.pk],
+                    session=s, reference_type='session', reference_id=str(s.pk),
+                ))
+                charged.append(s)
+
+        LedgerEntry.objects.bulk_create(entries)
+        audit.record_many(ledger_audit_event(e, s.client_id) for e, s in zip(entries, charged))
+        timeline.record_many(
+            timeline.event(s, 'bill', minute=s.billing_minutes + 1, amount=str(s.rate_per_minute)) for s in charged
+        )
+        if debits:
+            Wallet.objects.filter(pk__in=debits).update(
+                balance=F('balance') - Case(
+                    *[When(pk=pk, then=Value(amount)) for pk, amount in debits.items()],
+                    output_field=DecimalField(max_digits=12, decimal_places=2),
+                ),
+                updated_at=now,
+            )
+        if charged:
+            Session.objects.filter(pk__in=[s.pk for s in charged]).update(
+                billing_minutes=F('billing_minutes') + 1, last_billing_at=now,
+            )
+        for s in charged:
+            s.billing_minutes += 1
+            s.last_billing_at = now
+            events.publish(s.pk, 'billing', {
+                'billingMinutes': s.billing_minutes,
+                'charged': str(s.rate_per_minute),
+                'balance': str(balances[s.pk]),
+            })
+
+    paused = Session.transition_many(
+        low, 'paused', grace_until=now + GRACE_PERIOD, reconnect_count=F('reconnect_count') + 1,
+    )
+    ended = Session.transition_many(no_wallet, 'ended', ended_at=now)
+    timeline.record_many(
+        [timeline.event(s, 'pause', reason='balance') for s in paused]
+        + [timeline.event(s, 'end', reason='no_wallet') for s in ended]
+    )
+    return charged, paused, ended
+
+
+def end_expired(sessions, now):
+    """End the sessions whose grace period is still over. Returns those ended."""
+    ended = Session.transition_many(sessions, 'ended', when=Q(grace_until__lt=now), ended_at=now)
+    for s in ended:
+        logger.info(f"Session {s.pk} grace period expired, ending")
+    timeline.record_many(timeline.event(s, 'end', reason='grace_expired') for s in ended)
+    return ended
+
+
+def finalize(sessions, now=None):
+    """
+    Finalize the sessions still ended: record their summary, reconcile
+    their clients' wallets against the ledger and audit them. Returns the
+    sessions finalized.
+    """
+    finalized = Session.transition_many(sessions, 'finalized', summary=_summary)
+    if not finalized:
+        return []
+    _reconcile_wallets({s.client_id for s in finalized})
+    audit.record_many(
+        audit.event(
+            'session_finalized',
+            user=s.client_id,
+            obj=s,
+            details={
+                'modality': s.modality,
+                'billing_minutes': s.billing_minutes,
+                'rate_per_minute': str(s.rate_per_minute),
+                'total_charge': float(s.rate_per_minute * s.billing_minutes),
+            },
+        )
+        for s in finalized
+    )
+    logger.info(f"Finalized {len(finalized)} sessions")
+    return finalized
+
+
+def _summary(session):
+    total_charge = float(session.rate_per_minute * session.billing_minutes)
+    return (
+        f"Session completed. Duration: {session.billing_minutes} minutes. "
+        f"Total charged: ${total_charge:.2f}. Modality: {session.modality}."
+    )
+
+
+def _reconcile_wallets(client_ids):
+    """Reset any of these clients' wallet balances that drifted from their ledger."""
+    from wallets.models import LedgerEntry, Wallet
+
+    with transaction.atomic():
+        balances = dict(
+            Wallet.objects.select_for_update().filter(user_id__in=client_ids)
+            .order_by('pk').values_list('pk', 'balance')
+        )
+        sums = dict(
+            LedgerEntry.objects.filter(wallet_id__in=balances).order_by()
+            .values('wallet_id').annotate(total=Sum('amount')).values_list('wallet_id', 'total')
+        )
+        fixes = {}
+        for pk, balance in balances.items():
+            ledger_sum = sums.get(pk) or Decimal('0')
+            if balance != ledger_sum:
+                logger.warning(f"Wallet {pk} ledger mismatch: balance={balance}, ledger_sum={ledger_sum}")
+                fixes[pk] = ledger_sum
+        if fixes:
+            Wallet.objects.filter(pk__in=fixes).update(balance=Case(
+                *[When(pk=pk, then=Value(total)) for pk, total in fixes.items()],
+                output_field=DecimalField(max_digits=12, decimal_places=2),
+            ))
@@ -0,0 +1,167 @@
+"""
+Side-by-side benchmark of the sync (readings.agora_views) and async
+(readings.async_agora_views) session API views.
+
+Each simulated participant runs join -> leave -> reconnect -> end on its
+own session, logged in through the session cookie. The sync views are
+driven from a pool of --workers threads through the test Client,
+modelling that many sync gunicorn workers; the async views run on one
+event loop through AsyncClient with every participant in flight at once,
+each request in its own thread-sensitive context as under ASGI, with at
+most --concurrency in flight (the database connection budget). Both go
+through the full middleware chain, built the way the WSGI and ASGI
+handlers build it, so any middleware that forces async requests through
+a thread shows up in the async numbers. Celery tasks are queued in the
+task outbox (core.outbox), as in production, and not dispatched. All
+rows it creates are removed afterwards.
+
+Run against a disposable database.
+"""
+import asyncio
+import statistics
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from types import ModuleType
+
+from asgiref.sync import ThreadSensitiveContext, sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import AsyncClient, Client, override_settings
+from django.urls import path
+
+from core.models import OutboxMessage
+from readings import agora_views, async_agora_views
+from readings.models import Session
+from wallets.models import Wallet
+
+User = get_user_model()
+
+STEPS = ('session_join', 'session_leave', 'session_reconnect', 'session_end')
+
+
+def _urlconf(views):
+    """The session API routed to `views`, as readings.api_urls does per process."""
+    urlconf = ModuleType(f'{views.__name__}_urls')
+    urlconf.urlpatterns = [
+        path(f"api/sessions/<int:session_id>/{step.removeprefix('session_')}/", getattr(views, step))
+        for step in STEPS
+    ]
+    return urlconf
+
+
+class Command(BaseCommand):
+    help = 'Compare throughput of the sync and async session API views.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--participants', type=int, default=200)
+        parser.add_argument('--workers', type=int, default=4, help='Sync worker threads')
+        parser.add_argument('--concurrency', type=int, default=50, help='Async requests in flight (DB connections)')
+
+    def handle(self, *args, **options):
+        participants, workers, concurrency = options['participants'], options['workers'], options['concurrency']
+        if min(participants, workers, concurrency) < 1:
+            raise CommandError('--participants, --workers and --concurrency must be positive')
+
+        tag = uuid.uuid4().hex[:8]
+        reader = User.objects.create_user(username=f'bench_reader_{tag}')
+        User.objects.bulk_create([User(username=f'bench_client_{tag}_{i}') for i in range(participants)])
+        clients = list(User.objects.filter(username__startswith=f'bench_client_{tag}_'))
+        Wallet.objects.bulk_create([Wallet(user=c, balance=Decimal('1000')) for c in clients])
+        last_message = OutboxMessage.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+        # As soulseer.settings configures the ASGI process.
+        async_middleware = [m for m in settings.MIDDLEWARE if m != 'whitenoise.middleware.WhiteNoiseMiddleware']
+        runs = (
+            ('sync', self._run_sync, workers, agora_views, settings.MIDDLEWARE),
+            ('async', self._run_async, concurrency, async_agora_views, async_middleware),
+        )
+        try:
+            for label, run, limit, views, middleware in runs:
+                sessions = self._create_sessions(reader, clients)
+                with override_settings(
+                    ROOT_URLCONF=_urlconf(views), MIDDLEWARE=middleware,
+                    ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+                ):
+                    elapsed, latencies, statuses = run(sessions, limit)
+                ended = Session.objects.filter(pk__in=[s.pk for s in sessions], state='ended').count()
+                self._report(label, participants, elapsed, latencies, statuses, ended)
+        finally:
+            OutboxMessage.objects.filter(pk__gt=last_message).delete()
+            Session.objects.filter(reader=reader).delete()
+            User.objects.filter(pk__in=[c.pk for c in clients] + [reader.pk]).delete()
+
+    def _create_sessions(self, reader, clients):
+        Session.objects.bulk_create([
+            Session(client=c, reader=reader, state='waiting', rate_per_minute=Decimal('1.00')) for c in clients
+        ])
+        return list(Session.objects.filter(reader=reader, state='waiting').select_related('client'))
+
+    def _path(self, session, step):
+        return f"/api/sessions/{session.pk}/{step.removeprefix('session_')}/"
+
+    def _run_sync(self, sessions, workers):
+        latencies, statuses = [], []
+
+        def participant(session):
+            client = Client()
+            try:
+                client.force_login(session.client)
+                for step in STEPS:
+                    began = time.perf_counter()
+                    response = client.post(self._path(session, step), secure=True)
+                    latencies.append(time.perf_counter() - began)
+                    statuses.append(response.status_code)
+                client.logout()
+            finally:
+                connection.close()
+
+        began = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(participant, sessions))
+        return time.perf_counter() - began, latencies, statuses
+
+    def _run_async(self, sessions, concurrency):
+        latencies, statuses = [], []
+
+        async def call(client, session, step, slots):
+            async with slots, ThreadSensitiveContext():
+                began = time.perf_counter()
+                response = await client.post(self._path(session, step), secure=True)
+                latencies.append(time.perf_counter() - began)
+                statuses.append(response.status_code)
+                # As on request_finished under ASGI.
+                await sync_to_async(lambda: connection.close())()
+
+        async def participant(session, slots):
+            client = AsyncClient()
+            async with slots, ThreadSensitiveContext():
+                await client.aforce_login(session.client)
+            for step in STEPS:
+                await call(client, session, step, slots)
+            async with slots, ThreadSensitiveContext():
+                await client.alogout()
+                await sync_to_async(lambda: connection.close())()
+
+        async def main():
+            slots = asyncio.Semaphore(concurrency)
+            await asyncio.gather(*(participant(s, slots) for s in sessions))
+
+        # A fresh thread starts with empty context, so requests don't
+        # inherit this thread's database connection.
+        began = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=1) as loop_thread:
+            loop_thread.submit(asyncio.run, main()).result()
+        return time.perf_counter() - began, latencies, statuses
+
+    def _report(self, label, participants, elapsed, latencies, statuses, ended):
+        latencies = sorted(latencies)
+        p95 = latencies[int(len(latencies) * 0.95) - 1] if latencies else 0
+        codes = ', '.join(f"{code}: {statuses.count(code)}" for code in sorted(set(statuses)))
+        self.stdout.write(
+            f"{label:>5}: {len(statuses)} requests in {elapsed:.2f}s ({len(statuses) / elapsed:.0f} req/s), "
+            f"p50 {statistics.median(latencies) * 1000:.0f}ms, p95 {p95 * 1000:.0f}ms; "
+            f"{ended}/{participants} sessions ended; statuses {codes}"
+        )
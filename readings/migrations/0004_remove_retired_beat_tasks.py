@@ -0,0 +1,37 @@
+from django.apps import apps as global_apps
+from django.db import migrations
+from django.utils import timezone
+
+# Beat entries replaced by session-lifecycle and per-session grace expiry.
+# django_celery_beat's DatabaseScheduler only adds and updates rows from
+# CELERY_BEAT_SCHEDULE, so their PeriodicTask rows must be removed here.
+RETIRED_TASKS = [
+    'readings.tasks.billing_tick',
+    'readings.tasks.finalize_sessions',
+    'readings.tasks.handle_reconnect_timeout',
+    'readings.tasks.expire_grace_periods',
+]
+
+
+def remove_retired_beat_tasks(apps, schema_editor):
+    try:
+        PeriodicTask = apps.get_model('django_celery_beat', 'PeriodicTask')
+        PeriodicTasks = apps.get_model('django_celery_beat', 'PeriodicTasks')
+    except LookupError:
+        return
+    if PeriodicTask.objects.filter(task__in=RETIRED_TASKS).delete()[0]:
+        # Tells a running beat to reload its schedule.
+        PeriodicTasks.objects.update_or_create(ident=1, defaults={'last_update': timezone.now()})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('readings', '0003_sessionevent'),
+    ]
+    if global_apps.is_installed('django_celery_beat'):
+        dependencies.append(('django_celery_beat', '0001_initial'))
+
+    operations = [
+        migrations.RunPython(remove_retired_beat_tasks, migrations.RunPython.noop),
+    ]
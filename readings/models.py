@@ -1,6 +1,10 @@
 from decimal import Decimal
+from asgiref.sync import sync_to_async
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Case, Value, When
+from django.db.models.signals import post_save
+from django.utils import timezone
 
 SESSION_STATES = [
     ('created', 'Created'),
@@ -12,6 +16,25 @@ SESSION_STATES = [
     ('finalized', 'Finalized'),
 ]
 
+# Allowed moves; Session.transition only fires from the listed source states.
+SESSION_TRANSITIONS = {
+    'created': ['waiting'],
+    'waiting': ['active', 'ended'],
+    'active': ['paused', 'ended'],
+    'paused': ['reconnecting', 'active', 'ended'],
+    'reconnecting': ['active', 'ended'],
+    'ended': ['finalized'],
+}
+
+SESSION_EVENT_KINDS = [
+    ('join', 'Join'),
+    ('leave', 'Leave'),
+    ('pause', 'Pause'),
+    ('reconnect', 'Reconnect'),
+    ('bill', 'Bill'),
+    ('end', 'End'),
+]
+
 MODALITY_CHOICES = [
     ('text', 'Text'),
     ('voice', 'Voice'),
@@ -49,20 +72,105 @@ class Session(models.Model):
     def __str__(self):
         return f"Session {self.pk} ({self.state})"
 
-    def transition(self, new_state):
-        valid = {
-            'created': ['waiting'],
-            'waiting': ['active', 'ended'],
-            'active': ['paused', 'ended'],
-            'paused': ['reconnecting', 'active', 'ended'],
-            'reconnecting': ['active', 'ended'],
-            'ended': ['finalized'],
-        }
-        if new_state in valid.get(self.state, []):
-            self.state = new_state
-            self.save(update_fields=['state'])
-            return True
-        return False
+    def transition(self, new_state, when=None, **fields):
+        """
+        Compare-and-swap to `new_state`, writing `fields` in the same UPDATE.
+
+        The UPDATE only matches while the row is in a state that may move to
+        `new_state` (and matches `when`, an optional extra Q), so of two
+        racing callers exactly one wins. Returns whether this call won; a
+        loser writes nothing and leaves the instance untouched. Fields set
+        to expressions (e.g. F('reconnect_count') + 1) are re-read after a
+        win. post_save is sent with update_fields as for save(), inside the
+        same transaction, so work its receivers queue in the task outbox
+        commits with the change.
+        """
+        qs = self._transition_queryset(new_state, when)
+        with transaction.atomic(using=qs.db):
+            if not qs.update(state=new_state, **fields):
+                return False
+            expressions = self._apply_transition(new_state, fields)
+            if expressions:
+                self.refresh_from_db(fields=expressions)
+            post_save.send(**self._transition_signal_kwargs(qs.db, fields))
+        return True
+
+    async def atransition(self, new_state, when=None, **fields):
+        """Async version of transition()."""
+        # Transactions are sync-only in Django; run the whole CAS in one thread.
+        return await sync_to_async(self.transition)(new_state, when, **fields)
+
+    @classmethod
+    def transition_many(cls, sessions, new_state, when=None, **fields):
+        """
+        transition() for many sessions in one UPDATE; returns those that moved.
+
+        Rows are locked and re-checked first, skipping any another worker
+        holds, so the result is exactly the set the UPDATE changed. A field
+        may also be a callable taking the session, for per-row values.
+        Returned instances are fresh copies; post_save is sent for each,
+        inside the transaction as for transition().
+        """
+        with transaction.atomic():
+            won = list(
+                cls._eligible(new_state, when).select_for_update(skip_locked=True)
+                .filter(pk__in=[s.pk for s in sessions]).order_by('pk')
+            )
+            if not won:
+                return []
+            per_row = {
+                name: {s.pk: value(s) for s in won} for name, value in fields.items() if callable(value)
+            }
+            values = {
+                name: Case(
+                    *[When(pk=pk, then=Value(v)) for pk, v in per_row[name].items()],
+                    output_field=cls._meta.get_field(name),
+                ) if name in per_row else value
+                for name, value in fields.items()
+            }
+            qs = cls.objects.filter(pk__in=[s.pk for s in won])
+            qs.update(state=new_state, **values)
+
+            expressions = []
+            for s in won:
+                expressions = s._apply_transition(new_state, {
+                    name: per_row[name][s.pk] if name in per_row else value for name, value in fields.items()
+                })
+            if expressions:
+                current = {row['pk']: row for row in qs.values('pk', *expressions)}
+                for s in won:
+                    for name in expressions:
+                        setattr(s, name, current[s.pk][name])
+            for s in won:
+                post_save.send(**s._transition_signal_kwargs(qs.db, fields))
+        return won
+
+    @classmethod
+    def _eligible(cls, new_state, when):
+        """Sessions in a state that may move to `new_state` and matching `when`."""
+        sources = [state for state, targets in SESSION_TRANSITIONS.items() if new_state in targets]
+        qs = cls.objects.filter(state__in=sources)
+        return qs.filter(when) if when is not None else qs
+
+    def _transition_queryset(self, new_state, when):
+        return self._eligible(new_state, when).filter(pk=self.pk)
+
+    def _apply_transition(self, new_state, fields):
+        """Copy a won transition onto the instance; returns expression fields to re-read."""
+        self.state = new_state
+        expressions = []
+        for name, value in fields.items():
+            if hasattr(value, 'resolve_expression'):
+                expressions.append(name)
+            else:
+                setattr(self, name, value)
+        return expressions
+
+    def _transition_signal_kwargs(self, using, fields):
+        return dict(
+            sender=Session, instance=self, created=False, raw=False,
+            using=using, update_fields=frozenset(['state', *fields]),
+        )
 
 
 class SessionNote(models.Model):
@@ -88,3 +196,29 @@ class SessionNote(models.Model):
     )
     body = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
+
+
+class SessionEvent(models.Model):
+    """Append-only session timeline, written in batches by readings.timeline."""
+    session = models.ForeignKey(Session, on_delete=models.CASCADE, related_name='events', db_index=False)
+    kind = models.CharField(max_length=20, choices=SESSION_EVENT_KINDS)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        db_index=False,
+        help_text='Participant who acted; empty for system steps',
+    )
+    data = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['session', 'created_at'], name='readings_event_session_idx'),
+            models.Index(fields=['kind', 'created_at'], name='readings_event_kind_idx'),
+        ]
+
+    def __str__(self):
+        return f"Session {self.session_id} {self.kind}"
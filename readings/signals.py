@@ -0,0 +1,26 @@
+"""
+Queue each session's grace expiry in the task outbox when its deadline is
+set, so expiry runs exactly at grace_until instead of on a polling sweep,
+and publish state changes to the session's live event stream.
+"""
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from core import outbox
+from . import events
+from .models import Session
+
+
+@receiver(post_save, sender=Session)
+def session_saved(sender, instance, update_fields=None, **kwargs):
+    if not update_fields or 'grace_until' not in update_fields or instance.grace_until is None:
+        return
+    # A reconnect or a later grace period makes this run a no-op.
+    from .tasks import expire_session_grace
+    outbox.enqueue(expire_session_grace, instance.pk, instance.grace_until.isoformat(), eta=instance.grace_until)
+
+
+@receiver(post_save, sender=Session)
+def session_state_published(sender, instance, created=False, update_fields=None, **kwargs):
+    if created or not update_fields or 'state' in update_fields:
+        events.publish(instance.pk, 'state', events.session_state_event(instance))
@@ -0,0 +1,82 @@
+"""
+Server-Sent Events stream of a session's live state.
+
+Async view: under ASGI (soulseer.asgi, e.g. uvicorn workers) an open
+stream is a coroutine waiting on a queue, so a handful of workers hold
+thousands of streams. Under WSGI every stream would pin a sync worker;
+route /api/sessions/<id>/events/ to the ASGI process.
+"""
+import asyncio
+import json
+import logging
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse, StreamingHttpResponse
+
+from .events import get_hub, session_state_event
+from .models import Session
+
+logger = logging.getLogger(__name__)
+
+# Comment line sent when idle, so proxies don't time out the connection.
+KEEPALIVE_SECONDS = 15
+FINAL_STATES = ('ended', 'finalized')
+
+
+def _format(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def session_events(request, session_id):
+    """
+    GET /api/sessions/{session_id}/events/ (text/event-stream)
+
+    Events:
+      state    {state, graceUntil, endedAt, billingMinutes}: sent on connect
+               and on every transition; the stream closes after ended/finalized
+      billing  {billingMinutes, charged, balance}: each billed minute;
+               balance is only sent to the client
+    """
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Method not allowed'}, status=405)
+    # request.user is the session user or, for bearer requests, the user
+    # Auth0BearerMiddleware set; resolving it may query, so off the loop.
+    user_id = await sync_to_async(lambda: request.user.pk)()
+    if user_id is None:
+        return JsonResponse({'error': 'Authentication required'}, status=401)
+    session = await Session.objects.filter(pk=session_id).afirst()
+    if session is None:
+        return JsonResponse({'error': 'Session not found'}, status=404)
+    if user_id not in (session.client_id, session.reader_id):
+        return JsonResponse({'error': 'Unauthorized'}, status=403)
+    is_client = user_id == session.client_id
+
+    async def stream():
+        hub = get_hub()
+        # Subscribe before the snapshot so no transition falls in between.
+        queue = await hub.subscribe(session_id)
+        try:
+            snapshot = await Session.objects.aget(pk=session_id)
+            yield _format('state', session_state_event(snapshot))
+            if snapshot.state in FINAL_STATES:
+                return
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ': keepalive\n\n'
+                    continue
+                payload = json.loads(message)
+                data = payload['data']
+                if payload['event'] == 'billing' and not is_client:
+                    data = {k: v for k, v in data.items() if k != 'balance'}
+                yield _format(payload['event'], data)
+                if payload['event'] == 'state' and data.get('state') in FINAL_STATES:
+                    return
+        finally:
+            await hub.unsubscribe(session_id, queue)
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,63 @@
+"""
+Session timeline: one append-only SessionEvent per lifecycle step (join,
+leave, pause, reconnect, bill, end), written after commit through the
+buffered batch writer (core.batching), so recording one costs no query
+on the request path.
+
+Session keeps only the current state its transitions compare against.
+History and analytics, such as reconnect rates and minutes per
+modality, come from grouped scans over the events on the
+(kind, created_at) index.
+"""
+from functools import partial
+
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from core import batching
+
+MODEL = 'readings.SessionEvent'
+
+
+def event(session, kind, user=None, **data):
+    """A timeline event for record_many(); `data` must be JSON-serialisable."""
+    return {
+        'session_id': getattr(session, 'pk', session),
+        'kind': kind,
+        'user_id': getattr(user, 'pk', user),
+        'data': data,
+        'created_at': timezone.now(),
+    }
+
+
+def record(session, kind, user=None, **data):
+    record_many([event(session, kind, user, **data)])
+
+
+def record_many(events):
+    events = list(events)
+    if events:
+        transaction.on_commit(partial(batching.get_writer(MODEL).append, events))
+
+
+def reconnect_rate(start, end):
+    """Share of the sessions joined in [start, end) that reconnected at least once."""
+    from .models import SessionEvent
+
+    sessions = dict(
+        SessionEvent.objects.filter(kind__in=['join', 'reconnect'], created_at__gte=start, created_at__lt=end)
+        .values('kind').annotate(n=Count('session', distinct=True)).values_list('kind', 'n')
+    )
+    joined = sessions.get('join', 0)
+    return sessions.get('reconnect', 0) / joined if joined else 0.0
+
+
+def minutes_by_modality(start, end):
+    """{modality: billed minutes} for minutes billed in [start, end)."""
+    from .models import SessionEvent
+
+    return dict(
+        SessionEvent.objects.filter(kind='bill', created_at__gte=start, created_at__lt=end)
+        .values('session__modality').annotate(n=Count('pk')).values_list('session__modality', 'n')
+    )
@@ -1,8 +1,10 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.http import require_POST
+from django.db.models import F, Q
 from django.utils import timezone
 from datetime import timedelta
+from . import heartbeats, timeline
 from .models import Session, SessionNote
 from readers.models import ReaderProfile, ReaderRate
 from wallets.models import Wallet
@@ -30,9 +32,8 @@ def create_session(request, reader_id):
         rate_per_minute=rpm,
         state='waiting',
     )
-    session.channel_name = f"session_{session.pk}"
-    session.save(update_fields=['channel_name'])
-    session.transition('active')
+    if session.transition('active', channel_name=f"session_{session.pk}"):
+        timeline.record(session, 'join', request.user)
     return redirect('session_detail', pk=session.pk)
 
 
@@ -44,9 +45,13 @@ def session_view(request, pk):
     
     # Check if session should be in reconnecting state
     if session.state == 'paused' and session.grace_until and session.grace_until > timezone.now():
-        session.transition('reconnecting')
+        session.transition('reconnecting', when=Q(grace_until__gt=timezone.now()))
     
-    return render(request, 'readings/session.html', {'session': session})
+    return render(request, 'readings/session.html', {
+        'session': session,
+        'heartbeat_token': heartbeats.make_token(session.pk, request.user.pk),
+        'heartbeat_interval': heartbeats.heartbeat_interval(),
+    })
 
 
 @login_required
@@ -59,10 +64,12 @@ def session_disconnect(request, pk):
     
     if session.state == 'active':
         # Enter grace period for reconnection (5 minutes)
-        session.grace_until = timezone.now() + timedelta(minutes=5)
-        session.reconnect_count += 1
-        session.transition('paused')
-        session.save(update_fields=['grace_until', 'reconnect_count'])
+        if session.transition(
+            'paused',
+            grace_until=timezone.now() + timedelta(minutes=5),
+            reconnect_count=F('reconnect_count') + 1,
+        ):
+            timeline.record(session, 'leave', request.user)
     
     return redirect('session_detail', pk=pk)
 
@@ -77,9 +84,8 @@ def session_reconnect(request, pk):
     
     # Check if within grace period
     if session.state == 'paused' and session.grace_until and session.grace_until > timezone.now():
-        session.transition('active')
-        session.grace_until = None
-        session.save(update_fields=['grace_until'])
+        if session.transition('active', when=Q(state='paused', grace_until__gt=timezone.now()), grace_until=None):
+            timeline.record(session, 'reconnect', request.user)
     
     return redirect('session_detail', pk=pk)
 
@@ -93,9 +99,8 @@ def session_end(request, pk):
         return redirect('reader_list')
 
     if session.state in ('active', 'paused', 'reconnecting'):
-        session.ended_at = timezone.now()
-        session.transition('ended')
-        session.save(update_fields=['ended_at'])
+        if session.transition('ended', ended_at=timezone.now()):
+            timeline.record(session, 'end', request.user)
 
     return redirect('session_detail', pk=pk)
 
@@ -1,12 +1,39 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from .cancellation import cancel_bookings
 from .models import ScheduledSlot, Booking
 
 
+def _cancel(modeladmin, request, slot_ids, full_refund):
+    count, refunded = cancel_bookings(slot_ids, full_refund=full_refund)
+    modeladmin.message_user(request, f"Cancelled {count} booking(s); refunded ${refunded}.", messages.SUCCESS)
+
+
 @admin.register(ScheduledSlot)
 class ScheduledSlotAdmin(admin.ModelAdmin):
     list_display = ('reader', 'start', 'end', 'duration_minutes', 'status', 'client')
+    list_filter = ('status',)
+    date_hierarchy = 'start'
+    search_fields = ('reader__username',)
+    actions = ['cancel_with_policy_refund', 'cancel_with_full_refund']
+
+    @admin.action(description='Cancel selected bookings (refund per cancellation policy)')
+    def cancel_with_policy_refund(self, request, queryset):
+        _cancel(self, request, queryset.values_list('pk', flat=True), full_refund=False)
+
+    @admin.action(description='Cancel selected bookings (full refund)')
+    def cancel_with_full_refund(self, request, queryset):
+        _cancel(self, request, queryset.values_list('pk', flat=True), full_refund=True)
 
 
 @admin.register(Booking)
 class BookingAdmin(admin.ModelAdmin):
     list_display = ('slot', 'client', 'amount', 'cancelled_at')
+    actions = ['cancel_with_policy_refund', 'cancel_with_full_refund']
+
+    @admin.action(description='Cancel selected bookings (refund per cancellation policy)')
+    def cancel_with_policy_refund(self, request, queryset):
+        _cancel(self, request, queryset.values_list('slot_id', flat=True), full_refund=False)
+
+    @admin.action(description='Cancel selected bookings (full refund)')
+    def cancel_with_full_refund(self, request, queryset):
+        _cancel(self, request, queryset.values_list('slot_id', flat=True), full_refund=True)
@@ -0,0 +1,6 @@
+from django.urls import path
+from .api_views import reader_calendar_view
+
+urlpatterns = [
+    path('readers/<int:reader_id>/calendar/', reader_calendar_view, name='api_reader_calendar'),
+]
@@ -0,0 +1,73 @@
+"""
+JSON calendar for booking widgets.
+"""
+import hashlib
+import logging
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.http import JsonResponse
+from django.utils.dateparse import parse_date, parse_datetime
+from django.views.decorators.http import condition, require_GET
+
+from .calendar import reader_calendar, schedule_version
+
+logger = logging.getLogger(__name__)
+
+MAX_RANGE = timedelta(days=62)
+
+
+def _parse_bound(value):
+    """ISO date (midnight UTC) or datetime; naive datetimes are taken as UTC."""
+    if not value:
+        return None
+    try:
+        parsed = parse_datetime(value)
+        if parsed is None:
+            day = parse_date(value)
+            parsed = datetime.combine(day, time.min) if day else None
+    except ValueError:
+        return None
+    if parsed is not None and parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=dt_timezone.utc)
+    return parsed
+
+
+def _calendar_etag(request, reader_id):
+    version = schedule_version(reader_id)
+    if version is None:
+        return None
+    params = f"{request.GET.get('start', '')}|{request.GET.get('end', '')}"
+    digest = hashlib.sha1(params.encode('utf-8')).hexdigest()[:12]
+    return f"{reader_id}-{version}-{digest}"
+
+
+@require_GET
+@condition(etag_func=_calendar_etag)
+def reader_calendar_view(request, reader_id):
+    """
+    A reader's slots as run-length encoded blocks.
+
+    GET /api/scheduling/readers/{reader_id}/calendar/?start=2026-11-01&end=2026-12-01
+    reader_id is the reader's user id. Blocks are [start, end, status, slots]
+    with status "available" or "busy". Send If-None-Match with the last ETag
+    to get 304 while the reader's schedule is unchanged.
+    """
+    start = _parse_bound(request.GET.get('start'))
+    end = _parse_bound(request.GET.get('end'))
+    if start is None or end is None:
+        return JsonResponse({'error': 'start and end are required ISO dates or datetimes'}, status=400)
+    if not start < end <= start + MAX_RANGE:
+        return JsonResponse({'error': f'Range must be positive and at most {MAX_RANGE.days} days'}, status=400)
+
+    blocks = reader_calendar(reader_id, start, end)
+    response = JsonResponse({
+        'reader': reader_id,
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'slotMinutes': getattr(settings, 'SCHEDULING_SLOT_MINUTES', 30),
+        'blocks': [[s.isoformat(), e.isoformat(), status, n] for s, e, status, n in blocks],
+    })
+    # Cacheable, but clients must revalidate (cheaply, via the ETag).
+    response['Cache-Control'] = 'no-cache'
+    return response
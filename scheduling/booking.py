@@ -0,0 +1,121 @@
+"""
+Race-free slot booking.
+
+A booking claims the slot with a conditional UPDATE (status='available' ->
+'booked'), so of any number of concurrent bookers exactly one matches the
+row. Claim, overlap check, wallet debit and Booking row share one
+transaction: if any step fails, the claim and the debit roll back together.
+
+Overlap between a reader's booked slots is prevented by the database:
+- PostgreSQL: an exclusion constraint over tstzrange(start, end) per reader
+  (OVERLAP_CONSTRAINT, installed by migration scheduling.0004), enforced
+  for concurrent writers;
+- elsewhere: the reader row is locked and an indexed range query checks
+  for overlaps before commit (SQLite serializes writers anyway).
+"""
+import logging
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, connection, transaction
+
+from .calendar import bump_schedule_version
+from .models import Booking, ScheduledSlot
+
+logger = logging.getLogger(__name__)
+
+OCCUPIED_STATUSES = ('booked', 'completed')
+# Longest slot we expect; bounds the overlap range scan on (reader, start).
+MAX_SLOT_LENGTH = timedelta(hours=24)
+OVERLAP_CONSTRAINT = 'scheduling_excl_reader_overlap'
+
+
+class BookingError(Exception):
+    """A slot could not be booked. The message is safe to show the client."""
+
+
+class SlotUnavailable(BookingError):
+    pass
+
+
+class SlotConflict(BookingError):
+    pass
+
+
+class InsufficientBalance(BookingError):
+    pass
+
+
+def slot_price(slot):
+    """Reader's first listed per-minute rate times the slot length."""
+    from readers.models import ReaderRate
+
+    rate = (
+        ReaderRate.objects.filter(reader__user_id=slot.reader_id)
+        .order_by('pk').values_list('rate_per_minute', flat=True).first()
+    )
+    return (rate if rate is not None else Decimal('1.00')) * Decimal(slot.duration_minutes)
+
+
+def has_overlap(slot):
+    """Whether another occupied slot of the same reader overlaps `slot`."""
+    return ScheduledSlot.objects.filter(
+        reader_id=slot.reader_id,
+        status__in=OCCUPIED_STATUSES,
+        start__gt=slot.start - MAX_SLOT_LENGTH,
+        start__lt=slot.end,
+        end__gt=slot.start,
+    ).exclude(pk=slot.pk).exists()
+
+
+def is_overlap_violation(error):
+    """Whether IntegrityError `error` is the PostgreSQL overlap exclusion constraint firing."""
+    cause = error.__cause__
+    sqlstate = getattr(cause, 'sqlstate', None) or getattr(cause, 'pgcode', None)  # psycopg 3 / psycopg2
+    constraint = getattr(getattr(cause, 'diag', None), 'constraint_name', None)
+    return sqlstate == '23P01' and constraint == OVERLAP_CONSTRAINT
+
+
+def create_booking(slot_id, client):
+    """
+    Book slot `slot_id` for `client`, charging their wallet. Returns the
+    Booking; raises a BookingError subclass if the slot is taken, overlaps
+    another booking, or the wallet can't cover it.
+    """
+    from django.contrib.auth import get_user_model
+    from wallets.models import LedgerEntry, Wallet, debit_wallet
+
+    try:
+        with transaction.atomic():
+            claimed = ScheduledSlot.objects.filter(pk=slot_id, status='available').update(
+                status='booked', client=client,
+            )
+            if not claimed:
+                raise SlotUnavailable('This slot is no longer available.')
+            slot = ScheduledSlot.objects.get(pk=slot_id)
+
+            if connection.vendor != 'postgresql':
+                # Serialize bookings per reader so the check below can't race.
+                list(get_user_model().objects.select_for_update().filter(pk=slot.reader_id).values_list('pk'))
+                if has_overlap(slot):
+                    raise SlotConflict('This time overlaps another booking with this reader.')
+
+            amount = slot_price(slot)
+            wallet, _ = Wallet.objects.get_or_create(user=client, defaults={})
+            idem = f"booking_{slot.pk}_{client.pk}"
+            try:
+                debit_wallet(wallet, amount, 'booking', idem, reference_type='booking', reference_id=str(slot.pk))
+            except ValueError:
+                raise InsufficientBalance('Insufficient balance for this booking.')
+            entry = LedgerEntry.objects.get(idempotency_key=idem)
+            booking = Booking.objects.create(slot=slot, client=client, amount=amount, ledger_entry=entry)
+    except IntegrityError as e:
+        # Only the exclusion constraint means an overlapping slot was booked
+        # concurrently; any other integrity error is a bug, not a conflict.
+        if not is_overlap_violation(e):
+            raise
+        raise SlotConflict('This time overlaps another booking with this reader.')
+    # The claim is a queryset update, which sends no post_save.
+    bump_schedule_version(slot.reader_id)
+    logger.info("Slot %s booked by user %s for %s", slot_id, client.pk, amount)
+    return booking
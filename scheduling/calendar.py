@@ -0,0 +1,62 @@
+"""
+Reader calendar: slots in a date range, compacted into blocks.
+
+Consecutive slots with the same status are merged into one block
+(run-length encoding), so a month of 30-minute slots is a few dozen
+blocks rather than over a thousand rows. Each reader has a schedule
+version in the shared cache, bumped on every slot change; the calendar API
+derives its ETag from it, so polling clients are answered with 304 from
+the cache alone.
+"""
+from core.cache_versions import bump_version, get_version
+
+from .models import ScheduledSlot
+
+# Statuses shown on the public calendar; anything booked or done is "busy".
+CALENDAR_STATUSES = {'available': 'available', 'booked': 'busy', 'completed': 'busy'}
+
+
+def _version_key(reader_id):
+    return f"scheduling:schedule:version:{reader_id}"
+
+
+def schedule_version(reader_id):
+    """Current schedule version for the reader (User id), or None without a cache."""
+    return get_version(_version_key(reader_id))
+
+
+def bump_schedule_version(*reader_ids):
+    for reader_id in set(reader_ids):
+        bump_version(_version_key(reader_id))
+
+
+def encode_blocks(slots):
+    """
+    Run-length encode (start, end, status) rows sorted by start into
+    [start, end, status, slot_count] blocks; a block continues while each
+    slot starts exactly where the previous one ended with the same status.
+    """
+    blocks = []
+    for start, end, status in slots:
+        label = CALENDAR_STATUSES.get(status)
+        if label is None:
+            continue
+        last = blocks[-1] if blocks else None
+        if last and last[1] == start and last[2] == label:
+            last[1] = end
+            last[3] += 1
+        else:
+            blocks.append([start, end, label, 1])
+    return blocks
+
+
+def reader_calendar(reader_id, start, end):
+    """Blocks for the reader's slots starting within [start, end)."""
+    rows = (
+        ScheduledSlot.objects.filter(
+            reader_id=reader_id, start__gte=start, start__lt=end, status__in=CALENDAR_STATUSES,
+        )
+        .order_by('start')
+        .values_list('start', 'end', 'status')
+    )
+    return encode_blocks(rows)
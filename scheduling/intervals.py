@@ -0,0 +1,38 @@
+"""
+Sorted, non-overlapping interval index with O(log n) overlap checks.
+
+Used when scheduling needs to test many candidate slots against a reader's
+booked time in memory (slot materialization). The database enforces the
+same rule for concurrent writers; see scheduling.booking.
+"""
+import bisect
+
+
+class IntervalIndex:
+    """
+    Half-open [start, end) intervals that don't overlap each other, kept
+    sorted by start. Because they don't overlap, ends are sorted too, so the
+    only interval that can overlap a query is the last one starting before
+    the query's end.
+    """
+
+    def __init__(self, intervals=()):
+        self._starts = []
+        self._ends = []
+        for start, end in sorted(intervals):
+            self.add(start, end)
+
+    def __len__(self):
+        return len(self._starts)
+
+    def overlaps(self, start, end):
+        i = bisect.bisect_left(self._starts, end)
+        return i > 0 and self._ends[i - 1] > start
+
+    def add(self, start, end):
+        """Insert [start, end); raises ValueError if it overlaps an existing interval."""
+        if self.overlaps(start, end):
+            raise ValueError(f"Interval {start} - {end} overlaps an existing interval")
+        i = bisect.bisect_left(self._starts, start)
+        self._starts.insert(i, start)
+        self._ends.insert(i, end)
@@ -0,0 +1,113 @@
+"""
+Concurrency benchmark for scheduling.booking.create_booking.
+
+Creates a throwaway reader with a handful of slots (each overlapping the
+next, so the overlap rule is exercised as well as the claim), funds N
+clients, and has them all book at once from N threads. Then verifies:
+no slot has more than one booking, no two booked slots of the reader
+overlap, and every debit matches exactly one booking. All rows it creates
+are removed afterwards.
+
+Run against a disposable database; on SQLite concurrent writers queue on
+the database lock, so expect lower throughput than PostgreSQL.
+"""
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from scheduling.booking import BookingError, create_booking
+from scheduling.intervals import IntervalIndex
+from scheduling.models import Booking, ScheduledSlot
+from wallets.models import LedgerEntry, Wallet
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Book slots from many threads at once and check for double bookings.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bookers', type=int, default=100)
+        parser.add_argument('--slots', type=int, default=10)
+
+    def handle(self, *args, **options):
+        bookers, slot_count = options['bookers'], options['slots']
+        if bookers < 1 or slot_count < 1:
+            raise CommandError('--bookers and --slots must be positive')
+
+        tag = uuid.uuid4().hex[:8]
+        reader = User.objects.create_user(username=f'bench_reader_{tag}')
+        clients = []
+        try:
+            start = timezone.now() + timedelta(days=1)
+            # 60-minute slots every 30 minutes: neighbours overlap.
+            slots = [
+                ScheduledSlot.objects.create(
+                    reader=reader, start=start + timedelta(minutes=30 * i),
+                    end=start + timedelta(minutes=30 * i + 60), duration_minutes=60,
+                )
+                for i in range(slot_count)
+            ]
+            User.objects.bulk_create([User(username=f'bench_client_{tag}_{i}') for i in range(bookers)])
+            clients = list(User.objects.filter(username__startswith=f'bench_client_{tag}_'))
+            Wallet.objects.bulk_create([Wallet(user=c, balance=Decimal('1000')) for c in clients])
+
+            outcomes = Counter()
+            lock = threading.Lock()
+            barrier = threading.Barrier(bookers)
+            slot_ids = [s.pk for s in slots]
+
+            def attempt(client):
+                barrier.wait()
+                try:
+                    create_booking(random.choice(slot_ids), client)
+                    result = 'booked'
+                except BookingError as e:
+                    result = type(e).__name__
+                except Exception as e:  # e.g. lock timeouts; reported, not hidden
+                    result = f'error: {type(e).__name__}'
+                finally:
+                    connection.close()
+                with lock:
+                    outcomes[result] += 1
+
+            began = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=bookers) as pool:
+                list(pool.map(attempt, clients))
+            elapsed = time.perf_counter() - began
+
+            self._verify(reader, slot_ids)
+            for result, count in sorted(outcomes.items()):
+                self.stdout.write(f"  {result}: {count}")
+            self.stdout.write(self.style.SUCCESS(
+                f"{bookers} bookers, {slot_count} slots: {outcomes['booked']} booked, "
+                f"0 double bookings, {elapsed:.2f}s ({bookers / elapsed:.0f} attempts/s)"
+            ))
+        finally:
+            LedgerEntry.objects.filter(wallet__user__in=clients).delete()
+            User.objects.filter(pk__in=[c.pk for c in clients] + [reader.pk]).delete()
+
+    def _verify(self, reader, slot_ids):
+        per_slot = Counter(Booking.objects.filter(slot_id__in=slot_ids).values_list('slot_id', flat=True))
+        if per_slot and max(per_slot.values()) > 1:
+            raise CommandError(f"Double booking detected: {per_slot}")
+        booked = ScheduledSlot.objects.filter(reader=reader, status='booked').order_by('start')
+        if booked.count() != len(per_slot):
+            raise CommandError('Booked slots and Booking rows disagree')
+        try:
+            IntervalIndex(booked.values_list('start', 'end'))
+        except ValueError as e:
+            raise CommandError(f"Overlapping bookings: {e}")
+        debits = LedgerEntry.objects.filter(entry_type='booking', reference_id__in=[str(pk) for pk in slot_ids])
+        if debits.count() != len(per_slot):
+            raise CommandError(f"{debits.count()} debits for {len(per_slot)} bookings")
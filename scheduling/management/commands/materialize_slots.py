@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from scheduling.slots import materialize_slots
+
+
+class Command(BaseCommand):
+    help = "Generate open ScheduledSlots from readers' weekly availability."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stale-only', action='store_true',
+                            help='Only readers whose availability changed since their last sync')
+        parser.add_argument('--days', type=int, default=None, help='Horizon in days (default SCHEDULING_HORIZON_DAYS)')
+        parser.add_argument('--reader', type=int, action='append', dest='readers', help='ReaderProfile id (repeatable)')
+
+    def handle(self, *args, **options):
+        if options['days'] is not None and options['days'] < 1:
+            raise CommandError('--days must be positive')
+        created, deleted = materialize_slots(
+            reader_ids=options['readers'], stale_only=options['stale_only'], horizon_days=options['days'],
+        )
+        self.stdout.write(self.style.SUCCESS(f"Created {created} slots, deleted {deleted}"))
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:12
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def drop_duplicate_open_slots(apps, schema_editor):
+    ScheduledSlot = apps.get_model('scheduling', 'ScheduledSlot')
+    open_slots = ScheduledSlot.objects.filter(status='available')
+    keep = open_slots.values('reader_id', 'start').annotate(keep=Min('pk')).values('keep')
+    open_slots.exclude(pk__in=keep).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduling', '0002_booking_refund_amount'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='scheduledslot',
+            index=models.Index(fields=['reader', 'start'], name='scheduling_idx_reader_start'),
+        ),
+        migrations.RunPython(drop_duplicate_open_slots, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='scheduledslot',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'available')), fields=('reader', 'start'), name='scheduling_uniq_open_slot'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+from django.db import migrations
+
+# The constraint scheduling.booking relies on. Kept here rather than
+# imported, so later changes to the app code don't change this migration.
+POSTGRES_INSTALL = [
+    "CREATE EXTENSION IF NOT EXISTS btree_gist",
+    """
+    ALTER TABLE scheduling_scheduledslot ADD CONSTRAINT scheduling_excl_reader_overlap
+    EXCLUDE USING gist (reader_id WITH =, tstzrange(start, "end") WITH &&)
+    WHERE (status IN ('booked', 'completed'))
+    """,
+]
+POSTGRES_UNINSTALL = [
+    "ALTER TABLE scheduling_scheduledslot DROP CONSTRAINT IF EXISTS scheduling_excl_reader_overlap",
+]
+
+
+def install(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for sql in POSTGRES_INSTALL:
+            schema_editor.execute(sql)
+
+
+def uninstall(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for sql in POSTGRES_UNINSTALL:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduling', '0003_slot_reader_start_index'),
+    ]
+
+    operations = [
+        # PostgreSQL only; other backends check overlaps in scheduling.booking.
+        migrations.RunPython(install, uninstall),
+    ]
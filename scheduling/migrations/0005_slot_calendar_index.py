@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:22
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduling', '0004_slot_overlap_exclusion'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='scheduledslot',
+            name='scheduling_idx_reader_start',
+        ),
+        migrations.AddIndex(
+            model_name='scheduledslot',
+            index=models.Index(fields=['reader', 'start', 'status'], name='scheduling_idx_reader_start_st'),
+        ),
+    ]
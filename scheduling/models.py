@@ -30,6 +30,20 @@ class ScheduledSlot(models.Model):
 
     class Meta:
         ordering = ['start']
+        indexes = [
+            # Calendar range reads filter all three; the (reader, start) prefix
+            # serves slot generation and overlap checks.
+            models.Index(fields=['reader', 'start', 'status'], name='scheduling_idx_reader_start_st'),
+        ]
+        constraints = [
+            # One open slot per reader and start time; lets slot generation
+            # run concurrently or repeatedly without duplicating slots.
+            models.UniqueConstraint(
+                fields=['reader', 'start'],
+                condition=models.Q(status='available'),
+                name='scheduling_uniq_open_slot',
+            ),
+        ]
 
 
 class Booking(models.Model):
@@ -0,0 +1,16 @@
+"""
+Bump a reader's schedule version whenever one of their slots changes, so
+calendar ETags (scheduling.calendar) stop matching. Bulk paths that skip
+signals (slot materialization, the booking claim) bump explicitly.
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .calendar import bump_schedule_version
+from .models import ScheduledSlot
+
+
+@receiver(post_save, sender=ScheduledSlot)
+@receiver(post_delete, sender=ScheduledSlot)
+def slot_changed(sender, instance, **kwargs):
+    bump_schedule_version(instance.reader_id)
@@ -0,0 +1,203 @@
+"""
+Materialize bookable ScheduledSlots from readers' weekly ReaderAvailability.
+
+Each reader's windows are expanded in the reader's own time zone over a
+rolling horizon and cut into fixed-length slots. The result is diffed
+against the reader's existing future slots:
+- open slots that no longer fit the availability are deleted;
+- missing slots are created, unless they overlap a booked or completed one;
+- booked/completed/cancelled slots are never touched.
+Readers are processed in chunks, with one availability query, one slot
+query and one transaction (bulk delete + batched insert) per chunk.
+"""
+import logging
+from datetime import datetime, timedelta, timezone as dt_timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from readers.models import ReaderAvailability, ReaderProfile
+from .calendar import bump_schedule_version
+from .intervals import IntervalIndex
+from .models import ScheduledSlot
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 500
+# Slots in these states block new slots that would overlap them.
+OCCUPIED_STATUSES = ('booked', 'completed')
+
+
+def _slot_minutes():
+    return getattr(settings, 'SCHEDULING_SLOT_MINUTES', 30)
+
+
+def _horizon_days():
+    return getattr(settings, 'SCHEDULING_HORIZON_DAYS', 28)
+
+
+def _local_datetime(day, clock, tz):
+    """Aware datetime for a wall-clock time, or None if it doesn't exist (DST gap)."""
+    naive = datetime.combine(day, clock)
+    aware = naive.replace(tzinfo=tz)
+    if aware.astimezone(dt_timezone.utc).astimezone(tz).replace(tzinfo=None) != naive:
+        return None
+    return aware
+
+
+def expand_windows(windows, tz, start, end, slot_minutes):
+    """
+    Expand (day_of_week, start_time, end_time) windows into a set of UTC
+    (start, end) slot pairs that begin within [start, end). A window whose
+    end is not after its start runs past midnight.
+    """
+    by_day = {}
+    for day_of_week, start_time, end_time in windows:
+        by_day.setdefault(day_of_week, []).append((start_time, end_time))
+    length = timedelta(minutes=slot_minutes)
+    slots = set()
+    day = start.astimezone(tz).date() - timedelta(days=1)
+    last_day = end.astimezone(tz).date()
+    while day <= last_day:
+        for start_time, end_time in by_day.get(day.weekday(), ()):
+            window_start = _local_datetime(day, start_time, tz)
+            end_day = day if end_time > start_time else day + timedelta(days=1)
+            window_end = _local_datetime(end_day, end_time, tz)
+            if window_start is None or window_end is None:
+                continue
+            # Step in UTC so slots stay evenly sized across DST changes.
+            slot_start = window_start.astimezone(dt_timezone.utc)
+            window_end = window_end.astimezone(dt_timezone.utc)
+            while slot_start + length <= window_end:
+                if start <= slot_start < end:
+                    slots.add((slot_start, slot_start + length))
+                slot_start += length
+        day += timedelta(days=1)
+    return slots
+
+
+def diff_reader_slots(desired, existing):
+    """
+    Set arithmetic for one reader. `existing` holds (pk, start, end, status)
+    for future slots. Returns (pks_to_delete, (start, end) pairs to create).
+    """
+    open_slots = {}
+    occupied = []
+    for pk, start, end, status in existing:
+        if status == 'available':
+            open_slots[(start, end)] = pk
+        elif status in OCCUPIED_STATUSES:
+            occupied.append((start, end))
+    occupied = IntervalIndex(occupied)
+
+    to_delete = [pk for key, pk in open_slots.items() if key not in desired]
+    to_create = sorted(key for key in desired.difference(open_slots) if not occupied.overlaps(*key))
+    return to_delete, to_create
+
+
+def _insert_slots(rows, slot_minutes, batch_size=5000):
+    """
+    Insert (reader_id, start, end) open slots with executemany. At hundreds
+    of thousands of rows, bulk_create's per-instance model and field
+    preparation costs far more than the INSERT itself. ON CONFLICT DO
+    NOTHING (SQLite and PostgreSQL) skips slots a concurrent run created.
+    """
+    if not rows:
+        return
+    qn = connection.ops.quote_name
+    adapt = connection.ops.adapt_datetimefield_value
+    meta = ScheduledSlot._meta
+    columns = [meta.get_field(name).column for name in ('reader', 'start', 'end', 'duration_minutes', 'status')]
+    sql = 'INSERT INTO {} ({}) VALUES ({}) ON CONFLICT DO NOTHING'.format(
+        qn(meta.db_table), ', '.join(qn(c) for c in columns), ', '.join(['%s'] * len(columns)),
+    )
+    with connection.cursor() as cursor:
+        for i in range(0, len(rows), batch_size):
+            cursor.executemany(sql, [
+                (reader_id, adapt(start), adapt(end), slot_minutes, 'available')
+                for reader_id, start, end in rows[i:i + batch_size]
+            ])
+
+
+def materialize_slots(reader_ids=None, stale_only=False, horizon_days=None, now=None):
+    """
+    Regenerate open slots from `now` to `now + horizon_days` for the given
+    ReaderProfile ids (default: every reader that has set availability,
+    including readers who since cleared it, or only readers whose
+    availability changed since their last sync when `stale_only`).
+    Returns (created, deleted).
+    """
+    synced_at = timezone.now()
+    now = now or synced_at
+    horizon_end = now + timedelta(days=horizon_days or _horizon_days())
+    slot_minutes = _slot_minutes()
+
+    readers = ReaderProfile.objects.all()
+    if reader_ids is not None:
+        readers = readers.filter(pk__in=reader_ids)
+    else:
+        # Readers who never set availability have no slots to keep in sync.
+        readers = readers.filter(availability_updated_at__isnull=False)
+    if stale_only:
+        readers = readers.filter(
+            Q(slots_synced_at__isnull=True) | Q(availability_updated_at__gt=F('slots_synced_at')),
+            availability_updated_at__isnull=False,
+        )
+    readers = list(readers.order_by('pk').values_list('pk', 'user_id', 'timezone'))
+
+    created = deleted = 0
+    for i in range(0, len(readers), CHUNK_SIZE):
+        c, d = _materialize_chunk(readers[i:i + CHUNK_SIZE], now, horizon_end, slot_minutes, synced_at)
+        created += c
+        deleted += d
+    logger.info("Materialized slots for %d readers: %d created, %d deleted", len(readers), created, deleted)
+    return created, deleted
+
+
+def _materialize_chunk(readers, now, horizon_end, slot_minutes, synced_at):
+    profile_ids = [pk for pk, _, _ in readers]
+    user_ids = [user_id for _, user_id, _ in readers]
+
+    windows = {}
+    for reader_id, day, start_time, end_time in ReaderAvailability.objects.filter(
+        reader_id__in=profile_ids,
+    ).values_list('reader_id', 'day_of_week', 'start_time', 'end_time'):
+        windows.setdefault(reader_id, []).append((day, start_time, end_time))
+
+    existing = {}
+    for row in ScheduledSlot.objects.filter(
+        reader_id__in=user_ids, start__gte=now, start__lt=horizon_end,
+    ).values_list('reader_id', 'pk', 'start', 'end', 'status'):
+        existing.setdefault(row[0], []).append(row[1:])
+
+    to_delete, to_create, changed = [], [], []
+    for reader_id, user_id, tz_name in readers:
+        try:
+            tz = ZoneInfo(tz_name)
+        except (ZoneInfoNotFoundError, ValueError):
+            logger.warning("Reader %s has invalid time zone %r; using UTC", reader_id, tz_name)
+            tz = ZoneInfo('UTC')
+        desired = expand_windows(windows.get(reader_id, ()), tz, now, horizon_end, slot_minutes)
+        delete, create = diff_reader_slots(desired, existing.get(user_id, ()))
+        to_delete.extend(delete)
+        to_create.extend((user_id, start, end) for start, end in create)
+        if delete or create:
+            changed.append(user_id)
+
+    with transaction.atomic():
+        for j in range(0, len(to_delete), 1000):
+            # Re-check status so a slot booked since we read it survives.
+            ScheduledSlot.objects.filter(pk__in=to_delete[j:j + 1000], status='available').delete()
+        _insert_slots(to_create, slot_minutes)
+        ReaderProfile.objects.filter(pk__in=profile_ids).update(slots_synced_at=synced_at)
+    # Raw inserts send no post_save; one bump per reader covers them.
+    bump_schedule_version(*changed)
+    return len(to_create), len(to_delete)
+
+
+def mark_availability_changed(reader_id):
+    """Flag a reader's slots as stale; picked up by the stale-only run."""
+    ReaderProfile.objects.filter(pk=reader_id).update(availability_updated_at=timezone.now())
@@ -0,0 +1,26 @@
+"""
+Celery tasks for scheduling: slot materialization.
+"""
+
+import logging
+from celery import shared_task
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def refresh_stale_slots():
+    """Every 5 minutes: regenerate slots for readers whose availability changed."""
+    from .slots import materialize_slots
+
+    created, deleted = materialize_slots(stale_only=True)
+    return {'created': created, 'deleted': deleted}
+
+
+@shared_task
+def extend_slot_horizon():
+    """Nightly: roll every reader's slot horizon forward."""
+    from .slots import materialize_slots
+
+    created, deleted = materialize_slots()
+    return {'created': created, 'deleted': deleted}
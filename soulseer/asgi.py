@@ -1,9 +1,16 @@
 """
 ASGI config for SoulSeer project.
+
+Serves the async views: the live session event stream
+(/api/sessions/<id>/events/), whose open connections would otherwise each
+pin a sync gunicorn worker, and the async Agora session API. See the
+events process in the Procfile.
 """
 import os
 
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'soulseer.settings')
+# Route the session API to its async views (readings.async_agora_views).
+os.environ.setdefault('READINGS_ASYNC_VIEWS', 'true')
 application = get_asgi_application()
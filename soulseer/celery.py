@@ -1,7 +1,20 @@
 import os
 from celery import Celery
+from celery.signals import worker_process_init, worker_process_shutdown
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'soulseer.settings')
 app = Celery('soulseer')
 app.config_from_object('django.conf:settings', namespace='CELERY')
 app.autodiscover_tasks()
+
+
+@worker_process_init.connect
+def start_batch_writers(**kwargs):
+    from core import batching
+    batching.start()
+
+
+@worker_process_shutdown.connect
+def stop_batch_writers(**kwargs):
+    from core import batching
+    batching.stop()
@@ -47,38 +47,108 @@ else:
         }
     }
 
+# Session participants heartbeat every INTERVAL seconds (Redis/presence store
+# only); a session is paused once a participant misses MISSES in a row.
+SESSION_HEARTBEAT_INTERVAL = env.int('SESSION_HEARTBEAT_INTERVAL', default=10)
+SESSION_HEARTBEAT_MISSES = env.int('SESSION_HEARTBEAT_MISSES', default=3)
+
 # Redis / Celery
 REDIS_URL = env('REDIS_URL', default='redis://localhost:6379/0')
 CELERY_BROKER_URL = REDIS_URL
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_BEAT_SCHEDULE = {
-    'billing-tick': {
-        'task': 'readings.tasks.billing_tick',
+    'session-lifecycle': {
+        'task': 'readings.tasks.session_lifecycle',
         'schedule': 60.0,
     },
-    'finalize-sessions': {
-        'task': 'readings.tasks.finalize_sessions',
-        'schedule': 300.0,
-    },
-    'reconnect-timeout': {
-        'task': 'readings.tasks.handle_reconnect_timeout',
-        'schedule': 30.0,
-    },
-    'expire-grace-periods': {
-        'task': 'readings.tasks.expire_grace_periods',
-        'schedule': 30.0,
+    'pause-silent-sessions': {
+        'task': 'readings.tasks.pause_silent_sessions',
+        'schedule': float(SESSION_HEARTBEAT_INTERVAL),
     },
     'weekly-reader-payouts': {
         'task': 'readings.tasks.payout_readers',
         'schedule': 604800.0,  # Every 7 days
     },
+    'refresh-stale-slots': {
+        'task': 'scheduling.tasks.refresh_stale_slots',
+        'schedule': 300.0,
+    },
+    'extend-slot-horizon': {
+        'task': 'scheduling.tasks.extend_slot_horizon',
+        'schedule': 86400.0,  # Every 24 hours
+    },
+    'purge-outbox': {
+        'task': 'core.tasks.purge_outbox',
+        'schedule': 86400.0,  # Every 24 hours
+    },
+    'maintain-audit-partitions': {
+        'task': 'core.tasks.maintain_audit_partitions',
+        'schedule': 86400.0,  # Every 24 hours
+    },
+    'nightly-reader-recommendations': {
+        'task': 'readers.tasks.build_reader_recommendations',
+        'schedule': 86400.0,  # Every 24 hours
+    },
 }
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+# Shared cache: set CACHE_URL (e.g. redis://host:6379/1) so all gunicorn/celery
+# workers see the same entries. Falls back to per-process local memory.
+CACHE_URL = env('CACHE_URL', default='')
+if CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+        }
     }
-}
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+# Lifetime (seconds) of cached reader directory and profile fragments; entries
+# are also invalidated whenever the reader changes.
+READER_DIRECTORY_CACHE_TTL = env.int('READER_DIRECTORY_CACHE_TTL', default=300)
+READER_PROFILE_CACHE_TTL = env.int('READER_PROFILE_CACHE_TTL', default=600)
+# Reader presence ("available now") is kept in Redis; without it each process
+# keeps its own in-memory copy. Readers drop out HEARTBEAT_TTL seconds after
+# their last heartbeat; SESSION_TTL caps how long a session marks them busy.
+PRESENCE_REDIS_URL = env('PRESENCE_REDIS_URL', default=CACHE_URL)
+PRESENCE_HEARTBEAT_TTL = env.int('PRESENCE_HEARTBEAT_TTL', default=90)
+PRESENCE_SESSION_TTL = env.int('PRESENCE_SESSION_TTL', default=6 * 3600)
+# Live session events (SSE) fan out over Redis pub/sub between workers.
+SESSION_EVENTS_REDIS_URL = env('SESSION_EVENTS_REDIS_URL', default=PRESENCE_REDIS_URL)
+# Serve the async Agora session API views (readings.async_agora_views);
+# soulseer/asgi.py turns this on for the ASGI process.
+READINGS_ASYNC_VIEWS = env.bool('READINGS_ASYNC_VIEWS', default=False)
+
+# Append-only rows (audit log, session timeline) are buffered per worker
+# process and written in batches of BUFFERED_WRITE_EVENTS or every
+# BUFFERED_WRITE_INTERVAL_MS, journaled under BUFFERED_WRITE_SPILL_DIR until
+# written so a crashed worker's rows are recovered (core.batching).
+BUFFERED_WRITE_EVENTS = env.int('BUFFERED_WRITE_EVENTS', default=500)
+BUFFERED_WRITE_INTERVAL_MS = env.int('BUFFERED_WRITE_INTERVAL_MS', default=1000)
+BUFFERED_WRITE_SPILL_DIR = env('BUFFERED_WRITE_SPILL_DIR', default=str(BASE_DIR / 'var' / 'spill'))
+# Audit log retention: months older than AUDIT_RETENTION_DAYS are exported to
+# AUDIT_ARCHIVE_DIR and removed by `manage.py archive_audit_log`. On PostgreSQL
+# the log is partitioned by month, created AUDIT_PARTITION_MONTHS_AHEAD ahead;
+# AUDIT_DETAILS_GIN_INDEX adds a GIN index for details__contains lookups.
+AUDIT_RETENTION_DAYS = env.int('AUDIT_RETENTION_DAYS', default=365)
+AUDIT_ARCHIVE_DIR = env('AUDIT_ARCHIVE_DIR', default=str(BASE_DIR / 'var' / 'audit-archive'))
+AUDIT_PARTITION_MONTHS_AHEAD = env.int('AUDIT_PARTITION_MONTHS_AHEAD', default=3)
+AUDIT_DETAILS_GIN_INDEX = env.bool('AUDIT_DETAILS_GIN_INDEX', default=False)
+# Task outbox (core.outbox): published by `manage.py dispatch_outbox` (the
+# outbox process) every OUTBOX_DISPATCH_INTERVAL seconds in batches of
+# OUTBOX_BATCH_SIZE; dispatched messages are kept OUTBOX_RETENTION_HOURS.
+OUTBOX_DISPATCH_INTERVAL = env.float('OUTBOX_DISPATCH_INTERVAL', default=1.0)
+OUTBOX_BATCH_SIZE = env.int('OUTBOX_BATCH_SIZE', default=500)
+OUTBOX_RETENTION_HOURS = env.int('OUTBOX_RETENTION_HOURS', default=24)
+
+# Scheduling: weekly availability is materialized into slots of this length
+# over a rolling horizon (days).
+SCHEDULING_SLOT_MINUTES = env.int('SCHEDULING_SLOT_MINUTES', default=30)
+SCHEDULING_HORIZON_DAYS = env.int('SCHEDULING_HORIZON_DAYS', default=28)
 
 # Auth0
 AUTH0_DOMAIN = env('AUTH0_DOMAIN', default='').rstrip('/')
@@ -89,6 +159,19 @@ if not AUTH0_DOMAIN:
 AUTH0_AUDIENCE = env('AUTH0_AUDIENCE', default=env('AUTH0_IDENTIFIER', default=''))
 AUTH0_APP_ID = env('AUTH0_APP_ID', default='')
 AUTH0_CLIENT_SECRET = env('AUTH0_CLIENT_SECRET', default='')
+# JWKS key cache (seconds). Keys older than the TTL are served while a
+# background refresh runs, up to the stale TTL.
+AUTH0_JWKS_CACHE_TTL = env.int('AUTH0_JWKS_CACHE_TTL', default=3600)
+AUTH0_JWKS_STALE_TTL = env.int('AUTH0_JWKS_STALE_TTL', default=86400)
+AUTH0_JWKS_MIN_REFRESH_INTERVAL = env.int('AUTH0_JWKS_MIN_REFRESH_INTERVAL', default=30)
+AUTH0_JWKS_CACHE_ALIAS = env('AUTH0_JWKS_CACHE_ALIAS', default='default')
+# Read timeout (seconds) for Auth0 calls over the pooled HTTP client
+AUTH0_HTTP_TIMEOUT = env.float('AUTH0_HTTP_TIMEOUT', default=5.0)
+# Max verified bearer tokens / sub->user mappings kept in memory per process
+AUTH0_TOKEN_CACHE_SIZE = env.int('AUTH0_TOKEN_CACHE_SIZE', default=10000)
+# Seconds an active user is reused for bearer requests; saving the user
+# clears it in the saving process, other processes notice within this time.
+AUTH0_USER_CACHE_TTL = env.int('AUTH0_USER_CACHE_TTL', default=60)
 
 # Agora
 AGORA_APP_ID = env('AGORA_APP_ID', default='')
@@ -139,10 +222,16 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'accounts.middleware.Auth0BearerMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'django_htmx.middleware.HtmxMiddleware',
 ]
+if READINGS_ASYNC_VIEWS:
+    # The ASGI process (soulseer.asgi) serves the session API and event
+    # streams, never static files. WhiteNoise is sync-only and would run
+    # every async request there through a thread.
+    MIDDLEWARE.remove('whitenoise.middleware.WhiteNoiseMiddleware')
 
 ROOT_URLCONF = 'soulseer.urls'
 WSGI_APPLICATION = 'soulseer.wsgi.application'
@@ -183,6 +272,7 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
+        'accounts.authentication.Auth0BearerAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
 }
@@ -31,5 +31,7 @@ urlpatterns = [
     path('live/', include('live.urls')),
     path('shop/', include('shop.urls')),
     path('community/', include('community.urls')),
+    path('api/readers/', include('readers.api_urls')),
+    path('api/scheduling/', include('scheduling.api_urls')),
     path('api/', include('readings.api_urls')),
 ]
@@ -0,0 +1,211 @@
+# Auth0 token verification and JWKS cache tests
+
+import base64
+import json
+import time
+from unittest import mock
+
+import rsa
+from django.test import TestCase, override_settings
+
+from accounts import auth_backend
+
+
+def _b64url(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def _int_b64(value):
+    return _b64url(value.to_bytes((value.bit_length() + 7) // 8, 'big'))
+
+
+def make_jwks(pub_key, kid):
+    return {'keys': [{'kty': 'RSA', 'kid': kid, 'n': _int_b64(pub_key.n), 'e': _int_b64(pub_key.e)}]}
+
+
+def make_token(priv_key, kid, **claims):
+    header = _b64url(json.dumps({'alg': 'RS256', 'kid': kid}).encode())
+    payload = {
+        'sub': 'auth0|abc123',
+        'iss': 'https://test.auth0.com/',
+        'aud': 'https://api.test',
+        'exp': int(time.time()) + 3600,
+    }
+    payload.update(claims)
+    body = _b64url(json.dumps(payload).encode())
+    sig = rsa.sign(f"{header}.{body}".encode(), priv_key, 'SHA-256')
+    return f"{header}.{body}.{_b64url(sig)}"
+
+
+@override_settings(
+    AUTH0_DOMAIN='test.auth0.com',
+    AUTH0_AUDIENCE='https://api.test',
+    AUTH0_JWKS_CACHE_TTL=3600,
+    AUTH0_JWKS_STALE_TTL=86400,
+    AUTH0_JWKS_MIN_REFRESH_INTERVAL=30,
+)
+class JWKSCacheTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.pub_key, cls.priv_key = rsa.newkeys(512)
+
+    def setUp(self):
+        auth_backend.clear_jwks_cache()
+        self.addCleanup(auth_backend.clear_jwks_cache)
+
+    def test_jwks_fetched_once_for_repeated_verification(self):
+        jwks = make_jwks(self.pub_key, 'k1')
+        token = make_token(self.priv_key, 'k1')
+        with mock.patch.object(auth_backend, '_fetch_jwks', return_value=jwks) as fetch:
+            self.assertIsNotNone(auth_backend.verify_auth0_token(token))
+            self.assertIsNotNone(auth_backend.verify_auth0_token(token))
+        self.assertEqual(fetch.call_count, 1)
+
+    def test_other_worker_reuses_shared_keyset(self):
+        jwks = make_jwks(self.pub_key, 'k1')
+        with mock.patch.object(auth_backend, '_fetch_jwks', return_value=jwks):
+            auth_backend._get_rsa_public_key('k1')
+        # Simulate a fresh worker: empty process-local state, shared cache intact.
+        auth_backend._jwks_state.update(keys={}, fetched_at=0.0, last_attempt=0.0)
+        with mock.patch.object(auth_backend, '_fetch_jwks') as fetch:
+            self.assertIsNotNone(auth_backend._get_rsa_public_key('k1'))
+        fetch.assert_not_called()
+
+    def test_unknown_kid_refresh_is_rate_limited(self):
+        jwks = make_jwks(self.pub_key, 'k1')
+        with mock.patch.object(auth_backend, '_fetch_jwks', return_value=jwks) as fetch:
+            auth_backend._get_rsa_public_key('k1')
+            self.assertIsNone(auth_backend._get_rsa_public_key('forged-1'))
+            self.assertIsNone(auth_backend._get_rsa_public_key('forged-2'))
+        self.assertEqual(fetch.call_count, 1)
+
+    def test_stale_key_served_while_refreshing(self):
+        jwks = make_jwks(self.pub_key, 'k1')
+        with mock.patch.object(auth_backend, '_fetch_jwks', return_value=jwks):
+            auth_backend._get_rsa_public_key('k1')
+        auth_backend._jwks_state['fetched_at'] -= 7200
+        with mock.patch.object(auth_backend, '_refresh_jwks_in_background') as refresh:
+            self.assertEqual(auth_backend._get_rsa_public_key('k1'), self.pub_key)
+        refresh.assert_called_once()
+
+    def test_bad_signature_rejected(self):
+        other_pub, other_priv = rsa.newkeys(512)
+        jwks = make_jwks(self.pub_key, 'k1')
+        token = make_token(other_priv, 'k1')
+        with mock.patch.object(auth_backend, '_fetch_jwks', return_value=jwks):
+            self.assertIsNone(auth_backend.verify_auth0_token(token))
+
+
+@override_settings(AUTH0_DOMAIN='test.auth0.com', AUTH0_AUDIENCE='https://api.test')
+class BearerAuthenticationTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.pub_key, cls.priv_key = rsa.newkeys(512)
+
+    def setUp(self):
+        from django.contrib.auth import get_user_model
+        from accounts.models import UserProfile
+        auth_backend.clear_jwks_cache()
+        auth_backend.clear_token_cache()
+        self.addCleanup(auth_backend.clear_jwks_cache)
+        self.addCleanup(auth_backend.clear_token_cache)
+        self.user = get_user_model().objects.create_user(username='api_user')
+        UserProfile.objects.create(user=self.user, auth0_sub='auth0|abc123', role='client')
+        self.jwks = make_jwks(self.pub_key, 'k1')
+
+    def test_token_verified_once_then_cached(self):
+        token = make_token(self.priv_key, 'k1')
+        with mock.patch.object(auth_backend, '_fetch_jwks', return_value=self.jwks), \
+                mock.patch.object(auth_backend, 'verify_auth0_token', wraps=auth_backend.verify_auth0_token) as verify:
+            self.assertEqual(auth_backend.authenticate_bearer_token(token), self.user)
+            with self.assertNumQueries(0):
+                self.assertEqual(auth_backend.authenticate_bearer_token(token), self.user)
+        self.assertEqual(verify.call_count, 1)
+
+    def test_saving_a_user_drops_it_from_the_cache(self):
+        token = make_token(self.priv_key, 'k1')
+        with mock.patch.object(auth_backend, '_fetch_jwks', return_value=self.jwks):
+            self.assertEqual(auth_backend.authenticate_bearer_token(token), self.user)
+            self.user.is_active = False
+            self.user.save(update_fields=['is_active'])
+            self.assertIsNone(auth_backend.authenticate_bearer_token(token))
+
+    def test_unknown_sub_rejected(self):
+        token = make_token(self.priv_key, 'k1', sub='auth0|nobody')
+        with mock.patch.object(auth_backend, '_fetch_jwks', return_value=self.jwks):
+            self.assertIsNone(auth_backend.authenticate_bearer_token(token))
+
+    def test_api_request_with_bearer_token(self):
+        from django.contrib.auth import get_user_model
+        from readings.models import Session
+        reader = get_user_model().objects.create_user(username='api_reader')
+        session = Session.objects.create(client=self.user, reader=reader, state='active')
+        token = make_token(self.priv_key, 'k1')
+        with mock.patch.object(auth_backend, '_fetch_jwks', return_value=self.jwks):
+            response = self.client.post(
+                f'/api/sessions/{session.pk}/leave/', HTTP_AUTHORIZATION=f'Bearer {token}', secure=True,
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['state'], 'paused')
+
+    def test_api_request_with_invalid_token(self):
+        response = self.client.post('/api/sessions/999/leave/', HTTP_AUTHORIZATION='Bearer not.a.jwt', secure=True)
+        self.assertEqual(response.status_code, 401)
+
+    async def test_middleware_stays_async_under_asgi(self):
+        from asgiref.sync import iscoroutinefunction
+        from django.test import RequestFactory
+        from accounts.middleware import Auth0BearerMiddleware
+
+        async def view(request):
+            return request.user
+
+        middleware = Auth0BearerMiddleware(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+        request = RequestFactory().post('/api/sessions/1/leave/', HTTP_AUTHORIZATION='Bearer t')
+        with mock.patch('accounts.middleware.authenticate_bearer_token', return_value=self.user):
+            self.assertEqual(await middleware(request), self.user)
+        self.assertEqual(await request.auser(), self.user)
+        with mock.patch('accounts.middleware.authenticate_bearer_token', return_value=None):
+            self.assertEqual((await middleware(request)).status_code, 401)
+
+
+class UserSyncTests(TestCase):
+
+    def test_unchanged_claims_do_not_write(self):
+        claims = {'sub': 'auth0|sync1', 'email': 'a@example.com', 'name': 'Ada Lovelace'}
+        user = auth_backend.get_or_create_user_from_token(claims)
+        self.assertEqual((user.first_name, user.last_name), ('Ada', 'Lovelace'))
+        # One SELECT (user + profile), no UPDATEs.
+        with self.assertNumQueries(1):
+            auth_backend.get_or_create_user_from_token(claims)
+
+    def test_only_changed_fields_written(self):
+        claims = {'sub': 'auth0|sync2', 'email': 'b@example.com', 'name': 'Grace Hopper'}
+        auth_backend.get_or_create_user_from_token(claims)
+        claims['name'] = 'Grace Murray'
+        with self.assertNumQueries(2):
+            user = auth_backend.get_or_create_user_from_token(claims)
+        user.refresh_from_db()
+        self.assertEqual(user.last_name, 'Murray')
+        self.assertEqual(user.email, 'b@example.com')
+
+    def test_import_command_bulk_creates_and_skips_existing(self):
+        import os
+        import tempfile
+        from django.core.management import call_command
+        from accounts.models import UserProfile
+        auth_backend.get_or_create_user_from_token({'sub': 'auth0|u0', 'email': 'u0@example.com'})
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as fh:
+            self.addCleanup(os.unlink, fh.name)
+            for i in range(5):
+                fh.write(json.dumps({'user_id': f'auth0|u{i}', 'email': f'u{i}@example.com', 'name': f'User {i}'}) + '\n')
+        call_command('import_auth0_users', fh.name, batch_size=2, stdout=mock.Mock())
+        self.assertEqual(UserProfile.objects.filter(auth0_sub__startswith='auth0|u').count(), 5)
+        profile = UserProfile.objects.select_related('user').get(auth0_sub='auth0|u3')
+        self.assertEqual(profile.user.email, 'u3@example.com')
+        self.assertFalse(profile.user.has_usable_password())
@@ -0,0 +1,189 @@
+# Core: audit trail, buffered writer, retention and task outbox tests
+
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from core import audit, batching
+from core.models import AuditLog
+
+User = get_user_model()
+
+
+class BatchWriterTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='client')
+        self.spill_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.spill_dir)
+        self.writer = batching.BatchWriter('core.AuditLog', self.spill_dir, max_events=100, interval=3600)
+        self.addCleanup(self.writer.stop)
+
+    def spilled(self):
+        return sorted(os.listdir(self.spill_dir))
+
+    def test_unbuffered_events_are_written_on_commit(self):
+        from wallets.models import Wallet, credit_wallet
+        wallet = Wallet.objects.create(user=self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            credit_wallet(wallet, Decimal('5'), 'top_up', 'top_up_1')
+            self.assertFalse(AuditLog.objects.exists())
+        log = AuditLog.objects.get()
+        self.assertEqual((log.action, log.user_id, log.details['amount']), ('wallet_credit', self.user.pk, '5'))
+
+    def test_buffered_events_are_journaled_until_flushed(self):
+        self.writer.start()
+        happened = timezone.now() - timedelta(seconds=30)
+        event = dict(audit.event('login', user=self.user, details={'ip': '127.0.0.1'}), created_at=happened)
+        with self.assertNumQueries(0):
+            self.writer.append([event])
+        journal, = self.spilled()
+        with open(os.path.join(self.spill_dir, journal)) as f:
+            self.assertEqual(json.loads(f.read())['action'], 'login')
+
+        self.assertEqual(self.writer.flush(), 1)
+        self.assertEqual(AuditLog.objects.get().created_at, happened)
+        self.writer.stop()
+        self.assertEqual(self.spilled(), [])
+
+    def test_failed_batches_and_dead_journals_are_recovered(self):
+        self.writer.start()
+        self.writer.append([audit.event('first', user=self.user)])
+        with mock.patch.object(self.writer, '_insert', side_effect=RuntimeError('db down')):
+            self.assertEqual(self.writer.flush(), 0)
+        # A worker that died with an event still buffered.
+        dead = subprocess.Popen(['true'])
+        dead.wait()
+        with open(os.path.join(self.spill_dir, f'{dead.pid}.journal.jsonl'), 'w') as f:
+            f.write(json.dumps(audit.event('second', user=self.user), default=str) + '\n{"action": "cut sh')
+
+        # The failed batch waits out its backoff; the dead worker's journal does not.
+        self.assertEqual(self.writer.recover(), 1)
+        later = batching.time.time() + batching.MAX_RETRY_DELAY
+        with mock.patch.object(batching.time, 'time', return_value=later):
+            self.assertEqual(self.writer.recover(), 1)
+        self.assertEqual(sorted(AuditLog.objects.values_list('action', flat=True)), ['first', 'second'])
+        self.assertEqual(len(self.spilled()), 1)  # our live journal
+
+
+class BatchWriterDeadLetterTests(TransactionTestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='client')
+        self.spill_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.spill_dir)
+        self.writer = batching.BatchWriter('core.AuditLog', self.spill_dir, max_events=100, interval=3600)
+        self.addCleanup(self.writer.stop)
+
+    def test_rows_violating_a_foreign_key_are_dead_lettered(self):
+        self.writer.start()
+        gone = User.objects.create_user(username='gone')
+        self.writer.append([audit.event('before', user=self.user), audit.event('orphan', user=gone)])
+        self.writer.append([audit.event('after', user=self.user)])
+        gone.delete()
+
+        self.assertEqual(self.writer.flush(), 2)
+        self.assertEqual(sorted(AuditLog.objects.values_list('action', flat=True)), ['after', 'before'])
+        dead, = [name for name in os.listdir(self.spill_dir) if '.dead.' in name]
+        with open(os.path.join(self.spill_dir, dead)) as f:
+            self.assertEqual([json.loads(line)['action'] for line in f], ['orphan'])
+        # Dead letters are never retried.
+        self.assertEqual(self.writer.recover(), 0)
+        self.assertEqual(AuditLog.objects.count(), 2)
+
+
+class AuditRetentionTests(TestCase):
+
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.output_dir)
+
+    def test_expired_months_are_exported_then_removed(self):
+        import gzip
+        from django.core.management import call_command
+        now = timezone.now()
+        old = AuditLog.objects.create(action='old', object_id='1', created_at=now - timedelta(days=400))
+        AuditLog.objects.create(action='older', created_at=now - timedelta(days=460))
+        recent = AuditLog.objects.create(action='recent', created_at=now - timedelta(days=10))
+
+        call_command('archive_audit_log', days=365, output_dir=self.output_dir, stdout=open(os.devnull, 'w'))
+        self.assertEqual(list(AuditLog.objects.values_list('pk', flat=True)), [recent.pk])
+        archives = sorted(os.listdir(self.output_dir))
+        self.assertEqual(len(archives), 2)
+        month = old.created_at.strftime('%Y-%m')
+        with gzip.open(os.path.join(self.output_dir, f'auditlog-{month}.jsonl.gz'), 'rt') as f:
+            rows = [json.loads(line) for line in f]
+        self.assertEqual([(r['id'], r['action'], r['object_id']) for r in rows], [(old.pk, 'old', '1')])
+
+    def test_late_rows_for_an_archived_month_get_their_own_file(self):
+        import gzip
+        from core.retention import archive_month
+        from core.partitions import month_start
+        created = timezone.now() - timedelta(days=400)
+        AuditLog.objects.create(action='first', created_at=created)
+        first_count, first = archive_month(month_start(created), self.output_dir)
+        AuditLog.objects.create(action='late', created_at=created)
+        late_count, late = archive_month(month_start(created), self.output_dir)
+
+        self.assertEqual((first_count, late_count), (1, 1))
+        self.assertEqual(late, first.replace('.jsonl.gz', '.1.jsonl.gz'))
+        for path, action in ((first, 'first'), (late, 'late')):
+            with gzip.open(path, 'rt') as f:
+                self.assertEqual([json.loads(line)['action'] for line in f], [action])
+        self.assertEqual(len(os.listdir(self.output_dir)), 2)
+        self.assertFalse(AuditLog.objects.exists())
+
+
+class OutboxTests(TestCase):
+
+    def test_messages_commit_with_the_change_and_dispatch_in_batches(self):
+        from django.db import transaction
+        from core import outbox
+        from core.models import OutboxMessage
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            outbox.enqueue('readings.tasks.payout_readers')
+            raise RuntimeError
+        self.assertFalse(OutboxMessage.objects.exists())
+
+        eta = timezone.now() + timedelta(minutes=5)
+        first = outbox.enqueue('readings.tasks.expire_session_grace', 1, eta.isoformat(), eta=eta)
+        second = outbox.enqueue('readings.tasks.session_finalize', 1)
+        third = outbox.enqueue('readings.tasks.session_finalize', 2)
+        with mock.patch('celery.current_app') as app:
+            app.send_task.side_effect = [None, None, ConnectionError('broker down')]
+            self.assertEqual(outbox.drain(batch_size=10), 2)
+        app.producer_or_acquire.assert_called_once_with()
+        producer = app.producer_or_acquire.return_value.__enter__.return_value
+        self.assertEqual(app.send_task.call_args_list[0], mock.call(
+            'readings.tasks.expire_session_grace', args=[1, eta.isoformat()], kwargs={}, eta=eta,
+            task_id=f'outbox-{first.pk}', producer=producer,
+        ))
+        pending = OutboxMessage.objects.filter(dispatched_at__isnull=True)
+        self.assertEqual(list(pending.values_list('pk', flat=True)), [third.pk])
+
+        with mock.patch('celery.current_app') as app:
+            self.assertEqual(outbox.drain(batch_size=1), 1)
+        self.assertEqual(app.send_task.call_args.kwargs['task_id'], f'outbox-{third.pk}')
+        self.assertFalse(pending.exists())
+
+        self.assertEqual(outbox.purge(timezone.now() + timedelta(seconds=1)), 3)
+        self.assertFalse(OutboxMessage.objects.filter(pk=second.pk).exists())
+
+    def test_dispatcher_command_drains_the_outbox(self):
+        from django.core.management import call_command
+        from core import outbox
+        from core.models import OutboxMessage
+        outbox.enqueue('readings.tasks.session_finalize', 1)
+        with mock.patch('celery.current_app') as app:
+            call_command('dispatch_outbox', once=True, stdout=open(os.devnull, 'w'))
+        app.send_task.assert_called_once()
+        self.assertFalse(OutboxMessage.objects.filter(dispatched_at__isnull=True).exists())
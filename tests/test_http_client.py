@@ -0,0 +1,49 @@
+# Pooled outbound HTTP client tests
+
+from unittest import mock
+
+import requests
+from django.test import SimpleTestCase
+
+from core.http import CircuitOpenError, HttpClient
+
+
+class HttpClientTests(SimpleTestCase):
+
+    def test_circuit_opens_after_consecutive_failures(self):
+        client = HttpClient('test', failure_threshold=2, reset_timeout=60)
+        with mock.patch.object(client.session, 'request', side_effect=requests.ConnectionError('down')) as send:
+            for _ in range(2):
+                with self.assertRaises(requests.ConnectionError):
+                    client.get('https://idp.example.com/x')
+            with self.assertRaises(CircuitOpenError):
+                client.get('https://idp.example.com/x')
+        self.assertEqual(send.call_count, 2)
+        metrics = client.metrics()['idp.example.com']
+        self.assertEqual((metrics['errors'], metrics['rejected'], metrics['circuit']), (2, 1, 'open'))
+
+    def test_half_open_trial_closes_circuit(self):
+        client = HttpClient('test', failure_threshold=1, reset_timeout=0)
+        ok = mock.Mock(status_code=200)
+        with mock.patch.object(client.session, 'request', side_effect=[requests.Timeout('slow'), ok]):
+            with self.assertRaises(requests.Timeout):
+                client.get('https://idp.example.com/x')
+            self.assertIs(client.get('https://idp.example.com/x'), ok)
+        self.assertEqual(client.metrics()['idp.example.com']['circuit'], 'closed')
+
+    def test_unexpected_error_in_trial_reopens_circuit(self):
+        client = HttpClient('test', failure_threshold=1, reset_timeout=0)
+        ok = mock.Mock(status_code=200)
+        with mock.patch.object(client.session, 'request', side_effect=[requests.Timeout('slow'), ValueError('bad'), ok]):
+            with self.assertRaises(requests.Timeout):
+                client.get('https://idp.example.com/a')
+            with self.assertRaises(ValueError):
+                client.get('https://idp.example.com/a')
+            self.assertIs(client.get('https://idp.example.com/a'), ok)
+        self.assertEqual(client.metrics()['idp.example.com']['circuit'], 'closed')
+
+    def test_default_timeout_applied(self):
+        client = HttpClient('test', timeout=(1, 2))
+        with mock.patch.object(client.session, 'request', return_value=mock.Mock(status_code=200)) as send:
+            client.post('https://idp.example.com/token', json={})
+        self.assertEqual(send.call_args.kwargs['timeout'], (1, 2))
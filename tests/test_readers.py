@@ -0,0 +1,338 @@
+# Reader directory: search index, search and listing tests
+
+import re
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import RequestFactory, TestCase
+
+from accounts.models import UserProfile
+from readers.models import ReaderProfile, ReaderRate, ReaderSearchIndex, Review
+from readers import workflows
+from readers.tags import set_specialties
+
+User = get_user_model()
+
+
+def make_reader(slug, verified=True, display_name='', specialties='', rates=None):
+    user = User.objects.create_user(username=slug)
+    UserProfile.objects.create(user=user, auth0_sub=f'auth0|{slug}', role='reader', display_name=display_name)
+    reader = ReaderProfile.objects.create(user=user, slug=slug, is_verified=verified)
+    if specialties:
+        set_specialties(reader, specialties)
+    for modality, rate in (rates or {}).items():
+        ReaderRate.objects.create(reader=reader, modality=modality, rate_per_minute=Decimal(rate))
+    return reader
+
+
+class ReaderSearchIndexTests(TestCase):
+
+    def setUp(self):
+        self.client_user = User.objects.create_user(username='client')
+
+    def test_index_tracks_reviews_and_rates(self):
+        reader = make_reader('luna', display_name='Luna', rates={'voice': '3.00', 'video': '6.00'})
+        Review.objects.create(reader=reader, client=self.client_user, rating=5)
+        review = Review.objects.create(reader=reader, client=self.client_user, rating=3)
+        row = ReaderSearchIndex.objects.get(reader=reader)
+        self.assertEqual((row.avg_rating, row.review_count), (4.0, 2))
+        self.assertEqual((row.min_rate, row.max_rate, row.text_rate), (Decimal('3.00'), Decimal('6.00'), None))
+        self.assertEqual(row.display_name, 'Luna')
+
+        review.delete()
+        ReaderRate.objects.filter(reader=reader, modality='video').get().delete()
+        row.refresh_from_db()
+        self.assertEqual((row.avg_rating, row.review_count, row.max_rate), (5.0, 1, Decimal('3.00')))
+
+    def test_browse_filters_and_sorts_in_one_query(self):
+        cheap = make_reader('cheap', rates={'text': '1.50'})
+        pricey = make_reader('pricey', rates={'voice': '12.00'})
+        make_reader('hidden', verified=False, rates={'text': '1.00'})
+        Review.objects.create(reader=pricey, client=self.client_user, rating=5)
+        Review.objects.create(reader=cheap, client=self.client_user, rating=2)
+
+        def browse(**params):
+            request = RequestFactory().get('/readers/browse/', params)
+            with mock.patch.object(workflows, 'render') as render:
+                workflows.browse_readers(request)
+            readers = render.call_args.args[2]['readers']
+            with self.assertNumQueries(1):
+                return [entry.reader.slug for entry in readers]
+
+        self.assertEqual(browse(sort='rating'), ['pricey', 'cheap'])
+        self.assertEqual(browse(sort='price_low'), ['cheap', 'pricey'])
+        self.assertEqual(browse(price='under-2'), ['cheap'])
+        self.assertEqual(browse(modality='voice', rating='4'), ['pricey'])
+
+
+class ReaderFullTextSearchTests(TestCase):
+
+    def search(self, query, queryset=None):
+        from readers.search import apply_search
+        queryset = ReaderProfile.objects.all() if queryset is None else queryset
+        return list(apply_search(queryset, query, reader_field='pk', prefix='search_index__').values_list('pk', flat=True))
+
+    def test_search_ranks_name_over_bio_and_stays_in_sync(self):
+        by_name = make_reader('star', display_name='Tarot Star')
+        by_bio = make_reader('moon', display_name='Moon')
+        by_bio.bio = 'I read tarot cards and runes'
+        by_bio.save()
+        make_reader('sun', display_name='Sun', specialties='astrology')
+
+        self.assertEqual(self.search('tarot'), [by_name.pk, by_bio.pk])
+        self.assertEqual(self.search('astro'), [ReaderProfile.objects.get(slug='sun').pk])
+        # Caller filters apply to every match, not to a capped top-ranked list.
+        self.assertEqual(self.search('tarot', ReaderProfile.objects.exclude(pk=by_name.pk)), [by_bio.pk])
+
+        by_bio.bio = 'Runes only'
+        by_bio.save(update_fields=['bio'])
+        self.assertEqual(self.search('tarot'), [by_name.pk])
+
+    def test_search_ignores_query_syntax(self):
+        make_reader('quote', display_name='Quote Reader')
+        self.assertEqual(self.search('"quote* ('), [ReaderProfile.objects.get(slug='quote').pk])
+
+    def test_search_results_page_through_equal_ranks(self):
+        from django.core.cache import cache
+        from readers.views import DIRECTORY_PAGE_SIZE
+        cache.clear()
+        for i in range(DIRECTORY_PAGE_SIZE + 2):
+            make_reader(f'r{i:02d}', display_name='Tarot Reader', rates={'text': '2.00'})
+        make_reader('voice', display_name='Tarot Reader', rates={'voice': '2.00'})
+
+        first = self.client.get('/readers/', {'q': 'tarot', 'modality': 'text'}, secure=True)
+        next_url = first.context['results_html'].split('hx-get="')[1].split('"')[0].replace('&amp;', '&')
+        second = self.client.get(next_url, secure=True, HTTP_HX_REQUEST='true')
+        pages = [re.findall(r'/readers/(r\d+)/', html) for html in (first.context['results_html'], second.content.decode())]
+        self.assertEqual([len(set(page)) for page in pages], [DIRECTORY_PAGE_SIZE, 2])
+        self.assertEqual(sorted(set(pages[0]) | set(pages[1])), [f'r{i:02d}' for i in range(DIRECTORY_PAGE_SIZE + 2)])
+
+
+class SpecialtyTagTests(TestCase):
+
+    def test_tags_normalized_and_matched_exactly(self):
+        from readers.tags import filter_by_specialties, specialty_facets
+        tarot = make_reader('a', specialties='Tarot, Astrology')
+        make_reader('b', specialties=' tarot ,anti-tarot')
+        make_reader('c', specialties='Anti-Tarot')
+
+        def slugs(*tags):
+            return sorted(filter_by_specialties(ReaderProfile.objects.all(), list(tags)).values_list('slug', flat=True))
+
+        self.assertEqual(slugs('tarot'), ['a', 'b'])
+        self.assertEqual(slugs('tarot', 'astrology'), ['a'])
+        self.assertEqual(slugs('anti-tarot'), ['b', 'c'])
+        with self.assertNumQueries(1):
+            facets = specialty_facets()
+        self.assertEqual([(f['slug'], f['count']) for f in facets],
+                         [('anti-tarot', 2), ('tarot', 2), ('astrology', 1)])
+        self.assertEqual(tarot.get_specialties_list(), ['Astrology', 'Tarot'])
+
+    def test_set_specialties_updates_index(self):
+        reader = make_reader('d', specialties='Runes')
+        set_specialties(reader, ['Dream work', 'Runes'])
+        self.assertEqual(ReaderSearchIndex.objects.get(reader=reader).specialties, 'Dream work, Runes')
+        set_specialties(reader, '')
+        self.assertEqual(ReaderSearchIndex.objects.get(reader=reader).specialties, '')
+
+    def test_session_join_page_shows_reader_specialties(self):
+        from readings.models import Session
+        reader = make_reader('e', display_name='Iris', specialties='Tarot, Astrology')
+        session = Session.objects.create(client=User.objects.create_user(username='seeker'),
+                                         reader=reader.user, modality='voice', rate_per_minute=Decimal('2.00'))
+        request = RequestFactory().get('/')
+        request.user = session.client
+        response = workflows.session_join(request, session.id)
+        self.assertContains(response, 'Astrology, Tarot')
+        self.assertContains(response, 'Iris')
+
+
+class ReaderDirectoryTests(TestCase):
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+
+    def get(self, **params):
+        return self.client.get('/readers/', params, secure=True)
+
+    def test_keyset_pages_and_cached_fragment(self):
+        from readers.views import DIRECTORY_PAGE_SIZE
+        for i in range(DIRECTORY_PAGE_SIZE + 2):
+            make_reader(f'r{i:02d}', rates={'text': '2.00'})
+        first = self.get(modality='text', utm_source='newsletter')
+        self.assertEqual(first.status_code, 200)
+        self.assertContains(first, '/readers/r23/')
+        self.assertNotContains(first, '/readers/r24/')
+        next_url = first.context['results_html'].split('hx-get="')[1].split('"')[0].replace('&amp;', '&')
+        # The shared fragment links on with the normalized filters only.
+        self.assertRegex(next_url, r'^/readers/\?modality=text&cursor=[^&]+$')
+
+        second = self.client.get(next_url, secure=True, HTTP_HX_REQUEST='true')
+        self.assertContains(second, '/readers/r25/')
+        self.assertNotContains(second, '/readers/r00/')
+        self.assertNotContains(second, 'hx-get')
+
+        # Anonymous repeat visits are served entirely from cache.
+        with self.assertNumQueries(0):
+            self.get(modality='text')
+
+    def test_junk_filters_are_rejected_or_normalized(self):
+        make_reader('nova', display_name='Nova Tarot', rates={'text': '2.00'})
+        self.assertEqual(self.get(cursor='not-a-cursor').status_code, 400)
+        self.assertEqual(self.get(modality='smoke').status_code, 400)
+        # A plain pk cursor is not a search cursor.
+        self.assertEqual(self.get(q='tarot', cursor='MQ').status_code, 400)
+        self.assertContains(self.get(q='  Tarot '), '/readers/nova/')
+        # Same normalized query, same cached fragment.
+        with self.assertNumQueries(0):
+            self.assertContains(self.get(q='TAROT'), '/readers/nova/')
+
+    def test_rate_change_invalidates_directory(self):
+        reader = make_reader('nova', rates={'text': '2.00'})
+        self.assertContains(self.get(), '$2.00/min')
+        ReaderRate.objects.filter(reader=reader).update(rate_per_minute=Decimal('9.00'))
+        self.assertContains(self.get(), '$2.00/min')  # stale until a signal fires
+        rate = ReaderRate.objects.get(reader=reader)
+        rate.save()
+        self.assertContains(self.get(), '$9.00/min')
+
+
+class ReaderPresenceTests(TestCase):
+
+    def setUp(self):
+        from django.core.cache import cache
+        from readers import presence
+        cache.clear()
+        presence.get_store().clear()
+        self.presence = presence
+
+    def test_heartbeats_and_sessions_drive_availability(self):
+        from readings.models import Session
+        luna = make_reader('luna', rates={'voice': '3.00', 'text': '1.00'})
+        make_reader('sol', rates={'video': '5.00'})
+        self.client.force_login(luna.user)
+        response = self.client.post('/api/readers/presence/', '{}', content_type='application/json', secure=True)
+        self.assertEqual(response.json()['status'], 'online')
+
+        available = lambda modality=None: self.presence.available_reader_ids(modality)
+        self.assertEqual(available('voice'), {luna.user_id})
+        self.assertEqual(available('video'), set())
+
+        session = Session.objects.create(client=User.objects.create_user(username='c'), reader=luna.user, state='created')
+        session.transition('waiting')
+        self.assertEqual(available(), set())
+        self.assertEqual(self.presence.reader_statuses([luna.user_id]), {luna.user_id: 'busy'})
+        session.transition('ended')
+        self.assertEqual(available(), {luna.user_id})
+
+        directory = self.client.get('/readers/', {'available': '1', 'modality': 'text'}, secure=True)
+        self.assertContains(directory, '/readers/luna/')
+        self.assertNotContains(directory, '/readers/sol/')
+
+        self.presence.heartbeat(luna.user_id, 'offline')
+        self.assertEqual(available(), set())
+
+    def test_heartbeat_expires(self):
+        with self.settings(PRESENCE_HEARTBEAT_TTL=-1):
+            self.presence.heartbeat(42, 'online', ['voice'])
+        self.assertEqual(self.presence.available_reader_ids(), set())
+
+    def test_heartbeat_rejects_bad_modalities(self):
+        self.client.force_login(make_reader('luna', rates={'voice': '3.00'}).user)
+        for modalities in ([['voice']], [{'m': 'voice'}], ['voice', 'smoke']):
+            response = self.client.post(
+                '/api/readers/presence/', {'modalities': modalities}, content_type='application/json', secure=True,
+            )
+            self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.presence.available_reader_ids(), set())
+
+    def test_non_reader_cannot_heartbeat(self):
+        self.client.force_login(User.objects.create_user(username='client'))
+        response = self.client.post('/api/readers/presence/', '{}', content_type='application/json', secure=True)
+        self.assertEqual(response.status_code, 403)
+
+
+class ReaderRecommendationTests(TestCase):
+
+    def test_item_item_recommendations(self):
+        from readers.models import Favorite, ReaderRecommendation
+        from readers.recommendations import build_recommendations
+        from readers.recommended import recommended_readers
+        a, b, c = (make_reader(slug) for slug in ('a', 'b', 'c'))
+        make_reader('unverified', verified=False)
+        fans = [User.objects.create_user(username=f'fan{i}') for i in range(3)]
+        for fan in fans:
+            Favorite.objects.create(client=fan, reader=a)
+            Favorite.objects.create(client=fan, reader=b)
+        Review.objects.create(reader=c, client=fans[0], rating=1)
+        newcomer = User.objects.create_user(username='newcomer')
+        Favorite.objects.create(client=newcomer, reader=a)
+
+        self.assertGreater(build_recommendations(), 0)
+        # b co-occurs with a; c is only linked through a bad review.
+        with self.assertNumQueries(1):
+            self.assertEqual([r.slug for r in recommended_readers(newcomer)], ['b'])
+        self.assertFalse(ReaderRecommendation.objects.filter(client=fans[1]).exists())
+
+        request = RequestFactory().get('/readers/browse/')
+        request.user = newcomer
+        with mock.patch.object(workflows, 'render') as render:
+            workflows.browse_readers(request)
+        self.assertEqual([e.reader.slug for e in render.call_args.args[2]['readers']], ['b', 'a', 'c'])
+
+    def test_top_k_is_vectorized_per_row(self):
+        import numpy as np
+        from scipy import sparse
+        from readers.recommendations import _top_k_per_row
+        m = sparse.csr_matrix(np.array([[0.1, 0.9, 0.5, -1.0], [0, 0, 0, 0], [2.0, 2.0, 0, 1.0]]))
+        rows, cols, data = _top_k_per_row(m, 2)
+        self.assertEqual(list(zip(rows.tolist(), cols.tolist())), [(0, 1), (0, 2), (2, 0), (2, 1)])
+
+
+class ReaderProfilePageTests(TestCase):
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+
+    def test_public_part_cached_and_invalidated(self):
+        from readers.models import Favorite
+        reader = make_reader('iris', specialties='Tarot', rates={'voice': '4.00'})
+        fan = User.objects.create_user(username='fan')
+        Review.objects.create(reader=reader, client=fan, rating=4, body='Spot on')
+        url = '/readers/iris/'
+
+        first = self.client.get(url, secure=True)
+        self.assertContains(first, 'Spot on')
+        self.assertContains(first, '★ 4.0 (1 reviews)')
+        with self.assertNumQueries(0):
+            self.client.get(url, secure=True)
+
+        # Favorite state is layered per user on top of the cached fragment.
+        Favorite.objects.create(client=fan, reader=reader)
+        self.client.force_login(fan)
+        self.assertContains(self.client.get(url, secure=True), '♥ Favorited')
+
+        Review.objects.create(reader=reader, client=fan, rating=2, body='Meh')
+        self.assertContains(self.client.get(url, secure=True), '★ 3.0 (2 reviews)')
+
+        reader.slug = 'iris-moon'
+        reader.save()
+        self.assertEqual(self.client.get(url, secure=True).status_code, 404)
+        self.assertContains(self.client.get('/readers/iris-moon/', secure=True), 'Tarot')
+
+    def test_reader_detail_availability_in_one_query(self):
+        from datetime import time
+        from readers.models import ReaderAvailability
+        reader = make_reader('wren')
+        for day in (0, 3):
+            ReaderAvailability.objects.create(reader=reader, day_of_week=day, start_time=time(9), end_time=time(17))
+        request = RequestFactory().get('/')
+        request.user = User.objects.create_user(username='visitor')
+        with mock.patch.object(workflows, 'render') as render:
+            workflows.reader_detail(request, 'wren')
+        days = dict(render.call_args.args[2]['availability_by_day'])
+        self.assertEqual((days['Monday'], days['Tuesday'], days['Thursday']),
+                         ('09:00 - 17:00', 'Not Available', '09:00 - 17:00'))
@@ -0,0 +1,323 @@
+# Readings: session lifecycle tests
+
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db.models import F, Q
+from django.test import TestCase
+from django.utils import timezone
+
+from readings.models import Session
+
+User = get_user_model()
+
+
+class SessionTransitionTests(TestCase):
+
+    def setUp(self):
+        self.session = Session.objects.create(
+            client=User.objects.create_user(username='client'),
+            reader=User.objects.create_user(username='reader'),
+            state='active',
+        )
+
+    def test_transition_is_one_conditional_update(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        grace = timezone.now() + timedelta(minutes=5)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(self.session.transition('paused', grace_until=grace))
+        # Plus the grace expiry queued in the outbox, in the same transaction.
+        writes = [q['sql'].split()[0] for q in queries if not q['sql'].startswith(('SAVEPOINT', 'RELEASE'))]
+        self.assertEqual(writes, ['UPDATE', 'INSERT'])
+        self.session.refresh_from_db()
+        self.assertEqual((self.session.state, self.session.grace_until), ('paused', grace))
+
+    def test_stale_instance_loses_the_race(self):
+        stale = Session.objects.get(pk=self.session.pk)
+        self.assertTrue(self.session.transition('ended', ended_at=timezone.now()))
+        self.assertFalse(stale.transition('paused', reconnect_count=5))
+        self.assertEqual(stale.state, 'active')
+        self.session.refresh_from_db()
+        self.assertEqual((self.session.state, self.session.reconnect_count), ('ended', 0))
+
+    def test_expression_fields_are_reloaded(self):
+        self.assertTrue(self.session.transition('paused', reconnect_count=F('reconnect_count') + 1))
+        self.assertEqual(self.session.reconnect_count, 1)
+
+    def test_when_guards_extra_conditions(self):
+        Session.objects.filter(pk=self.session.pk).update(state='paused', grace_until=timezone.now() - timedelta(seconds=1))
+        self.session.refresh_from_db()
+        self.assertFalse(self.session.transition('active', when=Q(grace_until__gt=timezone.now())))
+        self.assertTrue(self.session.transition('ended', when=Q(grace_until__lt=timezone.now())))
+
+
+class GraceExpiryTests(TestCase):
+
+    def setUp(self):
+        self.session = Session.objects.create(
+            client=User.objects.create_user(username='client'),
+            reader=User.objects.create_user(username='reader'),
+            state='active',
+        )
+
+    def test_pause_registers_deadline_and_expiry_is_exact(self):
+        from core.models import OutboxMessage
+        from readings import tasks
+        grace = timezone.now() - timedelta(seconds=1)
+        self.session.transition('paused', grace_until=grace)
+        expiry = OutboxMessage.objects.get()
+        self.assertEqual(
+            (expiry.task, expiry.args, expiry.eta),
+            ('readings.tasks.expire_session_grace', [self.session.pk, grace.isoformat()], grace),
+        )
+
+        # A run for an earlier grace period is ignored.
+        tasks.expire_session_grace.run(self.session.pk, (grace - timedelta(minutes=5)).isoformat())
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.state, 'paused')
+
+        tasks.expire_session_grace.run(self.session.pk, grace.isoformat())
+        tasks.expire_session_grace.run(self.session.pk, grace.isoformat())
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.state, 'ended')
+        finalize = OutboxMessage.objects.exclude(pk=expiry.pk).get()
+        self.assertEqual((finalize.task, finalize.args), ('readings.tasks.session_finalize', [self.session.pk]))
+
+
+class SessionHeartbeatTests(TestCase):
+
+    def setUp(self):
+        from readers import presence
+        from readings import heartbeats
+        self.heartbeats = heartbeats
+        presence.get_store().clear()
+        self.addCleanup(presence.get_store().clear)
+        self.client_user = User.objects.create_user(username='client')
+        self.session = Session.objects.create(
+            client=self.client_user, reader=User.objects.create_user(username='reader'), state='active',
+        )
+        self.url = f'/api/sessions/{self.session.pk}/heartbeat/'
+
+    def post(self, token):
+        import json
+        return self.client.post(self.url, json.dumps({'token': token}), content_type='application/json', secure=True)
+
+    def test_heartbeat_needs_no_database_and_a_valid_token(self):
+        token = self.heartbeats.make_token(self.session.pk, self.client_user.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.post(token).status_code, 200)
+        other = self.heartbeats.make_token(self.session.pk + 1, self.client_user.pk)
+        self.assertEqual(self.post(other).status_code, 403)
+        self.assertEqual(self.post(token + 'x').status_code, 403)
+
+    def test_sweeper_pauses_sessions_that_stop_beating(self):
+        import time
+        from readings.tasks import pause_silent_sessions
+        live = Session.objects.create(client=self.client_user, reader=self.session.reader, state='active')
+        self.heartbeats.beat(self.session.pk, self.client_user.pk, now=time.time() - 60)
+        self.heartbeats.beat(live.pk, self.client_user.pk)
+
+        pause_silent_sessions()
+        self.session.refresh_from_db()
+        live.refresh_from_db()
+        self.assertEqual((self.session.state, self.session.reconnect_count), ('paused', 1))
+        self.assertIsNotNone(self.session.grace_until)
+        self.assertEqual(live.state, 'active')
+
+
+class SessionEventStreamTests(TestCase):
+
+    def setUp(self):
+        self.client_user = User.objects.create_user(username='client')
+        self.session = Session.objects.create(
+            client=self.client_user, reader=User.objects.create_user(username='reader'), state='active',
+        )
+
+    async def test_stream_sends_snapshot_then_published_events(self):
+        import asyncio
+        from readings import events
+        await self.async_client.aforce_login(self.client_user)
+        response = await self.async_client.get(f'/api/sessions/{self.session.pk}/events/', secure=True)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        chunks = aiter(response.streaming_content)
+
+        async def next_event():
+            return (await asyncio.wait_for(anext(chunks), 1)).decode()
+
+        first = await next_event()
+        self.assertIn('event: state', first)
+        self.assertIn('"state": "active"', first)
+
+        events._send(self.session.pk, '{"event": "billing", "data": {"billingMinutes": 1, "balance": "9.00"}}')
+        events._send(self.session.pk, '{"event": "state", "data": {"state": "ended"}}')
+        self.assertIn('"balance": "9.00"', await next_event())
+        self.assertIn('"ended"', await next_event())
+        with self.assertRaises(StopAsyncIteration):
+            await next_event()
+
+    async def test_only_participants_may_listen(self):
+        stranger = await User.objects.acreate(username='stranger')
+        await self.async_client.aforce_login(stranger)
+        response = await self.async_client.get(f'/api/sessions/{self.session.pk}/events/', secure=True)
+        self.assertEqual(response.status_code, 403)
+
+
+class AsyncSessionApiTests(TestCase):
+
+    def setUp(self):
+        from wallets.models import Wallet
+        self.client_user = User.objects.create_user(username='client')
+        Wallet.objects.create(user=self.client_user, balance=Decimal('10'))
+        self.session = Session.objects.create(
+            client=self.client_user, reader=User.objects.create_user(username='reader'),
+            state='waiting', rate_per_minute=Decimal('1'),
+        )
+
+    async def call(self, view, user):
+        from django.test import RequestFactory
+        request = RequestFactory().post('/')
+        request.user = user
+
+        async def auser():
+            return user
+        request.auser = auser
+        return await view(request, self.session.pk)
+
+    async def test_lifecycle_matches_sync_views(self):
+        import json
+        from core.models import OutboxMessage
+        from readings import async_agora_views as views
+        with self.settings(AGORA_APP_ID='app', AGORA_CERTIFICATE='0' * 32):
+            self.assertEqual((await self.call(views.session_join, self.client_user)).status_code, 200)
+            left = await self.call(views.session_leave, self.client_user)
+            self.assertEqual(json.loads(left.content)['reconnectCount'], 1)
+            self.assertEqual((await self.call(views.session_leave, self.client_user)).status_code, 400)
+            self.assertEqual((await self.call(views.session_reconnect, self.client_user)).status_code, 200)
+            ended = await self.call(views.session_end, self.client_user)
+        self.assertEqual(json.loads(ended.content)['state'], 'ended')
+        finalize = await OutboxMessage.objects.filter(task='readings.tasks.session_finalize').aget()
+        self.assertEqual(finalize.args, [self.session.pk])
+
+        stranger = await User.objects.acreate(username='stranger')
+        self.assertEqual((await self.call(views.session_end, stranger)).status_code, 403)
+
+
+class SessionLifecycleTests(TestCase):
+
+    def setUp(self):
+        from wallets.models import LedgerEntry, Wallet
+        self.reader = User.objects.create_user(username='reader')
+        self.clients = [User.objects.create_user(username=f'client{i}') for i in range(3)]
+        for client in self.clients:
+            wallet = Wallet.objects.create(user=client, balance=Decimal('5'))
+            LedgerEntry.objects.create(wallet=wallet, amount=Decimal('5'), entry_type='top_up', idempotency_key=f'top_up_{client.pk}')
+
+    def session(self, client, state='active', rate='2', **fields):
+        return Session.objects.create(client=client, reader=self.reader, state=state, rate_per_minute=Decimal(rate), **fields)
+
+    def run_cycle(self, **kwargs):
+        from readings.lifecycle import run_cycle
+        with self.captureOnCommitCallbacks(execute=True):
+            return run_cycle(**kwargs)
+
+    def test_cycle_bills_pauses_expires_and_finalizes_in_one_pass(self):
+        from core.models import AuditLog
+        from wallets.models import Wallet
+        billed = [self.session(self.clients[0]), self.session(self.clients[1])]
+        broke = self.session(self.clients[2], rate='10')
+        expired = self.session(self.clients[2], state='paused', grace_until=timezone.now() - timedelta(seconds=1))
+        grace = self.session(self.clients[2], state='paused', grace_until=timezone.now() + timedelta(minutes=1))
+        ended = self.session(self.clients[0], state='ended', ended_at=timezone.now() - timedelta(minutes=6))
+        settling = self.session(self.clients[1], state='ended', ended_at=timezone.now())
+
+        counts = self.run_cycle()
+        self.assertEqual(counts, {'billed': 2, 'paused': 1, 'ended': 1, 'finalized': 1})
+        states = dict(Session.objects.values_list('pk', 'state'))
+        # Sessions ended recently, or during the cycle, wait out FINALIZE_DELAY.
+        self.assertEqual([states[s.pk] for s in (*billed, broke, expired, grace, ended, settling)],
+                         ['active', 'active', 'paused', 'ended', 'paused', 'finalized', 'ended'])
+        self.assertEqual(Wallet.objects.get(user=self.clients[0]).balance, Decimal('3'))
+        self.assertEqual(
+            list(AuditLog.objects.filter(action='session_finalized').values_list('object_id', flat=True)),
+            [str(ended.pk)],
+        )
+        self.assertIn('Duration: 0 minutes', Session.objects.get(pk=ended.pk).summary)
+
+        # The next cycle charges the next minute, never the same one twice.
+        self.run_cycle()
+        self.assertEqual(Session.objects.get(pk=billed[0].pk).billing_minutes, 2)
+        self.assertEqual(Wallet.objects.get(user=self.clients[0]).balance, Decimal('1'))
+
+        self.run_cycle(now=timezone.now() + timedelta(minutes=6))
+        states = dict(Session.objects.values_list('pk', 'state'))
+        self.assertEqual((states[expired.pk], states[settling.pk]), ('finalized', 'finalized'))
+
+    def test_query_count_does_not_grow_with_sessions(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        def cycle_queries():
+            with CaptureQueriesContext(connection) as queries:
+                self.run_cycle()
+            return len(queries)
+
+        for client in self.clients:
+            self.session(client, rate='1')
+            self.session(client, state='ended', ended_at=timezone.now() - timedelta(minutes=6))
+        few = cycle_queries()
+        for client in self.clients:
+            for _ in range(3):
+                self.session(client, rate='0.5')
+                self.session(client, state='ended', ended_at=timezone.now() - timedelta(minutes=6))
+        self.assertEqual(cycle_queries(), few)
+
+    def test_session_finalize_skips_sessions_not_ended(self):
+        from readings.tasks import session_finalize
+        active = self.session(self.clients[0])
+        ended = self.session(self.clients[0], state='ended', ended_at=timezone.now())
+        session_finalize(active.pk)
+        session_finalize(ended.pk)
+        session_finalize(ended.pk)
+        states = dict(Session.objects.values_list('pk', 'state'))
+        self.assertEqual((states[active.pk], states[ended.pk]), ('active', 'finalized'))
+
+
+class SessionTimelineTests(TestCase):
+
+    def setUp(self):
+        from wallets.models import Wallet
+        self.client_user = User.objects.create_user(username='client')
+        Wallet.objects.create(user=self.client_user, balance=Decimal('10'))
+        self.reader = User.objects.create_user(username='reader')
+
+    def test_lifecycle_steps_are_appended_and_analysed(self):
+        from readings import timeline
+        from readings.lifecycle import run_cycle
+        from readings.models import SessionEvent
+        voice = Session.objects.create(client=self.client_user, reader=self.reader, state='waiting', rate_per_minute=Decimal('1'))
+        video = Session.objects.create(
+            client=self.client_user, reader=self.reader, state='waiting', modality='video', rate_per_minute=Decimal('2'),
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            for session in (voice, video):
+                session.transition('active')
+                timeline.record(session, 'join', self.client_user)
+            run_cycle()
+            voice.transition('paused', grace_until=timezone.now() + timedelta(minutes=5))
+            timeline.record(voice, 'leave', self.client_user)
+            voice.transition('active', grace_until=None)
+            timeline.record(voice, 'reconnect', self.client_user)
+            run_cycle()
+
+        self.assertEqual(
+            list(SessionEvent.objects.filter(session=voice).order_by('created_at', 'pk').values_list('kind', flat=True)),
+            ['join', 'bill', 'leave', 'reconnect', 'bill'],
+        )
+        bill = SessionEvent.objects.filter(session=video, kind='bill').order_by('created_at').last()
+        self.assertEqual(bill.data, {'minute': 2, 'amount': '2.00'})
+        day = timedelta(days=1)
+        now = timezone.now()
+        self.assertEqual(timeline.reconnect_rate(now - day, now + day), 0.5)
+        self.assertEqual(timeline.minutes_by_modality(now - day, now + day), {'voice': 2, 'video': 2})
@@ -0,0 +1,230 @@
+# Scheduling: slot materialization and booking tests
+
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from zoneinfo import ZoneInfo
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from accounts.models import UserProfile
+from readers.models import ReaderAvailability, ReaderProfile, ReaderRate
+from scheduling.models import Booking, ScheduledSlot
+from scheduling.slots import expand_windows, materialize_slots
+
+User = get_user_model()
+UTC = dt_timezone.utc
+
+
+def make_reader(slug, tz='UTC'):
+    user = User.objects.create_user(username=slug)
+    UserProfile.objects.create(user=user, auth0_sub=f'auth0|{slug}', role='reader')
+    return ReaderProfile.objects.create(user=user, slug=slug, timezone=tz)
+
+
+class SlotExpansionTests(TestCase):
+
+    def test_windows_follow_reader_timezone_across_dst(self):
+        tz = ZoneInfo('America/New_York')
+        # Mondays 09:00-10:00 local, either side of the 2026-03-08 DST change.
+        start = datetime(2026, 3, 1, tzinfo=UTC)
+        slots = sorted(expand_windows([(0, time(9), time(10))], tz, start, start + timedelta(days=14), 30))
+        self.assertEqual([s.isoformat() for s, _ in slots], [
+            '2026-03-02T14:00:00+00:00', '2026-03-02T14:30:00+00:00',
+            '2026-03-09T13:00:00+00:00', '2026-03-09T13:30:00+00:00',
+        ])
+
+    def test_overnight_window(self):
+        start = datetime(2026, 1, 5, tzinfo=UTC)  # a Monday
+        slots = expand_windows([(0, time(23), time(1))], ZoneInfo("UTC"), start, start + timedelta(days=2), 60)
+        self.assertEqual(sorted(s.hour for s, _ in slots), [0, 23])
+
+
+class MaterializeSlotsTests(TestCase):
+
+    def setUp(self):
+        self.now = datetime(2026, 1, 5, 0, 0, tzinfo=UTC)  # Monday
+        self.reader = make_reader('sage', tz='Europe/Berlin')
+        ReaderAvailability.objects.create(reader=self.reader, day_of_week=0, start_time=time(9), end_time=time(11))
+
+    def slots(self, **filters):
+        return list(ScheduledSlot.objects.filter(reader=self.reader.user, **filters)
+                    .order_by('start').values_list('start', flat=True))
+
+    def test_diff_keeps_booked_slots_and_is_incremental(self):
+        idle = make_reader('idle')
+        self.assertEqual(materialize_slots(horizon_days=7, now=self.now), (4, 0))
+        # Readers who never set availability are skipped by the full run.
+        idle.refresh_from_db()
+        self.assertIsNone(idle.slots_synced_at)
+        self.assertEqual(self.slots()[0], datetime(2026, 1, 5, 8, 0, tzinfo=UTC))
+        self.assertEqual(materialize_slots(horizon_days=7, now=self.now), (0, 0))
+
+        booked = ScheduledSlot.objects.filter(reader=self.reader.user).order_by('start').first()
+        booked.status = 'booked'
+        booked.save()
+        # Availability moves an hour later: 10:00-12:00 Berlin.
+        window = ReaderAvailability.objects.get(reader=self.reader)
+        window.start_time, window.end_time = time(10), time(12)
+        window.save()
+        self.reader.refresh_from_db()
+        self.assertGreater(self.reader.availability_updated_at, self.reader.slots_synced_at)
+
+        created, deleted = materialize_slots(stale_only=True, horizon_days=7, now=self.now)
+        self.assertEqual((created, deleted), (2, 1))
+        self.assertEqual(len(self.slots(status='booked')), 1)
+        self.assertEqual([s.hour for s in self.slots(status='available')], [9, 9, 10, 10])
+        self.assertEqual(materialize_slots(stale_only=True), (0, 0))
+
+    def test_availability_form_regenerates_slots(self):
+        self.client.force_login(self.reader.user)
+        response = self.client.post('/readers/me/availability/', {
+            'timezone': 'Asia/Tokyo', 'day_2_start': '18:00', 'day_2_end': '19:00',
+        }, secure=True)
+        self.assertEqual(response.status_code, 302)
+        self.reader.refresh_from_db()
+        self.assertEqual(self.reader.timezone, 'Asia/Tokyo')
+        self.assertEqual(list(ReaderAvailability.objects.filter(reader=self.reader).values_list('day_of_week', flat=True)), [2])
+        starts = self.slots()
+        self.assertTrue(starts)
+        self.assertEqual({(s.astimezone(ZoneInfo('Asia/Tokyo')).weekday(), s.astimezone(ZoneInfo('Asia/Tokyo')).hour) for s in starts}, {(2, 18)})
+
+
+class BookingTests(TestCase):
+
+    def setUp(self):
+        from wallets.models import Wallet
+        self.reader = make_reader('oak')
+        self.client_user = User.objects.create_user(username='client')
+        Wallet.objects.create(user=self.client_user, balance=Decimal('100'))
+        start = datetime(2030, 1, 1, 12, tzinfo=UTC)
+        self.first = ScheduledSlot.objects.create(reader=self.reader.user, start=start, end=start + timedelta(minutes=30))
+        self.overlapping = ScheduledSlot.objects.create(
+            reader=self.reader.user, start=start + timedelta(minutes=15), end=start + timedelta(minutes=45),
+        )
+
+    def test_claim_is_exclusive_and_overlaps_rejected(self):
+        from scheduling.booking import SlotConflict, SlotUnavailable, create_booking
+        booking = create_booking(self.first.pk, self.client_user)
+        self.assertEqual(booking.amount, Decimal('30.00'))
+        with self.assertRaises(SlotUnavailable):
+            create_booking(self.first.pk, User.objects.create_user(username='late'))
+        with self.assertRaises(SlotConflict):
+            create_booking(self.overlapping.pk, self.client_user)
+        self.overlapping.refresh_from_db()
+        self.assertEqual(self.overlapping.status, 'available')
+        self.assertEqual(self.client_user.wallet.entries.count(), 1)
+
+    def test_only_the_overlap_constraint_means_a_conflict(self):
+        from unittest import mock
+        from django.db import IntegrityError
+        from scheduling.booking import OVERLAP_CONSTRAINT, SlotConflict, create_booking, is_overlap_violation
+        # A OneToOne clash on Booking.slot is not an overlap and must surface.
+        Booking.objects.create(slot=self.first, client=User.objects.create_user(username='stale'))
+        with self.assertRaises(IntegrityError):
+            create_booking(self.first.pk, self.client_user)
+        self.first.refresh_from_db()
+        self.assertEqual(self.first.status, 'available')
+
+        def violation(sqlstate, constraint):
+            # Shaped like the psycopg error Django wraps.
+            cause = Exception('violation')
+            cause.sqlstate, cause.diag = sqlstate, mock.Mock(constraint_name=constraint)
+            error = IntegrityError('violation')
+            error.__cause__ = cause
+            return error
+
+        self.assertTrue(is_overlap_violation(violation('23P01', OVERLAP_CONSTRAINT)))
+        self.assertFalse(is_overlap_violation(violation('23505', 'wallets_ledgerentry_idempotency_key_key')))
+        with mock.patch.object(Booking.objects, 'create', side_effect=violation('23P01', OVERLAP_CONSTRAINT)):
+            with self.assertRaises(SlotConflict):
+                create_booking(self.overlapping.pk, self.client_user)
+
+    def test_failed_debit_releases_claim(self):
+        from scheduling.booking import InsufficientBalance, create_booking
+        from wallets.models import LedgerEntry
+        ReaderRate.objects.create(reader=self.reader, modality='voice', rate_per_minute=Decimal('10'))
+        with self.assertRaises(InsufficientBalance):
+            create_booking(self.first.pk, self.client_user)
+        self.first.refresh_from_db()
+        self.assertEqual((self.first.status, self.first.client_id), ('available', None))
+        self.assertFalse(LedgerEntry.objects.exists())
+
+
+class CalendarTests(TestCase):
+
+    def setUp(self):
+        self.reader = make_reader('fern')
+        self.start = datetime(2030, 1, 1, 9, tzinfo=UTC)
+        for i, status in enumerate(['available', 'available', 'booked', 'available', 'cancelled']):
+            begin = self.start + timedelta(minutes=30 * i)
+            ScheduledSlot.objects.create(
+                reader=self.reader.user, start=begin, end=begin + timedelta(minutes=30), status=status,
+            )
+        self.url = f'/api/scheduling/readers/{self.reader.user_id}/calendar/?start=2030-01-01&end=2030-01-02'
+
+    def test_blocks_are_run_length_encoded(self):
+        response = self.client.get(self.url, secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['blocks'], [
+            ['2030-01-01T09:00:00+00:00', '2030-01-01T10:00:00+00:00', 'available', 2],
+            ['2030-01-01T10:00:00+00:00', '2030-01-01T10:30:00+00:00', 'busy', 1],
+            ['2030-01-01T10:30:00+00:00', '2030-01-01T11:00:00+00:00', 'available', 1],
+        ])
+
+    def test_unchanged_schedule_revalidates_without_queries(self):
+        etag = self.client.get(self.url, secure=True)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, secure=True, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        from scheduling.booking import create_booking
+        from wallets.models import Wallet
+        client_user = User.objects.create_user(username='client')
+        Wallet.objects.create(user=client_user, balance=Decimal('100'))
+        create_booking(ScheduledSlot.objects.get(start=self.start).pk, client_user)
+        response = self.client.get(self.url, secure=True, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_range_is_validated(self):
+        base = f'/api/scheduling/readers/{self.reader.user_id}/calendar/'
+        for query in ['', '?start=2030-01-01', '?start=2030-01-02&end=2030-01-01', '?start=2030-01-01&end=2030-06-01']:
+            self.assertEqual(self.client.get(base + query, secure=True).status_code, 400)
+
+
+class CancellationTests(TestCase):
+
+    def setUp(self):
+        from wallets.models import Wallet
+        self.reader = make_reader('birch')
+        self.wallet = Wallet.objects.create(user=User.objects.create_user(username='client'), balance=Decimal('0'))
+        self.now = datetime(2030, 1, 1, tzinfo=UTC)
+        self.slots = []
+        for hours in (48, 2):
+            start = self.now + timedelta(hours=hours)
+            slot = ScheduledSlot.objects.create(
+                reader=self.reader.user, start=start, end=start + timedelta(minutes=30),
+                status='booked', client=self.wallet.user,
+            )
+            Booking.objects.create(slot=slot, client=self.wallet.user, amount=Decimal('30.00'))
+            self.slots.append(slot)
+
+    def test_bulk_cancel_refunds_by_notice_and_is_retry_safe(self):
+        from scheduling.cancellation import cancel_bookings
+        ids = [s.pk for s in self.slots]
+        self.assertEqual(cancel_bookings(ids, now=self.now), (2, Decimal('45.00')))
+        self.wallet.refresh_from_db()
+        self.assertEqual(self.wallet.balance, Decimal('45.00'))
+        self.assertEqual(set(ScheduledSlot.objects.filter(pk__in=ids).values_list('status', flat=True)), {'cancelled'})
+        self.assertEqual(
+            sorted(Booking.objects.values_list('refund_amount', flat=True)), [Decimal('15.00'), Decimal('30.00')],
+        )
+
+        self.assertEqual(cancel_bookings(ids, now=self.now), (0, Decimal('0')))
+        self.wallet.refresh_from_db()
+        self.assertEqual(self.wallet.balance, self.wallet.balance_from_ledger())
+
+    def test_full_refund_ignores_notice(self):
+        from scheduling.cancellation import cancel_bookings
+        self.assertEqual(cancel_bookings([self.slots[1].pk], full_refund=True, now=self.now), (1, Decimal('30.00')))
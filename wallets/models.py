@@ -2,6 +2,8 @@ from decimal import Decimal
 from django.conf import settings
 from django.db import models, transaction
 
+from core import audit
+
 ENTRY_TYPES = [
     ('top_up', 'Top Up'),
     ('session_charge', 'Session Charge'),
@@ -65,6 +67,22 @@ class LedgerEntry(models.Model):
         return f"{self.entry_type} {self.amount}"
 
 
+def ledger_audit_event(entry, user_id):
+    """Audit event (core.audit) for a money movement recorded as `entry`."""
+    return audit.event(
+        'wallet_debit' if entry.amount < 0 else 'wallet_credit',
+        user=user_id,
+        obj=entry,
+        details={
+            'wallet_id': entry.wallet_id,
+            'amount': str(entry.amount),
+            'entry_type': entry.entry_type,
+            'reference_type': entry.reference_type,
+            'reference_id': entry.reference_id,
+        },
+    )
+
+
 def debit_wallet(wallet, amount, entry_type, idempotency_key, session=None,
                  stripe_payment_intent_id='', stripe_event_id='',
                  reference_type='', reference_id=''):
@@ -75,7 +93,7 @@ def debit_wallet(wallet, amount, entry_type, idempotency_key, session=None,
         w = Wallet.objects.select_for_update().get(pk=wallet.pk)
         if w.balance < amount:
             raise ValueError("Insufficient balance")
-        LedgerEntry.objects.create(
+        entry = LedgerEntry.objects.create(
             wallet=w,
             amount=-amount,
             entry_type=entry_type,
@@ -88,6 +106,7 @@ def debit_wallet(wallet, amount, entry_type, idempotency_key, session=None,
         )
         w.balance -= amount
         w.save(update_fields=['balance', 'updated_at'])
+        audit.record_many([ledger_audit_event(entry, w.user_id)])
     return True
 
 
@@ -99,7 +118,7 @@ def credit_wallet(wallet, amount, entry_type, idempotency_key, session=None,
         if LedgerEntry.objects.filter(idempotency_key=idempotency_key).exists():
             return False
         w = Wallet.objects.select_for_update().get(pk=wallet.pk)
-        LedgerEntry.objects.create(
+        entry = LedgerEntry.objects.create(
             wallet=w,
             amount=amount,
             entry_type=entry_type,
@@ -112,4 +131,5 @@ def credit_wallet(wallet, amount, entry_type, idempotency_key, session=None,
         )
         w.balance += amount
         w.save(update_fields=['balance', 'updated_at'])
+        audit.record_many([ledger_audit_event(entry, w.user_id)])
     return True